@@ -0,0 +1,218 @@
+import threading
+import traceback
+from datetime import datetime
+from sqlalchemy import select, insert, update, delete
+from database import get_session
+from models import ActivityEvent, Progress, DailyFocus, ProjectionCheckpoint
+from cohorts import apply_progress_delta, recompute_all_cohort_stats
+from leaderboards import leaderboards, refresh_leaderboards
+
+FOCUS = "focus"
+POMODORO_WORK = "pomodoro_work"
+POMODORO_BREAK = "pomodoro_break"
+# Event kinds that count as study time toward Progress
+STUDY_KINDS = (FOCUS, POMODORO_WORK)
+
+TIMER_SOURCE = "timer"
+PROJECTOR_NAME = "activity"
+PROJECTION_BATCH_SIZE = 1000
+
+_projector_lock = threading.Lock()
+
+
+def record_event(user_id, kind, started_at, ended_at, subject=None, distractions=0, project=True):
+    """Append a completed session to the activity log and, by default, project it right away.
+
+    The event is saved once it is logged. If projecting fails (say another
+    process holds the database), it is left for the next projector run.
+    """
+    session = get_session()
+    try:
+        event = ActivityEvent(
+            user_id=user_id,
+            kind=kind,
+            subject=subject or None,
+            started_at=started_at,
+            ended_at=ended_at,
+            minutes=(ended_at - started_at).total_seconds() / 60,
+            distractions=distractions
+        )
+        session.add(event)
+        session.commit()
+        event_id = event.id
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+    if project:
+        try:
+            project_events()
+        except Exception:
+            traceback.print_exc()
+    return event_id
+
+
+def _claim_checkpoint(session):
+    """Take the checkpoint for the current transaction and return its last event id.
+
+    Writing the row first takes the database write lock, so a projector in
+    another process waits here until this transaction commits and then
+    reads the moved checkpoint, instead of applying the same events.
+    """
+    session.execute(
+        insert(ProjectionCheckpoint).prefix_with("OR IGNORE")
+        .values(name=PROJECTOR_NAME, last_event_id=0, updated_at=datetime.utcnow())
+    )
+    session.execute(
+        update(ProjectionCheckpoint).where(ProjectionCheckpoint.name == PROJECTOR_NAME)
+        .values(updated_at=datetime.utcnow())
+    )
+    return session.scalar(
+        select(ProjectionCheckpoint.last_event_id).where(ProjectionCheckpoint.name == PROJECTOR_NAME)
+    )
+
+
+def _apply(session, events):
+    """Fold a batch of events into the Progress and DailyFocus projections"""
+    progress = {}
+    focus = {}
+    # Per user deltas for cohort aggregates
+    cohort_hours = {}
+    cohort_minutes = {}
+    for event in events:
+        day = event.started_at.date()
+        if event.kind in STUDY_KINDS and event.subject:
+            key = (event.user_id, day, event.subject)
+            progress[key] = progress.get(key, 0.0) + event.minutes / 60
+            user_hours = cohort_hours.setdefault(event.user_id, {})
+            user_hours[(day, event.subject)] = user_hours.get((day, event.subject), 0.0) + event.minutes / 60
+        if event.kind in STUDY_KINDS:
+            user_minutes = cohort_minutes.setdefault(event.user_id, {})
+            user_minutes[day] = user_minutes.get(day, 0.0) + event.minutes
+        totals = focus.setdefault((event.user_id, day, event.kind), [0, 0.0, 0])
+        totals[0] += 1
+        totals[1] += event.minutes
+        totals[2] += event.distractions or 0
+
+    for (user_id, day, subject), hours in progress.items():
+        row = session.query(Progress).filter_by(
+            user_id=user_id, date=day, subject=subject, source=TIMER_SOURCE
+        ).first()
+        if row:
+            row.hours_studied = round(row.hours_studied + hours, 4)
+        else:
+            session.add(Progress(
+                user_id=user_id, subject=subject, date=day,
+                hours_studied=round(hours, 4), source=TIMER_SOURCE
+            ))
+
+    for (user_id, day, kind), (sessions, minutes, distractions) in focus.items():
+        row = session.query(DailyFocus).filter_by(user_id=user_id, date=day, kind=kind).first()
+        if row:
+            row.sessions += sessions
+            row.minutes += minutes
+            row.distractions += distractions
+        else:
+            session.add(DailyFocus(
+                user_id=user_id, date=day, kind=kind,
+                sessions=sessions, minutes=minutes, distractions=distractions
+            ))
+
+    for user_id in set(cohort_hours) | set(cohort_minutes):
+        apply_progress_delta(session, user_id, cohort_hours.get(user_id), cohort_minutes.get(user_id))
+
+
+def project_events(batch_size=PROJECTION_BATCH_SIZE):
+    """Apply events recorded since the checkpoint; returns how many were applied.
+
+    Each batch is read and applied under a claim on the checkpoint and
+    commits together with the checkpoint move, so an event is applied
+    exactly once even if projection stops part way or projectors in
+    several processes run at the same time.
+    """
+    applied = 0
+    user_ids = set()
+    with _projector_lock:
+        session = get_session()
+        try:
+            while True:
+                last_event_id = _claim_checkpoint(session)
+                events = session.scalars(
+                    select(ActivityEvent).where(ActivityEvent.id > last_event_id)
+                    .order_by(ActivityEvent.id).limit(batch_size)
+                ).all()
+                if not events:
+                    session.commit()
+                    break
+                _apply(session, events)
+                moved = session.execute(
+                    update(ProjectionCheckpoint).where(
+                        ProjectionCheckpoint.name == PROJECTOR_NAME,
+                        ProjectionCheckpoint.last_event_id == last_event_id
+                    ).values(last_event_id=events[-1].id, updated_at=datetime.utcnow())
+                ).rowcount
+                if moved != 1:
+                    raise RuntimeError("Projection checkpoint moved; is another projector running?")
+                session.commit()
+                applied += len(events)
+                user_ids.update(event.user_id for event in events)
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+    if user_ids:
+        refresh_leaderboards(user_ids)
+    return applied
+
+
+def replay_events(batch_size=PROJECTION_BATCH_SIZE):
+    """Drop the projections and rebuild them from the whole activity log.
+
+    Cohort aggregates are recomputed afterwards, since the dropped rows
+    were never subtracted from them.
+    """
+    with _projector_lock:
+        session = get_session()
+        try:
+            session.execute(delete(Progress).where(Progress.source == TIMER_SOURCE))
+            session.execute(delete(DailyFocus))
+            session.execute(delete(ProjectionCheckpoint).where(ProjectionCheckpoint.name == PROJECTOR_NAME))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+    leaderboards.invalidate()
+    applied = project_events(batch_size)
+    recompute_all_cohort_stats()
+    return applied
+
+
+def get_daily_focus(user_id, since=None):
+    """Projected focus aggregates as dicts, oldest first"""
+    session = get_session()
+    try:
+        stmt = select(
+            DailyFocus.date, DailyFocus.kind, DailyFocus.sessions, DailyFocus.minutes, DailyFocus.distractions
+        ).where(DailyFocus.user_id == user_id).order_by(DailyFocus.date, DailyFocus.kind)
+        if since:
+            stmt = stmt.where(DailyFocus.date >= since)
+        return [dict(row) for row in session.execute(stmt).mappings()]
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Project the activity log into Progress and focus aggregates")
+    parser.add_argument("command", choices=["project", "replay"],
+                        help="project: apply new events; replay: rebuild projections from scratch")
+    args = parser.parse_args()
+    if args.command == "replay":
+        print(f"Replayed {replay_events()} events")
+    else:
+        print(f"Projected {project_events()} new events")
@@ -0,0 +1,104 @@
+import heapq
+from datetime import date, timedelta
+import plotly.graph_objects as go
+
+HOUR_STEP = 0.1
+
+
+def allocate_hours(subjects, daily_capacity, start=None, max_daily_per_subject=None, capacity_by_day=None):
+    """Earliest-deadline-first allocation of study hours across days.
+
+    subjects is a list of dicts with "subject", "deadline" (a date) and
+    "required_hours". Each day from start up to the day before the latest
+    deadline gets up to daily_capacity hours, handed out to the subjects with
+    the nearest deadline first. max_daily_per_subject caps a single subject's
+    share of one day, which spreads work out instead of finishing subjects
+    one at a time; a subject dict may override it with "max_daily_hours".
+    capacity_by_day overrides daily_capacity for specific dates, e.g. the time
+    left over after other subjects' existing allocations.
+
+    Returns (allocation, unmet) where allocation maps each date to
+    {subject: hours} and unmet maps subjects to the hours that could not fit
+    before their deadline.
+    """
+    start = start or date.today()
+    default_cap = max_daily_per_subject or daily_capacity
+    caps = {s["subject"]: s.get("max_daily_hours") or default_cap for s in subjects}
+    remaining = {s["subject"]: float(s["required_hours"]) for s in subjects}
+    deadlines = {s["subject"]: s["deadline"] for s in subjects}
+    allocation = {}
+    unmet = {}
+
+    queue = [(s["deadline"], i, s["subject"]) for i, s in enumerate(subjects) if s["required_hours"] > 0]
+    heapq.heapify(queue)
+    if not queue:
+        return allocation, unmet
+
+    last_day = max(deadlines.values())
+    day = start
+    while queue and day < last_day:
+        capacity = capacity_by_day.get(day, daily_capacity) if capacity_by_day else daily_capacity
+        deferred = []
+        while queue and capacity >= HOUR_STEP:
+            deadline, order, subject = heapq.heappop(queue)
+            if deadline <= day:
+                # Too late for this subject; whatever is left is unmet
+                unmet[subject] = round(remaining[subject], 1)
+                continue
+            hours = round(min(capacity, caps[subject], remaining[subject]), 1)
+            if hours >= HOUR_STEP:
+                allocation.setdefault(day, {})[subject] = hours
+                capacity = round(capacity - hours, 1)
+                remaining[subject] = round(remaining[subject] - hours, 1)
+            if remaining[subject] >= HOUR_STEP:
+                deferred.append((deadline, order, subject))
+        for entry in deferred:
+            heapq.heappush(queue, entry)
+        day += timedelta(days=1)
+
+    for _, _, subject in queue:
+        if remaining[subject] >= HOUR_STEP:
+            unmet[subject] = round(remaining[subject], 1)
+    return allocation, unmet
+
+
+def create_allocation_chart(plan):
+    days = sorted({day for item in plan for day in item.get("daily_allocation", {})})
+    fig = go.Figure()
+    for item in plan:
+        allocation = item.get("daily_allocation", {})
+        fig.add_trace(go.Bar(
+            x=days,
+            y=[allocation.get(day, 0) for day in days],
+            name=item["subject"]
+        ))
+
+    fig.update_layout(
+        barmode="stack",
+        title="Day-by-Day Study Allocation",
+        xaxis_title="Date",
+        yaxis_title="Hours",
+        plot_bgcolor="rgba(0,0,0,0)"
+    )
+    return fig
+
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    rng = random.Random(0)
+    today = date.today()
+    subjects = [
+        {
+            "subject": f"Subject {i}",
+            "deadline": today + timedelta(days=rng.randint(30, 180)),
+            "required_hours": rng.randint(10, 50),
+        }
+        for i in range(20)
+    ]
+    started = time.perf_counter()
+    allocation, unmet = allocate_hours(subjects, daily_capacity=6, start=today, max_daily_per_subject=2)
+    elapsed = time.perf_counter() - started
+    print(f"20 subjects x 180 days allocated in {elapsed * 1000:.1f} ms")
+    print(f"{len(allocation)} study days, unmet: {unmet or 'none'}")
@@ -0,0 +1,132 @@
+"""Load test for api_server.py: requests/second for plan generation and progress writes.
+
+Starts the API in a subprocess against a scratch database in a temporary
+directory, then drives it from several threads, each holding one persistent
+HTTP/1.1 connection.
+
+    python api_load_test.py --threads 8 --seconds 10
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+SUBJECTS = ["Mathematics", "Physics", "Chemistry", "Biology", "History"]
+
+
+def start_server(workdir):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'load_test.db')}")
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(os.path.join(os.path.dirname(__file__), "api_server.py")),
+         "--port", "0", "--quiet"],
+        cwd=workdir, env=env, stdout=subprocess.PIPE, text=True
+    )
+    # serve() prints the bound address once it is listening
+    for line in server.stdout:
+        if "listening on" in line:
+            return server, int(line.rsplit(":", 1)[1])
+    raise RuntimeError("API server exited before it started listening")
+
+
+def call(conn, method, path, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else None
+    headers = {"Content-Type": "application/json"} if body else {}
+    conn.request(method, path, body=body, headers=headers)
+    response = conn.getresponse()
+    data = json.loads(response.read())
+    if response.status != 200:
+        raise RuntimeError(f"{method} {path} -> {response.status}: {data.get('error')}")
+    return data
+
+
+def create_user(port, username):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    try:
+        call(conn, "POST", "/api/register", {"username": username, "password": "load-test"})
+        return call(conn, "POST", "/api/login", {"username": username, "password": "load-test"})["user_id"]
+    finally:
+        conn.close()
+
+
+def plan_request(user_id, i):
+    return "POST", f"/api/users/{user_id}/plan", {
+        "subjects": [
+            {"subject": subject, "difficulty": "medium", "priority": "high" if n == i % 5 else "medium"}
+            for n, subject in enumerate(SUBJECTS)
+        ],
+        "exam_date": (date.today() + timedelta(days=30)).isoformat(),
+        "motivation": 7,
+        "energy": "medium",
+        "study_hours": 4,
+    }
+
+
+def progress_request(user_id, i):
+    return "POST", f"/api/users/{user_id}/progress", {
+        "date": (date.today() - timedelta(days=i % 365)).isoformat(),
+        "hours": {subject: round(0.5 + (i + n) % 4 * 0.5, 1) for n, subject in enumerate(SUBJECTS)},
+    }
+
+
+def run_phase(port, user_ids, make_request, seconds):
+    latencies = [[] for _ in user_ids]
+    errors = []
+    stop = time.perf_counter() + seconds
+
+    def worker(slot, user_id):
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        i = 0
+        try:
+            while time.perf_counter() < stop:
+                method, path, payload = make_request(user_id, i)
+                started = time.perf_counter()
+                call(conn, method, path, payload)
+                latencies[slot].append(time.perf_counter() - started)
+                i += 1
+        except Exception as e:
+            errors.append(e)
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=worker, args=(slot, user_id)) for slot, user_id in enumerate(user_ids)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if errors:
+        raise errors[0]
+    all_latencies = np.concatenate([np.array(values) for values in latencies]) * 1000
+    return len(all_latencies) / elapsed, np.percentile(all_latencies, 50), np.percentile(all_latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        server, port = start_server(workdir)
+        try:
+            user_ids = [create_user(port, f"load-{n}") for n in range(args.threads)]
+            print(f"{args.threads} threads, {args.seconds:g}s per phase, one keep-alive connection per thread")
+            for label, make_request in [("plan generation", plan_request), ("progress writes", progress_request)]:
+                rate, p50, p99 = run_phase(port, user_ids, make_request, args.seconds)
+                print(f"{label:16s} {rate:8.0f} req/s   p50 {p50:6.1f} ms   p99 {p99:6.1f} ms")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+import json
+import re
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+from core.auth import authenticate, register_user
+from core.plans import (
+    generate_ai_study_plan,
+    save_user_state,
+    load_user_state,
+    get_plan_cache_stats,
+    get_generation_cache_stats,
+)
+from core.progress import save_daily_progress, get_recent_progress
+from core.preferences import get_preferences, save_preferences
+from core.sessions import init_focus_files, save_focus_session, save_session, get_focus_history, get_pomodoro_history
+from core.reports import get_progress_forecast, get_leaderboard
+from init_db import initialize_database
+from leaderboards import METRICS
+from passwords import PasswordHasherBusy
+
+# There is no authentication: login only checks a password, and every /api/users/<id>
+# route and session post acts on whatever user id it is given. Bind to loopback only.
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 1_000_000
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _plan_json(plan):
+    """The plan with each daily_allocation keyed by ISO date strings, as JSON object keys must be strings"""
+    return [
+        dict(item, daily_allocation={day.isoformat(): hours for day, hours in item["daily_allocation"].items()})
+        if item.get("daily_allocation") else item
+        for item in plan
+    ]
+
+
+def _parse_date(value, field):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ApiError(400, f"{field} must be an ISO date")
+
+
+def _require(body, *fields):
+    missing = [field for field in fields if field not in body]
+    if missing:
+        raise ApiError(400, f"Missing fields: {', '.join(missing)}")
+
+
+def _session_owner(body):
+    """(user_id, subject) a posted timer session is recorded for; without a user it only goes to the session files"""
+    user_id = body.get("user_id")
+    if user_id is not None:
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            raise ApiError(400, "user_id must be an integer")
+    return user_id, body.get("subject") or None
+
+
+# Handlers take (match, query, body) and return a JSON-serializable result
+
+def health(match, query, body):
+    return {"status": "ok", "caches": {"plans": get_plan_cache_stats(), "generated_plans": get_generation_cache_stats()}}
+
+
+def login(match, query, body):
+    _require(body, "username", "password")
+    user = authenticate(body["username"], body["password"])
+    if not user:
+        raise ApiError(401, "Invalid credentials")
+    return {"user_id": user.id, "username": user.username}
+
+
+def register(match, query, body):
+    _require(body, "username", "password")
+    if not register_user(body["username"], body["password"]):
+        raise ApiError(409, "Username already exists")
+    return {"registered": True}
+
+
+def get_plan(match, query, body):
+    plan = load_user_state(int(match["user_id"]))
+    if plan is None:
+        raise ApiError(404, "No plan saved")
+    return {"plan": _plan_json(plan)}
+
+
+def generate_plan(match, query, body):
+    _require(body, "subjects", "exam_date")
+    subjects = []
+    for subject in body["subjects"]:
+        details = {
+            "subject": subject["subject"],
+            "difficulty": subject.get("difficulty", "medium"),
+            "priority": subject.get("priority", "medium"),
+        }
+        if subject.get("deadline"):
+            details["deadline"] = _parse_date(subject["deadline"], "deadline")
+        if subject.get("required_hours"):
+            details["required_hours"] = float(subject["required_hours"])
+        subjects.append(details)
+    try:
+        message, plan = generate_ai_study_plan(
+            subjects,
+            int(body.get("motivation", 7)),
+            body.get("energy", "medium"),
+            float(body.get("study_hours", 4)),
+            _parse_date(body["exam_date"], "exam_date"),
+        )
+    except KeyError as e:
+        raise ApiError(400, f"Invalid value: {e}")
+    if not plan:
+        raise ApiError(400, message)
+    result = {"message": message, "plan": _plan_json(plan)}
+    # Serialize first, so a plan the client can't be sent is never saved either
+    json.dumps(result, default=_json_default)
+    if body.get("save", True):
+        save_user_state(int(match["user_id"]), plan)
+    return result
+
+
+def get_progress(match, query, body):
+    limit = int(query.get("limit", ["30"])[0])
+    return {"progress": get_recent_progress(int(match["user_id"]), limit)}
+
+
+def post_progress(match, query, body):
+    _require(body, "hours")
+    day = _parse_date(body["date"], "date") if body.get("date") else date.today()
+    hours = {subject: float(value) for subject, value in body["hours"].items()}
+    save_daily_progress(int(match["user_id"]), hours, day)
+    return {"saved": len(hours), "date": day}
+
+
+def get_forecast(match, query, body):
+    exam_date = query.get("exam_date", [None])[0]
+    exam_date = _parse_date(exam_date, "exam_date") if exam_date else None
+    return {"forecast": get_progress_forecast(int(match["user_id"]), exam_date)}
+
+
+def get_user_preferences(match, query, body):
+    return {"preferences": get_preferences(int(match["user_id"]))}
+
+
+def post_user_preferences(match, query, body):
+    return {"preferences": save_preferences(int(match["user_id"]), body)}
+
+
+def leaderboard(match, query, body):
+    """Top ?k= users and the caller's rank; ?cohort= limits the board to one cohort"""
+    if match["metric"] not in METRICS:
+        raise ApiError(404, f"Unknown leaderboard: {match['metric']}")
+    cohort = query.get("cohort", [None])[0]
+    k = min(MAX_PAGE_SIZE, int(query.get("k", ["10"])[0]))
+    return get_leaderboard(match["metric"], int(cohort) if cohort else None, int(match["user_id"]), k)
+
+
+def _session_page(history, query):
+    """Newest-first page; ?before= takes the cursor from the previous page, ?since=/?until= a date range"""
+    since = query.get("since", [None])[0]
+    until = query.get("until", [None])[0]
+    if since or until:
+        start = _parse_date(since, "since") if since else None
+        end = _parse_date(until, "until") + timedelta(days=1) if until else None
+        sessions = history.between(
+            datetime.combine(start, datetime.min.time()) if start else None,
+            datetime.combine(end, datetime.min.time()) if end else None,
+        )
+        return {"sessions": sessions[::-1][:MAX_PAGE_SIZE], "total": history.count()}
+    limit = min(MAX_PAGE_SIZE, int(query.get("limit", [DEFAULT_PAGE_SIZE])[0]))
+    before = query.get("before", [None])[0]
+    sessions, cursor = history.page(int(before) if before else None, limit)
+    return {"sessions": sessions, "next": cursor, "total": history.count()}
+
+
+def list_focus_sessions(match, query, body):
+    return _session_page(get_focus_history(), query)
+
+
+def post_focus_session(match, query, body):
+    _require(body, "start", "end")
+    user_id, subject = _session_owner(body)
+    save_focus_session(
+        datetime.fromisoformat(body["start"]),
+        datetime.fromisoformat(body["end"]),
+        int(body.get("distractions", 0)),
+        user_id,
+        subject,
+    )
+    return {"saved": True}
+
+
+def list_pomodoro_sessions(match, query, body):
+    history = get_pomodoro_history()
+    page = _session_page(history, query)
+    page["totals"] = {
+        name: {"count": history.count(name), "minutes": history.total_minutes(name)}
+        for name in history.type_names
+    }
+    return page
+
+
+def post_pomodoro_session(match, query, body):
+    _require(body, "start", "end", "type")
+    user_id, subject = _session_owner(body)
+    save_session(datetime.fromisoformat(body["start"]), datetime.fromisoformat(body["end"]), body["type"],
+                 user_id, subject)
+    return {"saved": True}
+
+
+ROUTES = [
+    ("GET", r"/api/health", health),
+    ("POST", r"/api/login", login),
+    ("POST", r"/api/register", register),
+    ("GET", r"/api/users/(?P<user_id>\d+)/plan", get_plan),
+    ("POST", r"/api/users/(?P<user_id>\d+)/plan", generate_plan),
+    ("GET", r"/api/users/(?P<user_id>\d+)/progress", get_progress),
+    ("POST", r"/api/users/(?P<user_id>\d+)/progress", post_progress),
+    ("GET", r"/api/users/(?P<user_id>\d+)/forecast", get_forecast),
+    ("GET", r"/api/users/(?P<user_id>\d+)/preferences", get_user_preferences),
+    ("POST", r"/api/users/(?P<user_id>\d+)/preferences", post_user_preferences),
+    ("GET", r"/api/users/(?P<user_id>\d+)/leaderboards/(?P<metric>\w+)", leaderboard),
+    ("GET", r"/api/sessions/focus", list_focus_sessions),
+    ("POST", r"/api/sessions/focus", post_focus_session),
+    ("GET", r"/api/sessions/pomodoro", list_pomodoro_sessions),
+    ("POST", r"/api/sessions/pomodoro", post_pomodoro_session),
+]
+COMPILED_ROUTES = [(method, re.compile(pattern + "$"), handler) for method, pattern, handler in ROUTES]
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections open between requests unless the client closes them
+    protocol_version = "HTTP/1.1"
+    server_version = "StudyPlannerAPI/1.0"
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload, default=_json_default).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise ApiError(413, "Request body too large")
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except json.JSONDecodeError:
+            raise ApiError(400, "Body must be JSON")
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        try:
+            # Always consume the body so the connection can be reused
+            body = self._read_body()
+            path_matched = False
+            for route_method, pattern, handler in COMPILED_ROUTES:
+                match = pattern.match(url.path)
+                if not match:
+                    continue
+                path_matched = True
+                if route_method == method:
+                    self._send_json(200, handler(match, parse_qs(url.query), body))
+                    return
+            raise ApiError(405 if path_matched else 404, "Method not allowed" if path_matched else "Not found")
+        except ApiError as e:
+            self._send_json(e.status, {"error": str(e)})
+        except PasswordHasherBusy as e:
+            self._send_json(503, {"error": str(e)})
+        except (KeyError, ValueError, TypeError) as e:
+            self._send_json(400, {"error": f"Bad request: {e}"})
+        except Exception as e:
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class ApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, verbose=False):
+        self.verbose = verbose
+        super().__init__(address, ApiRequestHandler)
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, verbose=True):
+    initialize_database()
+    init_focus_files()
+    server = ApiServer((host, port), verbose=verbose)
+    print(f"Study Planner API listening on http://{host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local JSON API for the study planner")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--quiet", action="store_true", help="Don't log each request")
+    args = parser.parse_args()
+    serve(args.host, args.port, verbose=not args.quiet)
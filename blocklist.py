@@ -0,0 +1,323 @@
+import ipaddress
+import json
+import os
+import re
+import tempfile
+import threading
+from urllib.parse import urlsplit
+from file_lock import file_lock, replace_atomically
+
+_PLAIN_HOST = re.compile(r"[a-z0-9.-]+")
+
+
+def normalize_domain(site):
+    """Reduce a URL, hostname or wildcard rule to a bare lowercase domain"""
+    site = site.strip().lower()
+    if not site:
+        return ""
+    if site.startswith("*."):
+        site = site[2:]
+    if _PLAIN_HOST.fullmatch(site):
+        site = site.strip(".")
+        return site[4:] if site.startswith("www.") else site
+    if "://" not in site:
+        site = "//" + site
+    try:
+        host = urlsplit(site).hostname or ""
+    except ValueError:
+        return ""
+    host = host.strip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    try:
+        host = host.encode("idna").decode("ascii")
+    except UnicodeError:
+        pass
+    return host
+
+
+class BlockedSiteStore:
+    """Normalized set of blocked domains with a reversed-label suffix trie.
+
+    A domain blocks itself and all of its subdomains, so "youtube.com" also
+    matches "m.youtube.com". Lookups walk the trie one label at a time.
+
+    Changes since the last save are kept apart, and save() merges them into
+    whatever is on disk under a cross-process file lock, so processes
+    sharing the file don't overwrite each other's additions.
+    """
+
+    _END = ""
+
+    def __init__(self, path):
+        self.path = path
+        self.sites = set()
+        self._trie = {}
+        self._signature = None
+        # Unsaved changes, reapplied on top of the file whenever it is reloaded
+        self._added = set()
+        self._removed = set()
+        self._lock = threading.RLock()
+        self.reload()
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        # Every save swaps in a new file, so the inode changes even within one mtime tick
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def reload(self):
+        with self._lock:
+            signature = self._file_signature()
+            sites = []
+            if signature is not None:
+                with open(self.path, "r") as f:
+                    sites = json.load(f)
+            self._signature = signature
+            self.sites = set()
+            self._trie = {}
+            for site in sites:
+                self._insert(normalize_domain(site))
+            for domain in self._added:
+                self._insert(domain)
+            for domain in self._removed:
+                self._delete(domain)
+
+    def refresh(self):
+        """Reload only if the backing file was changed by someone else"""
+        with self._lock:
+            if self._file_signature() != self._signature:
+                self.reload()
+
+    def _insert(self, domain):
+        if not domain or domain in self.sites:
+            return False
+        self.sites.add(domain)
+        node = self._trie
+        for label in reversed(domain.split(".")):
+            node = node.setdefault(label, {})
+        node[self._END] = True
+        return True
+
+    def _delete(self, domain):
+        if domain not in self.sites:
+            return False
+        self.sites.discard(domain)
+        path = [self._trie]
+        labels = list(reversed(domain.split(".")))
+        for label in labels:
+            path.append(path[-1][label])
+        path[-1].pop(self._END, None)
+        # Prune branches that no longer lead to any blocked domain
+        for depth in range(len(labels), 0, -1):
+            if path[depth]:
+                break
+            del path[depth - 1][labels[depth - 1]]
+        return True
+
+    def is_blocked(self, url):
+        domain = normalize_domain(url)
+        if not domain:
+            return False
+        node = self._trie
+        for label in reversed(domain.split(".")):
+            node = node.get(label)
+            if node is None:
+                return False
+            if self._END in node:
+                return True
+        return False
+
+    def add_many(self, sites, save=True):
+        with self._lock:
+            added = 0
+            for site in sites:
+                domain = normalize_domain(site)
+                if self._insert(domain):
+                    added += 1
+                    self._added.add(domain)
+                    self._removed.discard(domain)
+            if added and save:
+                self.save()
+            return added
+
+    def remove_many(self, sites, save=True):
+        with self._lock:
+            removed = 0
+            for site in sites:
+                domain = normalize_domain(site)
+                if self._delete(domain):
+                    removed += 1
+                    self._removed.add(domain)
+                    self._added.discard(domain)
+            if removed and save:
+                self.save()
+            return removed
+
+    def save(self):
+        """Merge unsaved changes into the file as it is now and write it back atomically"""
+        with self._lock, file_lock(self.path):
+            if self._file_signature() != self._signature:
+                self.reload()
+            sites = sorted(self.sites)
+            replace_atomically(self.path, lambda f: json.dump(sites, f))
+            self._signature = self._file_signature()
+            self._added.clear()
+            self._removed.clear()
+
+    def __contains__(self, site):
+        return normalize_domain(site) in self.sites
+
+    def __len__(self):
+        return len(self.sites)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path):
+    """Process-wide store per file, reloaded when the file changes on disk"""
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = BlockedSiteStore(path)
+            return store
+    store.refresh()
+    return store
+
+
+_HOSTS_IGNORED = {"localhost", "localhost.localdomain", "local", "broadcasthost"}
+
+
+def _is_ip_address(field):
+    try:
+        # Link-local IPv6 addresses in hosts files can carry a zone, as in fe80::1%lo0
+        ipaddress.ip_address(field.split("%", 1)[0])
+    except ValueError:
+        return False
+    return True
+
+
+def _is_hosts_alias(field):
+    """Addresses and the standard names every hosts file maps, none of which are sites"""
+    field = field.lower()
+    return field in _HOSTS_IGNORED or field.startswith("ip6-") or _is_ip_address(field)
+
+
+def parse_blocklist_line(line):
+    """Extract domains from one line of a plain, hosts-file or adblock-style list"""
+    line = line.strip()
+    if not line or line[0] in "#![":
+        return []
+    if line.startswith("@@") or "##" in line or "#@#" in line:
+        # Adblock exception and cosmetic rules don't block anything
+        return []
+    if line.startswith("||"):
+        rule = line[2:].split("$", 1)[0]
+        host = rule.split("^", 1)[0]
+        if "/" in host or "*" in host:
+            return []
+        domain = normalize_domain(host)
+        return [domain] if domain else []
+
+    fields = line.split("#", 1)[0].split()
+    if not fields:
+        return []
+    domains = []
+    for field in fields:
+        if _is_hosts_alias(field):
+            continue
+        domain = normalize_domain(field)
+        if domain and "." in domain:
+            domains.append(domain)
+    return domains
+
+
+def iter_blocklist_domains(lines):
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="ignore")
+        yield from parse_blocklist_line(line)
+
+
+def import_blocklist(lines, store, chunk_size=5000, progress_callback=None):
+    """Stream a blocklist into the store chunk by chunk, saving once at the end.
+
+    Returns (domains parsed, domains newly added).
+    """
+    parsed = added = 0
+    chunk = []
+    for domain in iter_blocklist_domains(lines):
+        chunk.append(domain)
+        if len(chunk) >= chunk_size:
+            parsed += len(chunk)
+            added += store.add_many(chunk, save=False)
+            chunk = []
+            if progress_callback:
+                progress_callback(parsed, added)
+    if chunk:
+        parsed += len(chunk)
+        added += store.add_many(chunk, save=False)
+    if added:
+        store.save()
+    if progress_callback:
+        progress_callback(parsed, added)
+    return parsed, added
+
+
+def _chunked_lines(lines, lines_per_chunk):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= lines_per_chunk:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def export_plain(domains, lines_per_chunk=1000):
+    return _chunked_lines((f"{domain}\n" for domain in domains), lines_per_chunk)
+
+
+def export_hosts(domains, lines_per_chunk=1000):
+    yield "# Generated by AI-Powered Study Planner\n"
+    yield from _chunked_lines((f"0.0.0.0 {domain}\n" for domain in domains), lines_per_chunk)
+
+
+def export_pac(domains, lines_per_chunk=1000):
+    """Proxy auto-config script that blackholes blocked domains and their subdomains"""
+    yield "var blocked = {\n"
+    yield from _chunked_lines((f"  {json.dumps(domain)}: 1,\n" for domain in domains), lines_per_chunk)
+    yield (
+        "};\n"
+        "function FindProxyForURL(url, host) {\n"
+        "  var parts = host.toLowerCase().split(\".\");\n"
+        "  for (var i = 0; i < parts.length - 1; i++) {\n"
+        "    if (blocked.hasOwnProperty(parts.slice(i).join(\".\"))) {\n"
+        "      return \"PROXY 127.0.0.1:9\";\n"
+        "    }\n"
+        "  }\n"
+        "  return \"DIRECT\";\n"
+        "}\n"
+    )
+
+
+EXPORT_FORMATS = {
+    "Plain list": (export_plain, "blocked_sites.txt", "text/plain"),
+    "Hosts file": (export_hosts, "hosts", "text/plain"),
+    "PAC script": (export_pac, "blocked_sites.pac", "application/x-ns-proxy-autoconfig"),
+}
+
+
+def spool_to_file(chunks, suffix=""):
+    """Write text chunks to a named temp file and return its path; the caller deletes it"""
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    with temp_file:
+        for chunk in chunks:
+            temp_file.write(chunk.encode())
+    return temp_file.name
+
@@ -0,0 +1,442 @@
+import secrets
+from datetime import date, datetime, timedelta
+import numpy as np
+import plotly.graph_objects as go
+from sqlalchemy import select, update, delete, insert, func, bindparam
+from database import get_session
+from models import Cohort, CohortMember, CohortDailyStats, CohortPlanStats, Progress, DailyFocus, StudyPlan
+from leaderboards import leaderboards
+
+# Focus minutes are stored on the daily row with this subject
+FOCUS_ROW = ""
+RECOMPUTE_INTERVAL = timedelta(hours=24)
+DASHBOARD_DAYS = 30
+
+
+def member_cohort_ids(session, user_id):
+    return session.scalars(select(CohortMember.cohort_id).where(CohortMember.user_id == user_id)).all()
+
+
+def _add_daily_stats(session, cohort_ids, deltas):
+    """Add {(day, subject): (hours, focus_minutes)} to each cohort's daily rows.
+
+    Existing rows are found with one query per cohort and updated or
+    inserted with executemany, so a bulk import costs a few statements per
+    chunk rather than one per row.
+    """
+    deltas = {key: value for key, value in deltas.items() if value[0] or value[1]}
+    if not deltas:
+        return
+    days = [day for day, _ in deltas]
+    subjects = {subject for _, subject in deltas}
+    table = CohortDailyStats.__table__
+    for cohort_id in cohort_ids:
+        existing = dict((
+            ((day, subject), row_id) for row_id, day, subject in session.execute(
+                select(table.c.id, table.c.date, table.c.subject).where(
+                    table.c.cohort_id == cohort_id,
+                    table.c.date.between(min(days), max(days)),
+                    table.c.subject.in_(subjects),
+                )
+            )
+        ))
+        updates = []
+        inserts = []
+        for (day, subject), (hours, minutes) in deltas.items():
+            if (day, subject) in existing:
+                updates.append({"row_id": existing[(day, subject)], "add_hours": hours, "add_minutes": minutes})
+            else:
+                inserts.append({"cohort_id": cohort_id, "date": day, "subject": subject,
+                                "hours": hours, "focus_minutes": minutes})
+        if updates:
+            session.execute(
+                update(table).where(table.c.id == bindparam("row_id")).values(
+                    hours=table.c.hours + bindparam("add_hours"),
+                    focus_minutes=table.c.focus_minutes + bindparam("add_minutes"),
+                ),
+                updates
+            )
+        if inserts:
+            session.execute(insert(table), inserts)
+
+
+def apply_progress_delta(session, user_id, hours=None, focus_minutes=None):
+    """Fold a user's change in study time into their cohorts' aggregates.
+
+    hours maps (day, subject) to added hours (negative when removed) and
+    focus_minutes maps day to added minutes. Runs in the caller's
+    transaction so the aggregates commit or roll back with the write.
+    """
+    cohort_ids = member_cohort_ids(session, user_id)
+    if not cohort_ids:
+        return
+    deltas = {key: (value, 0.0) for key, value in (hours or {}).items()}
+    for day, minutes in (focus_minutes or {}).items():
+        deltas[(day, FOCUS_ROW)] = (0.0, minutes)
+    _add_daily_stats(session, cohort_ids, deltas)
+
+
+def _add_plan_stats(session, cohort_ids, deltas):
+    """Add {subject: (planned_hours, students)} to each cohort's plan rows"""
+    for cohort_id in cohort_ids:
+        for subject, (hours, students) in deltas.items():
+            if not hours and not students:
+                continue
+            row = session.query(CohortPlanStats).filter_by(cohort_id=cohort_id, subject=subject).first()
+            if row:
+                row.planned_hours += hours
+                row.students += students
+            else:
+                session.add(CohortPlanStats(
+                    cohort_id=cohort_id, subject=subject, planned_hours=hours, students=students
+                ))
+
+
+def apply_plan_delta(session, user_id, old_hours, new_hours):
+    """Replace a user's old {subject: daily hours} with new ones in their cohorts' plan totals"""
+    cohort_ids = member_cohort_ids(session, user_id)
+    if not cohort_ids:
+        return
+    deltas = {}
+    for subject in set(old_hours) | set(new_hours):
+        deltas[subject] = (
+            new_hours.get(subject, 0.0) - old_hours.get(subject, 0.0),
+            (subject in new_hours) - (subject in old_hours)
+        )
+    _add_plan_stats(session, cohort_ids, deltas)
+
+
+def plan_hours(session, user_id):
+    return dict(session.execute(
+        select(StudyPlan.subject, StudyPlan.hours).where(StudyPlan.user_id == user_id)
+    ).all())
+
+
+def _user_history(session, user_id):
+    """A user's whole history as daily deltas, for joining or leaving a cohort"""
+    from activity_log import STUDY_KINDS
+    deltas = {}
+    for day, subject, hours in session.execute(
+        select(Progress.date, Progress.subject, func.sum(Progress.hours_studied))
+        .where(Progress.user_id == user_id).group_by(Progress.date, Progress.subject)
+    ):
+        deltas[(day, subject)] = (hours, 0.0)
+    for day, minutes in session.execute(
+        select(DailyFocus.date, func.sum(DailyFocus.minutes))
+        .where(DailyFocus.user_id == user_id, DailyFocus.kind.in_(STUDY_KINDS)).group_by(DailyFocus.date)
+    ):
+        deltas[(day, FOCUS_ROW)] = (0.0, minutes)
+    return deltas
+
+
+def create_cohort(name, instructor_id):
+    session = get_session()
+    try:
+        cohort = Cohort(name=name, instructor_id=instructor_id, join_code=secrets.token_hex(4).upper(),
+                        stats_recomputed_at=datetime.utcnow())
+        session.add(cohort)
+        session.commit()
+        session.refresh(cohort)
+        session.expunge(cohort)
+        return cohort
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+def join_cohort(user_id, join_code):
+    """Add a user to a cohort and their existing history to its aggregates; returns the cohort or None"""
+    session = get_session()
+    try:
+        cohort = session.query(Cohort).filter_by(join_code=join_code.strip().upper()).first()
+        if cohort is None:
+            return None
+        if session.query(CohortMember).filter_by(cohort_id=cohort.id, user_id=user_id).first() is None:
+            session.add(CohortMember(cohort_id=cohort.id, user_id=user_id))
+            cohort.member_count += 1
+            _add_daily_stats(session, [cohort.id], _user_history(session, user_id))
+            _add_plan_stats(session, [cohort.id], {
+                subject: (hours, 1) for subject, hours in plan_hours(session, user_id).items()
+            })
+            session.commit()
+            leaderboards.invalidate(cohort.id)
+        session.refresh(cohort)
+        session.expunge(cohort)
+        return cohort
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+def leave_cohort(user_id, cohort_id):
+    session = get_session()
+    try:
+        member = session.query(CohortMember).filter_by(cohort_id=cohort_id, user_id=user_id).first()
+        if member is None:
+            return False
+        _add_daily_stats(session, [cohort_id], {
+            key: (-hours, -minutes) for key, (hours, minutes) in _user_history(session, user_id).items()
+        })
+        _add_plan_stats(session, [cohort_id], {
+            subject: (-hours, -1) for subject, hours in plan_hours(session, user_id).items()
+        })
+        session.delete(member)
+        session.query(Cohort).filter_by(id=cohort_id).update({"member_count": Cohort.member_count - 1})
+        session.commit()
+        leaderboards.invalidate(cohort_id)
+        return True
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+def get_user_cohorts(user_id):
+    """(cohorts the user belongs to, cohorts the user teaches)"""
+    session = get_session()
+    try:
+        joined = session.scalars(
+            select(Cohort).join(CohortMember, CohortMember.cohort_id == Cohort.id)
+            .where(CohortMember.user_id == user_id).order_by(Cohort.name)
+        ).all()
+        teaching = session.scalars(
+            select(Cohort).where(Cohort.instructor_id == user_id).order_by(Cohort.name)
+        ).all()
+        session.expunge_all()
+        return joined, teaching
+    finally:
+        session.close()
+
+
+def recompute_cohort_stats(cohort_id):
+    """Rebuild one cohort's aggregates from members' Progress, focus and plans.
+
+    Run nightly to correct any drift in the incrementally maintained rows.
+    """
+    from activity_log import STUDY_KINDS
+    session = get_session()
+    try:
+        members = select(CohortMember.user_id).where(CohortMember.cohort_id == cohort_id)
+        daily = {}
+        for day, subject, hours in session.execute(
+            select(Progress.date, Progress.subject, func.sum(Progress.hours_studied))
+            .where(Progress.user_id.in_(members)).group_by(Progress.date, Progress.subject)
+        ):
+            daily[(day, subject)] = {"hours": hours, "focus_minutes": 0.0}
+        for day, minutes in session.execute(
+            select(DailyFocus.date, func.sum(DailyFocus.minutes))
+            .where(DailyFocus.user_id.in_(members), DailyFocus.kind.in_(STUDY_KINDS)).group_by(DailyFocus.date)
+        ):
+            daily[(day, FOCUS_ROW)] = {"hours": 0.0, "focus_minutes": minutes}
+        plans = session.execute(
+            select(StudyPlan.subject, func.sum(StudyPlan.hours), func.count(func.distinct(StudyPlan.user_id)))
+            .where(StudyPlan.user_id.in_(members)).group_by(StudyPlan.subject)
+        ).all()
+        member_count = session.scalar(select(func.count()).select_from(members.subquery()))
+
+        session.execute(delete(CohortDailyStats).where(CohortDailyStats.cohort_id == cohort_id))
+        session.execute(delete(CohortPlanStats).where(CohortPlanStats.cohort_id == cohort_id))
+        if daily:
+            session.execute(insert(CohortDailyStats.__table__), [
+                {"cohort_id": cohort_id, "date": day, "subject": subject, **values}
+                for (day, subject), values in daily.items()
+            ])
+        if plans:
+            session.execute(insert(CohortPlanStats.__table__), [
+                {"cohort_id": cohort_id, "subject": subject, "planned_hours": hours, "students": students}
+                for subject, hours, students in plans
+            ])
+        session.query(Cohort).filter_by(id=cohort_id).update({
+            "member_count": member_count,
+            "stats_recomputed_at": datetime.utcnow()
+        })
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+def recompute_all_cohort_stats():
+    session = get_session()
+    try:
+        cohort_ids = session.scalars(select(Cohort.id)).all()
+    finally:
+        session.close()
+    for cohort_id in cohort_ids:
+        recompute_cohort_stats(cohort_id)
+    return len(cohort_ids)
+
+
+def needs_recompute(cohort, now=None):
+    now = now or datetime.utcnow()
+    return cohort.stats_recomputed_at is None or now - cohort.stats_recomputed_at >= RECOMPUTE_INTERVAL
+
+
+def get_cohort_dashboard(cohort_id, days=DASHBOARD_DAYS, today=None):
+    """Cohort totals over the last few days, read only from the aggregate tables.
+
+    The work depends on days x subjects, not on how many students are in
+    the cohort.
+    """
+    today = today or date.today()
+    first_day = today - timedelta(days=days - 1)
+    session = get_session()
+    try:
+        cohort = session.get(Cohort, cohort_id)
+        rows = session.execute(
+            select(CohortDailyStats.date, CohortDailyStats.subject, CohortDailyStats.hours, CohortDailyStats.focus_minutes)
+            .where(CohortDailyStats.cohort_id == cohort_id, CohortDailyStats.date.between(first_day, today))
+        ).all()
+        plans = session.execute(
+            select(CohortPlanStats.subject, CohortPlanStats.planned_hours, CohortPlanStats.students)
+            .where(CohortPlanStats.cohort_id == cohort_id)
+        ).all()
+        member_count = cohort.member_count
+    finally:
+        session.close()
+
+    daily_hours = np.zeros(days)
+    focus_minutes = np.zeros(days)
+    subject_hours = {}
+    for day, subject, hours, minutes in rows:
+        index = (day - first_day).days
+        daily_hours[index] += hours
+        focus_minutes[index] += minutes
+        if subject != FOCUS_ROW:
+            subject_hours[subject] = subject_hours.get(subject, 0.0) + hours
+
+    subjects = {}
+    for subject, planned, students in plans:
+        studied = subject_hours.get(subject, 0.0)
+        planned_total = max(0.0, planned) * days
+        subjects[subject] = {
+            "hours": studied,
+            "planned_hours": planned_total,
+            "students": students,
+            "adherence": studied / planned_total if planned_total > 0 else None,
+        }
+    for subject, studied in subject_hours.items():
+        subjects.setdefault(subject, {"hours": studied, "planned_hours": 0.0, "students": 0, "adherence": None})
+
+    total_planned = sum(item["planned_hours"] for item in subjects.values())
+    return {
+        "member_count": member_count,
+        "dates": [first_day + timedelta(days=i) for i in range(days)],
+        "daily_hours": daily_hours,
+        "focus_minutes": focus_minutes,
+        "subjects": dict(sorted(subjects.items(), key=lambda item: -item[1]["hours"])),
+        "total_hours": float(daily_hours.sum()),
+        "total_focus_minutes": float(focus_minutes.sum()),
+        "adherence": float(daily_hours.sum()) / total_planned if total_planned > 0 else None,
+        "hours_per_student": float(daily_hours.sum()) / member_count if member_count else 0.0,
+    }
+
+
+def create_cohort_subject_chart(dashboard):
+    subjects = list(dashboard["subjects"])
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=subjects, y=[dashboard["subjects"][s]["hours"] for s in subjects],
+                         name="Studied", marker_color="#42a5f5"))
+    fig.add_trace(go.Bar(x=subjects, y=[dashboard["subjects"][s]["planned_hours"] for s in subjects],
+                         name="Planned", marker_color="#bdbdbd"))
+    fig.update_layout(
+        title="Cohort Hours by Subject",
+        xaxis_title="Subjects",
+        yaxis_title="Hours",
+        barmode="group",
+        plot_bgcolor="rgba(0,0,0,0)"
+    )
+    return fig
+
+
+def create_cohort_daily_chart(dashboard):
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=dashboard["dates"], y=dashboard["daily_hours"], name="Hours studied", marker_color="#66bb6a"))
+    fig.add_trace(go.Scatter(x=dashboard["dates"], y=dashboard["focus_minutes"] / 60, name="Focus hours",
+                             mode="lines+markers", line=dict(color="#ab47bc")))
+    fig.update_layout(
+        title="Cohort Study Time per Day",
+        xaxis_title="Date",
+        yaxis_title="Hours",
+        plot_bgcolor="rgba(0,0,0,0)",
+        hovermode="x"
+    )
+    return fig
+
+
+def _benchmark(sizes=(100, 1000), days=180):
+    """Dashboard load time against cohort size, next to a direct scan of members' Progress"""
+    import os
+    import tempfile
+    import time
+    from sqlalchemy import create_engine
+    import database
+    from models import Base, User
+
+    workdir = tempfile.mkdtemp()
+    engine = create_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    Base.metadata.create_all(bind=engine)
+    database.SessionLocal.configure(bind=engine)
+
+    subjects = ["Mathematics", "Physics", "Chemistry"]
+    today = date.today()
+    next_user = 1
+    with database.SessionLocal() as session:
+        session.add(User(id=1, username="instructor", password="x"))
+        session.commit()
+    for size in sizes:
+        cohort = create_cohort(f"Cohort of {size}", 1)
+        with database.SessionLocal() as session:
+            users = list(range(next_user + 1, next_user + size + 1))
+            next_user += size
+            session.execute(insert(User), [{"id": u, "username": f"student{u}", "password": "x"} for u in users])
+            session.execute(insert(CohortMember), [{"cohort_id": cohort.id, "user_id": u} for u in users])
+            session.execute(insert(StudyPlan), [
+                {"user_id": u, "subject": s, "hours": 1.0, "priority": "medium", "difficulty": "medium", "study_days": "Mon"}
+                for u in users for s in subjects
+            ])
+            session.execute(insert(Progress), [
+                {"user_id": u, "subject": s, "date": today - timedelta(days=d), "hours_studied": (u + d) % 3 * 0.5}
+                for u in users for d in range(days) for s in subjects
+            ])
+            session.commit()
+        recompute_cohort_stats(cohort.id)
+
+        def timed(fn, repeat=20):
+            started = time.perf_counter()
+            for _ in range(repeat):
+                fn()
+            return (time.perf_counter() - started) / repeat * 1000
+
+        def scan():
+            with database.SessionLocal() as session:
+                members = select(CohortMember.user_id).where(CohortMember.cohort_id == cohort.id)
+                session.execute(
+                    select(Progress.date, Progress.subject, func.sum(Progress.hours_studied))
+                    .where(Progress.user_id.in_(members), Progress.date >= today - timedelta(days=DASHBOARD_DAYS - 1))
+                    .group_by(Progress.date, Progress.subject)
+                ).all()
+
+        print(f"{size:5d} students: dashboard {timed(lambda: get_cohort_dashboard(cohort.id)):6.1f} ms   "
+              f"scanning Progress {timed(scan, 5):7.1f} ms")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Maintain cohort aggregates")
+    parser.add_argument("command", choices=["recompute", "benchmark"],
+                        help="recompute: rebuild every cohort's aggregates (run nightly, e.g. from cron); "
+                             "benchmark: time the dashboard against cohort size on a scratch database")
+    args = parser.parse_args()
+    if args.command == "benchmark":
+        _benchmark()
+    else:
+        print(f"Recomputed {recompute_all_cohort_stats()} cohorts")
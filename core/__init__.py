@@ -0,0 +1,21 @@
+"""Planning, persistence and analytics without any Streamlit dependency.
+
+Both the Streamlit app and the local JSON API (api_server.py) build on
+these functions, so they can also be used from scripts or other frontends.
+"""
+from core.auth import authenticate, register_user, get_user
+from core.plans import generate_ai_study_plan, save_user_state, load_user_state, recommend_resources
+from core.progress import save_daily_progress, get_recent_progress, get_progress_since, get_timer_hours
+from core.preferences import get_preferences, save_preferences
+from activity_log import record_event, project_events, replay_events, get_daily_focus
+from core.sessions import (
+    init_focus_files,
+    save_focus_session,
+    get_focus_sessions,
+    save_session,
+    load_sessions,
+    get_focus_history,
+    get_pomodoro_history,
+)
+from core.blocked_sites import get_blocked_sites, add_blocked_sites, remove_blocked_sites, is_site_blocked
+from core.rerun_data import RerunData
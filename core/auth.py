@@ -0,0 +1,60 @@
+from sqlalchemy.exc import IntegrityError
+from database import get_session
+from models import User
+from passwords import get_password_hasher, needs_rehash
+
+def authenticate(username, password):
+    """The user if the password matches, else None.
+
+    Hashes are checked on the shared PasswordHasher pool, outside any
+    database transaction. Hashes from an older scheme are replaced on a
+    successful login, unless the password changed in the meantime.
+    """
+    hasher = get_password_hasher()
+    session = get_session()
+    try:
+        user = session.query(User).filter_by(username=username).first()
+    finally:
+        session.close()
+    if user is None:
+        hasher.verify_missing(password)
+        return None
+    if not hasher.verify(user.password, password):
+        return None
+    if needs_rehash(user.password):
+        upgraded = hasher.hash(password)
+        session = get_session()
+        try:
+            session.query(User).filter_by(id=user.id, password=user.password).update({"password": upgraded})
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+        user.password = upgraded
+    return user
+
+def register_user(username, password):
+    """Create a user with one insert; False if the username is taken (the unique constraint decides)"""
+    password_hash = get_password_hasher().hash(password)
+    session = get_session()
+    try:
+        session.add(User(username=username, password=password_hash))
+        session.commit()
+        return True
+    except IntegrityError:
+        session.rollback()
+        return False
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+def get_user(user_id):
+    session = get_session()
+    try:
+        return session.get(User, user_id)
+    finally:
+        session.close()
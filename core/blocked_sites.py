@@ -0,0 +1,24 @@
+from blocklist import get_store, import_blocklist
+
+BLOCKED_SITES_FILE = "blocked_sites.json"
+
+def get_blocked_sites():
+    return sorted(get_store(BLOCKED_SITES_FILE).sites)
+
+def is_site_blocked(url):
+    return get_store(BLOCKED_SITES_FILE).is_blocked(url)
+
+def add_blocked_site(site):
+    return add_blocked_sites([site]) > 0
+
+def add_blocked_sites(sites):
+    return get_store(BLOCKED_SITES_FILE).add_many(sites)
+
+def remove_blocked_site(site):
+    return remove_blocked_sites([site]) > 0
+
+def remove_blocked_sites(sites):
+    return get_store(BLOCKED_SITES_FILE).remove_many(sites)
+
+def import_blocked_sites(lines, progress_callback=None):
+    return import_blocklist(lines, get_store(BLOCKED_SITES_FILE), progress_callback=progress_callback)
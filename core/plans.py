@@ -0,0 +1,13 @@
+from study_planner import (
+    generate_ai_study_plan,
+    generate_spaced_repetition_schedule,
+    save_user_state,
+    load_user_state,
+    update_plan_hours,
+    get_plan_cache_stats,
+    get_generation_cache_stats,
+    recommend_resources,
+)
+from allocation import allocate_hours
+from replanning import replan_after_progress
+from feasibility import get_adherence_history, simulate_feasibility
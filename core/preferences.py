@@ -0,0 +1,51 @@
+from database import get_session
+from models import UserPreferences
+from reminders import reschedule_user, parse_reminder_time
+
+PREFERENCE_FIELDS = ("focus_minutes", "break_minutes", "daily_reminders", "weekly_reports",
+                     "reminder_time", "report_weekday")
+DEFAULT_PREFERENCES = {
+    "focus_minutes": 45,
+    "break_minutes": 5,
+    "daily_reminders": True,
+    "weekly_reports": True,
+    "reminder_time": "18:00",
+    "report_weekday": 6,
+}
+
+def _as_dict(row):
+    return {field: getattr(row, field) for field in PREFERENCE_FIELDS}
+
+def get_preferences(user_id):
+    """Saved preferences, or the defaults if the user never saved any"""
+    session = get_session()
+    try:
+        row = session.get(UserPreferences, user_id)
+        return _as_dict(row) if row else dict(DEFAULT_PREFERENCES)
+    finally:
+        session.close()
+
+def save_preferences(user_id, preferences):
+    """Store preferences and move the user's reminder and report deadlines to match"""
+    unknown = set(preferences) - set(PREFERENCE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown preferences: {', '.join(sorted(unknown))}")
+    if "reminder_time" in preferences:
+        parse_reminder_time(preferences["reminder_time"])
+    session = get_session()
+    try:
+        row = session.get(UserPreferences, user_id)
+        if row is None:
+            row = UserPreferences(user_id=user_id, **DEFAULT_PREFERENCES)
+            session.add(row)
+        for field, value in preferences.items():
+            setattr(row, field, value)
+        session.commit()
+        saved = _as_dict(row)
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+    reschedule_user(user_id, saved)
+    return saved
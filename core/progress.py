@@ -0,0 +1,92 @@
+from datetime import date
+from sqlalchemy import func
+from database import get_session
+from models import Progress
+from cohorts import member_cohort_ids, apply_progress_delta
+from leaderboards import refresh_leaderboards
+from forecasting import invalidate_trends
+
+def save_daily_progress(user_id, hours_by_subject, day=None):
+    """Record hours per subject for a day, replacing anything already entered for it.
+
+    Hours projected from timer sessions are kept; these are added on top.
+    """
+    day = day or date.today()
+    session = get_session()
+    try:
+        manual = session.query(Progress).filter(
+            Progress.user_id == user_id,
+            Progress.date == day,
+            Progress.subject.in_(hours_by_subject.keys()),
+            Progress.source.is_(None)
+        )
+        if member_cohort_ids(session, user_id):
+            previous = dict(manual.with_entities(Progress.subject, func.sum(Progress.hours_studied))
+                            .group_by(Progress.subject).all())
+            apply_progress_delta(session, user_id, {
+                (day, subject): hours - previous.get(subject, 0.0)
+                for subject, hours in hours_by_subject.items()
+            })
+        manual.delete(synchronize_session=False)
+        for subject, hours in hours_by_subject.items():
+            session.add(Progress(
+                user_id=user_id,
+                subject=subject,
+                date=day,
+                hours_studied=hours
+            ))
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+    invalidate_trends(user_id, day)
+    refresh_leaderboards([user_id])
+
+def get_recent_progress(user_id, limit):
+    """Most recent hours per day and subject, newest first; manual and timer hours are summed"""
+    session = get_session()
+    try:
+        rows = session.query(
+            Progress.date, Progress.subject, func.sum(Progress.hours_studied)
+        ).filter_by(
+            user_id=user_id
+        ).group_by(Progress.date, Progress.subject).order_by(Progress.date.desc()).limit(limit).all()
+        return [
+            {"date": day, "subject": subject, "hours_studied": hours}
+            for day, subject, hours in rows
+        ]
+    finally:
+        session.close()
+
+def get_progress_since(user_id, since):
+    """Hours per day and subject from since through today, newest first; manual and timer hours are summed"""
+    session = get_session()
+    try:
+        rows = session.query(
+            Progress.date, Progress.subject, func.sum(Progress.hours_studied)
+        ).filter(
+            Progress.user_id == user_id,
+            Progress.date >= since
+        ).group_by(Progress.date, Progress.subject).order_by(Progress.date.desc()).all()
+        return [
+            {"date": day, "subject": subject, "hours_studied": hours}
+            for day, subject, hours in rows
+        ]
+    finally:
+        session.close()
+
+def get_timer_hours(user_id, day=None):
+    """Hours per subject logged by subject-tagged timers on a day"""
+    day = day or date.today()
+    session = get_session()
+    try:
+        rows = session.query(Progress.subject, func.sum(Progress.hours_studied)).filter(
+            Progress.user_id == user_id,
+            Progress.date == day,
+            Progress.source.isnot(None)
+        ).group_by(Progress.subject).all()
+        return dict(rows)
+    finally:
+        session.close()
@@ -0,0 +1,5 @@
+from report_generator import generate_study_report, generate_study_schedule_csv
+from data_export import export_user_data, export_user_data_to_file
+from progress_import import import_progress_csv
+from forecasting import get_progress_forecast
+from leaderboards import get_leaderboard
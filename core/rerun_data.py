@@ -0,0 +1,87 @@
+from collections import Counter
+from datetime import date, timedelta
+from database import io_counts
+from core.plans import recommend_resources
+from core.preferences import get_preferences
+from core.progress import get_progress_since, get_timer_hours
+from core.sessions import get_focus_history, get_pomodoro_history
+from forecasting import get_trends
+from heatmaps import get_calendar_heatmap, get_hourly_matrix
+from notes import get_due_counts
+
+# Longest progress window any view shows; shorter ones are sliced from it
+HISTORY_DAYS = 30
+
+
+class RerunData:
+    """The data one user's page needs, each dataset fetched at most once per Streamlit rerun.
+
+    Make a new one at the top of every rerun and hand it to the sections.
+    Datasets load the first time a section asks for them, so a section
+    that isn't shown costs nothing, and every later caller in the same
+    rerun shares the result. stats() counts the SQL statements and data
+    file reads made on the creating thread since the context was created.
+    """
+
+    def __init__(self, user_id, today=None):
+        self.user_id = user_id
+        self.today = today or date.today()
+        self.values = {}
+        # The creating thread's running totals, so stats() can be read from any thread
+        self.counts = io_counts()
+        self.started = Counter(self.counts)
+
+    def _once(self, key, load, *args):
+        if key not in self.values:
+            self.values[key] = load(*args)
+        return self.values[key]
+
+    def progress_history(self, days=HISTORY_DAYS):
+        """Hours per day and subject over the last `days` days including today, newest first"""
+        if days > HISTORY_DAYS:
+            raise ValueError(f"Progress history only covers the last {HISTORY_DAYS} days")
+        rows = self._once("progress", get_progress_since, self.user_id, self.today - timedelta(days=HISTORY_DAYS - 1))
+        since = self.today - timedelta(days=days - 1)
+        return [row for row in rows if row["date"] >= since]
+
+    def timer_hours(self):
+        return self._once("timer_hours", get_timer_hours, self.user_id, self.today)
+
+    def focus_history(self):
+        return self._once("focus_history", get_focus_history)
+
+    def pomodoro_history(self):
+        return self._once("pomodoro_history", get_pomodoro_history)
+
+    def resources(self, subjects):
+        subjects = tuple(subjects)
+        return self._once(("resources", subjects), recommend_resources, list(subjects))
+
+    def trends(self):
+        return self._once("trends", get_trends, self.user_id, self.today)
+
+    def today_hours(self):
+        """Today's hours per subject, taken from the progress history rather than another query"""
+        return {row["subject"]: row["hours_studied"] for row in self.progress_history(1)}
+
+    def forecast(self, exam_date):
+        return self._once(("forecast", exam_date), self.trends().forecast, exam_date, self.today, self.today_hours())
+
+    def calendar(self):
+        return self._once("calendar", lambda: get_calendar_heatmap(
+            self.user_id, self.today, trends=self.trends(), today_hours=self.today_hours()
+        ))
+
+    def due_flashcards(self):
+        return self._once("due_flashcards", get_due_counts, self.user_id, self.today)
+
+    def preferences(self):
+        return self._once("preferences", get_preferences, self.user_id)
+
+    def hourly(self):
+        return self._once("hourly", get_hourly_matrix, self.user_id, self.focus_history(), self.pomodoro_history())
+
+    def stats(self):
+        counts = Counter(self.counts)
+        counts.subtract(self.started)
+        return {"queries": counts["queries"], "file_reads": counts["file_reads"], "datasets": len(self.values)}
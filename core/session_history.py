@@ -0,0 +1,257 @@
+import threading
+import warnings
+from datetime import datetime, timedelta
+import numpy as np
+
+EPOCH = datetime(1970, 1, 1)
+INITIAL_CAPACITY = 64
+# user column value for sessions saved without a user
+NO_USER = -1
+
+
+def to_epoch(value):
+    """Seconds since 1970 for a stored ISO timestamp, keeping wall-clock time"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return (value.replace(tzinfo=None) - EPOCH).total_seconds()
+
+
+def to_epoch_array(values):
+    """Vectorized to_epoch; NumPy parses plain ISO timestamps without a Python loop"""
+    try:
+        with warnings.catch_warnings():
+            # NumPy would shift timezone-aware values to UTC; fall back to keep wall-clock time
+            warnings.simplefilter("error", DeprecationWarning)
+            return np.array(values, dtype="datetime64[us]").astype(np.int64) / 1e6
+    except (ValueError, DeprecationWarning):
+        return np.array([to_epoch(value) for value in values], dtype=np.float64)
+
+
+def from_epoch(seconds):
+    return EPOCH + timedelta(seconds=float(seconds))
+
+
+class SessionHistory:
+    """Session log held as parallel NumPy columns instead of a list of dicts.
+
+    start/end are epoch seconds (wall-clock, no timezone), duration is in
+    minutes, kind indexes into type_names, distractions is the per-session
+    count and user is the owner's id (NO_USER if none was recorded). Columns grow by doubling, so append() is amortized O(1).
+
+    Counts and totals per type are kept as running totals, and the windowed
+    reads (recent, between, page) only touch the rows they return, so the
+    cost of showing history doesn't grow with the number of sessions.
+    """
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self.size = 0
+        self.type_names = []
+        self._type_codes = {}
+        self.start = np.empty(capacity, dtype=np.float64)
+        self.end = np.empty(capacity, dtype=np.float64)
+        self.duration = np.empty(capacity, dtype=np.float32)
+        self.kind = np.empty(capacity, dtype=np.int8)
+        self.distractions = np.empty(capacity, dtype=np.int32)
+        self.user = np.empty(capacity, dtype=np.int64)
+        # Running totals, indexed by type code
+        self.type_counts = []
+        self.type_minutes = []
+        self.minutes_total = 0.0
+        self.distractions_total = 0
+        # Sessions are normally appended in start order, which lets windows use binary search
+        self.ordered = True
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_records(cls, records):
+        history = cls(max(INITIAL_CAPACITY, len(records)))
+        n = len(records)
+        history.start[:n] = to_epoch_array([record["start"] for record in records])
+        history.end[:n] = to_epoch_array([record["end"] for record in records])
+        if all("duration" in record for record in records):
+            history.duration[:n] = [record["duration"] for record in records]
+        else:
+            history.duration[:n] = (history.end[:n] - history.start[:n]) / 60
+        history.kind[:n] = [history._code(record.get("type")) for record in records]
+        history.distractions[:n] = [record.get("distractions", 0) for record in records]
+        history.user[:n] = [record.get("user_id", NO_USER) for record in records]
+        history.size = n
+
+        kinds = history.kind[:n]
+        durations = history.duration[:n].astype(np.float64)
+        n_types = len(history.type_names)
+        history.type_counts = np.bincount(kinds, minlength=n_types).tolist()
+        history.type_minutes = np.bincount(kinds, weights=durations, minlength=n_types).tolist()
+        history.minutes_total = float(durations.sum())
+        history.distractions_total = int(history.distractions[:n].sum(dtype=np.int64))
+        history.ordered = bool(np.all(np.diff(history.start[:n]) >= 0))
+        return history
+
+    def __len__(self):
+        return self.size
+
+    def _code(self, session_type):
+        code = self._type_codes.get(session_type)
+        if code is None:
+            code = self._type_codes[session_type] = len(self.type_names)
+            self.type_names.append(session_type)
+            self.type_counts.append(0)
+            self.type_minutes.append(0.0)
+        return code
+
+    def _grow(self):
+        capacity = len(self.start) * 2
+        for column in ("start", "end", "duration", "kind", "distractions", "user"):
+            old = getattr(self, column)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, column, new)
+
+    def append(self, record):
+        with self._lock:
+            if self.size == len(self.start):
+                self._grow()
+            i = self.size
+            self.start[i] = to_epoch(record["start"])
+            self.end[i] = to_epoch(record["end"])
+            self.duration[i] = record["duration"] if "duration" in record else (self.end[i] - self.start[i]) / 60
+            code = self.kind[i] = self._code(record.get("type"))
+            self.distractions[i] = record.get("distractions", 0)
+            self.user[i] = record.get("user_id", NO_USER)
+            if i and self.start[i] < self.start[i - 1]:
+                self.ordered = False
+
+            minutes = float(self.duration[i])
+            self.type_counts[code] += 1
+            self.type_minutes[code] += minutes
+            self.minutes_total += minutes
+            self.distractions_total += int(self.distractions[i])
+            self.size = i + 1
+
+    def count(self, session_type=None):
+        if session_type is None:
+            return self.size
+        code = self._type_codes.get(session_type)
+        return 0 if code is None else self.type_counts[code]
+
+    def total_minutes(self, session_type=None):
+        if session_type is None:
+            return self.minutes_total
+        code = self._type_codes.get(session_type)
+        return 0.0 if code is None else self.type_minutes[code]
+
+    def mean_minutes(self):
+        return self.minutes_total / self.size if self.size else 0.0
+
+    def total_distractions(self):
+        return self.distractions_total
+
+    def mean_distractions(self):
+        return self.distractions_total / self.size if self.size else 0.0
+
+    def start_dates(self):
+        """Session start days as datetime64[D]"""
+        return self.start[:self.size].astype("datetime64[s]").astype("datetime64[D]")
+
+    def record(self, i):
+        return {
+            "start": from_epoch(self.start[i]),
+            "end": from_epoch(self.end[i]),
+            "duration": float(self.duration[i]),
+            "type": self.type_names[self.kind[i]],
+            "distractions": int(self.distractions[i]),
+        }
+
+    def longest(self):
+        if not self.size:
+            return None
+        return self.record(int(np.argmax(self.duration[:self.size])))
+
+    def recent(self, n):
+        """The last n sessions, oldest first"""
+        return [self.record(i) for i in range(max(0, self.size - n), self.size)]
+
+    def between(self, start=None, end=None):
+        """Sessions starting in [start, end), oldest first"""
+        starts = self.start[:self.size]
+        low = -np.inf if start is None else to_epoch(start)
+        high = np.inf if end is None else to_epoch(end)
+        if self.ordered:
+            indexes = range(np.searchsorted(starts, low, "left"), np.searchsorted(starts, high, "left"))
+        else:
+            indexes = np.flatnonzero((starts >= low) & (starts < high))
+        return [self.record(int(i)) for i in indexes]
+
+    def page(self, before=None, limit=20):
+        """Newest-first page of sessions older than the cursor.
+
+        Returns (records, cursor); pass the cursor back as before= to load
+        the next page. The cursor is None once the oldest session is reached.
+        Cursors are row positions, which stay valid as new sessions are
+        appended.
+        """
+        stop = self.size if before is None else max(0, min(before, self.size))
+        first = max(0, stop - limit)
+        records = [self.record(i) for i in range(stop - 1, first - 1, -1)]
+        return records, (first if first > 0 else None)
+
+
+if __name__ == "__main__":
+    # Benchmark: 100k pomodoro sessions as a list of dicts (as json.load
+    # returns them) versus columns, for the stats the timer widget shows.
+    import json
+    import time
+    import tracemalloc
+
+    N = 100_000
+    first = datetime(2020, 1, 1, 8)
+    records = []
+    for i in range(N):
+        start = first + timedelta(minutes=30 * i)
+        length = 25 if i % 2 == 0 else 5
+        records.append({
+            "start": start.isoformat(),
+            "end": (start + timedelta(minutes=length)).isoformat(),
+            "type": "Work" if i % 2 == 0 else "Break",
+        })
+    payload = json.dumps(records)
+
+    tracemalloc.start()
+    sessions = json.loads(payload)
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    history = SessionHistory.from_records(sessions)
+    column_bytes = sum(getattr(history, c)[:history.size].nbytes
+                       for c in ("start", "end", "duration", "kind", "distractions"))
+
+    def dict_stats():
+        work = sum(1 for s in sessions if s["type"] == "Work")
+        breaks = sum(1 for s in sessions if s["type"] == "Break")
+        minutes = sum(
+            (datetime.fromisoformat(s["end"]) - datetime.fromisoformat(s["start"])).total_seconds() / 60
+            for s in sessions if s["type"] == "Work"
+        )
+        return work, breaks, minutes
+
+    def column_stats():
+        return history.count("Work"), history.count("Break"), history.total_minutes("Work")
+
+    def timed(fn, repeat=5):
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - started)
+        return best, result
+
+    dict_time, dict_result = timed(dict_stats)
+    column_time, column_result = timed(column_stats)
+    assert dict_result[:2] == column_result[:2] and abs(dict_result[2] - column_result[2]) < 1e-6
+
+    build_time, _ = timed(lambda: SessionHistory.from_records(sessions), repeat=1)
+    print(f"{N:,} sessions")
+    print(f"memory:  list of dicts {dict_bytes / 2**20:6.1f} MB   columns {column_bytes / 2**20:6.1f} MB")
+    print(f"stats:   list of dicts {dict_time * 1000:6.1f} ms   running totals {column_time * 1e6:6.1f} us")
+    print(f"last 5 + load-more page: {timed(lambda: (history.recent(5), history.page(before=N - 5, limit=20)))[0] * 1e6:.0f} us")
+    print(f"one-off column build {build_time * 1000:.0f} ms")
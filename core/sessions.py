@@ -0,0 +1,147 @@
+import json
+import os
+import threading
+from database import io_counts
+from file_lock import file_lock, replace_atomically
+from core.blocked_sites import BLOCKED_SITES_FILE
+from core.session_history import SessionHistory
+from activity_log import record_event, FOCUS, POMODORO_WORK, POMODORO_BREAK
+
+# The session files stay alongside the activity log: they also hold timer
+# sessions run without a logged-in user, which the log can't record, and the
+# timer widgets, heatmaps and session API read them. The log is the source of
+# truth for study time; Progress and DailyFocus are projected from it alone.
+FOCUS_SESSIONS_FILE = "focus_sessions.json"
+POMODORO_FILE = "pomodoro_sessions.json"
+
+# path -> (file signature, SessionHistory)
+_histories = {}
+_histories_lock = threading.Lock()
+
+def init_focus_files():
+    if not os.path.exists(FOCUS_SESSIONS_FILE):
+        with open(FOCUS_SESSIONS_FILE, "w") as f:
+            json.dump([], f)
+    
+    if not os.path.exists(BLOCKED_SITES_FILE):
+        with open(BLOCKED_SITES_FILE, "w") as f:
+            json.dump([], f)
+
+def save_focus_session(start, end, distractions=0, user_id=None, subject=None):
+    session = {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "duration": (end - start).total_seconds() / 60,
+        "distractions": distractions
+    }
+    if user_id is not None:
+        session["user_id"] = user_id
+    
+    _append_session(FOCUS_SESSIONS_FILE, session)
+    if user_id is not None:
+        record_event(user_id, FOCUS, start, end, subject, distractions)
+
+def _load_sessions(path):
+    io_counts()["file_reads"] += 1
+    with open(path, "r") as f:
+        return json.load(f)
+
+def _read_sessions(path):
+    # Appends rewrite the end of the file in place, so read under the same lock
+    with file_lock(path):
+        return _load_sessions(path)
+
+def get_focus_sessions():
+    if os.path.exists(FOCUS_SESSIONS_FILE):
+        return _read_sessions(FOCUS_SESSIONS_FILE)
+    return []
+
+def save_session(start_time, end_time, session_type, user_id=None, subject=None):
+    session = {
+        "start": start_time.isoformat(),
+        "end": end_time.isoformat(),
+        "type": session_type
+    }
+    if user_id is not None:
+        session["user_id"] = user_id
+    
+    _append_session(POMODORO_FILE, session)
+    if user_id is not None:
+        kind = POMODORO_WORK if session_type == "Work" else POMODORO_BREAK
+        record_event(user_id, kind, start_time, end_time, subject)
+
+def load_sessions():
+    if os.path.exists(POMODORO_FILE):
+        return _read_sessions(POMODORO_FILE)
+    return []
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def _append_to_json_array(path, record):
+    """Append to a JSON array file in place by rewriting only its closing bracket"""
+    try:
+        with open(path, "rb+") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - 64))
+            tail = f.read()
+            stripped = tail.rstrip()
+            if not stripped.endswith(b"]"):
+                return False
+            body = stripped[:-1].rstrip()
+            if not body:
+                return False
+            empty = body.endswith(b"[")
+            f.seek(size - len(tail) + len(stripped) - 1)
+            f.write((b"" if empty else b", ") + json.dumps(record).encode() + b"]")
+            f.truncate()
+        return True
+    except FileNotFoundError:
+        return False
+
+def _append_session(path, session):
+    with _histories_lock:
+        # Other processes append to the same file, so the whole read-modify-write holds the file lock
+        with file_lock(path):
+            before = _signature(path)
+            if not _append_to_json_array(path, session):
+                sessions = []
+                if before is not None:
+                    sessions = _load_sessions(path)
+                
+                sessions.append(session)
+                
+                replace_atomically(path, lambda f: json.dump(sessions, f))
+            after = _signature(path)
+        
+        # Keep a cached history in step instead of rebuilding it on the next read
+        cached = _histories.get(path)
+        if cached is not None and cached[0] == before:
+            cached[1].append(session)
+            _histories[path] = (after, cached[1])
+        else:
+            _histories.pop(path, None)
+
+def _get_history(path):
+    with _histories_lock:
+        signature = _signature(path)
+        cached = _histories.get(path)
+        if cached is None or cached[0] != signature:
+            with file_lock(path):
+                signature = _signature(path)
+                sessions = _load_sessions(path) if signature is not None else []
+            cached = _histories[path] = (signature, SessionHistory.from_records(sessions))
+        return cached[1]
+
+def get_focus_history():
+    """Focus sessions as a columnar SessionHistory, rebuilt only when the file changes"""
+    return _get_history(FOCUS_SESSIONS_FILE)
+
+def get_pomodoro_history():
+    """Pomodoro sessions as a columnar SessionHistory, rebuilt only when the file changes"""
+    return _get_history(POMODORO_FILE)
@@ -0,0 +1,157 @@
+import csv
+import io
+import json
+import tempfile
+import zipfile
+from datetime import date, datetime
+from sqlalchemy import select
+from database import get_session
+from models import User, StudyPlan, Progress, ActivityEvent, StudyNote
+from core.sessions import get_focus_sessions, load_sessions
+
+EXPORT_BATCH_SIZE = 1000
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _write_jsonl(zf, name, rows):
+    with zf.open(name, "w", force_zip64=True) as member:
+        text = io.TextIOWrapper(member, encoding="utf-8", newline="\n")
+        for row in rows:
+            text.write(json.dumps(row, default=_json_default))
+            text.write("\n")
+        text.flush()
+        text.detach()
+
+
+def _write_csv(zf, name, header, rows):
+    with zf.open(name, "w", force_zip64=True) as member:
+        text = io.TextIOWrapper(member, encoding="utf-8", newline="")
+        writer = csv.writer(text)
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow(row)
+        text.flush()
+        text.detach()
+
+
+def _stream_rows(session, stmt):
+    """Yield plain row dicts without holding the whole result in memory"""
+    result = session.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for row in result.mappings():
+        yield dict(row)
+
+
+def _stream_tuples(session, stmt):
+    result = session.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for partition in result.partitions():
+        yield from partition
+
+
+def _owned_by(user_id, records):
+    return (record for record in records if record.get("user_id") == user_id)
+
+
+def export_user_data(user_id, fileobj, session=None, include_local_files=True):
+    """Write every record belonging to a user into a zip archive.
+
+    Database tables are read in batches so memory use does not grow with the
+    amount of history. Focus/pomodoro sessions live in local files shared by
+    every user, so only the records saved with this user's id are included;
+    sessions without an owner and the shared blocklist are left out.
+    """
+    own_session = session is None
+    if own_session:
+        session = get_session()
+    try:
+        with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            _write_jsonl(zf, "user.jsonl", _stream_rows(session, select(
+                User.id, User.username, User.created_at
+            ).where(User.id == user_id)))
+
+            _write_jsonl(zf, "study_plans.jsonl", _stream_rows(session, select(
+                StudyPlan.subject, StudyPlan.hours, StudyPlan.priority,
+                StudyPlan.difficulty, StudyPlan.study_days, StudyPlan.created_at
+            ).where(StudyPlan.user_id == user_id).order_by(StudyPlan.id)))
+
+            _write_csv(zf, "progress.csv", ["date", "subject", "hours_studied", "recorded_at"], _stream_tuples(session, select(
+                Progress.date, Progress.subject, Progress.hours_studied, Progress.recorded_at
+            ).where(Progress.user_id == user_id).order_by(Progress.date, Progress.id)))
+
+            _write_jsonl(zf, "activity_events.jsonl", _stream_rows(session, select(
+                ActivityEvent.kind, ActivityEvent.subject, ActivityEvent.started_at,
+                ActivityEvent.ended_at, ActivityEvent.minutes, ActivityEvent.distractions
+            ).where(ActivityEvent.user_id == user_id).order_by(ActivityEvent.id)))
+
+            _write_jsonl(zf, "study_notes.jsonl", _stream_rows(session, select(
+                StudyNote.subject, StudyNote.kind, StudyNote.title, StudyNote.body,
+                StudyNote.review_step, StudyNote.due_date, StudyNote.created_at
+            ).where(StudyNote.user_id == user_id).order_by(StudyNote.id)))
+
+            if include_local_files:
+                _write_jsonl(zf, "focus_sessions.jsonl", _owned_by(user_id, get_focus_sessions()))
+                _write_jsonl(zf, "pomodoro_sessions.jsonl", _owned_by(user_id, load_sessions()))
+    finally:
+        if own_session:
+            session.close()
+
+
+def export_user_data_to_file(user_id):
+    """Export into a temp file and return its path, like the PDF report; the caller deletes it"""
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".zip")
+    with temp_file:
+        export_user_data(user_id, temp_file)
+    return temp_file.name
+
+
+if __name__ == "__main__":
+    # Benchmark: export a user with a million progress rows and report peak memory
+    import os
+    import time
+    import tracemalloc
+    from datetime import timedelta
+    from sqlalchemy import create_engine, insert
+    from sqlalchemy.orm import sessionmaker
+    from models import Base
+
+    rows = 1_000_000
+    workdir = tempfile.mkdtemp()
+    engine = create_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    Base.metadata.create_all(bind=engine)
+    BenchSession = sessionmaker(bind=engine)
+
+    with BenchSession() as session:
+        session.add(User(id=1, username="bench", password="x"))
+        start = date(2000, 1, 1)
+        subjects = ["Mathematics", "Physics", "Chemistry", "Biology"]
+        batch = []
+        for i in range(rows):
+            batch.append({
+                "user_id": 1,
+                "subject": subjects[i % len(subjects)],
+                "date": start + timedelta(days=i // len(subjects)),
+                "hours_studied": (i % 8) / 2,
+            })
+            if len(batch) == 50_000:
+                session.execute(insert(Progress), batch)
+                batch = []
+        if batch:
+            session.execute(insert(Progress), batch)
+        session.commit()
+
+    out_path = os.path.join(workdir, "export.zip")
+    tracemalloc.start()
+    started = time.perf_counter()
+    with BenchSession() as session, open(out_path, "wb") as f:
+        export_user_data(1, f, session=session, include_local_files=False)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"Exported {rows} progress rows in {elapsed:.1f}s")
+    print(f"Archive size: {os.path.getsize(out_path) / 1e6:.1f} MB")
+    print(f"Peak traced memory: {peak / 1e6:.1f} MB")
@@ -1,7 +1,12 @@
-from sqlalchemy import create_engine
+import os
+import threading
+from collections import Counter
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 
-DATABASE_URL = "sqlite:///./study_planner.db"
+# Overridable so scripts such as the API load test can use a scratch database
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./study_planner.db")
 
 engine = create_engine(
     DATABASE_URL, 
@@ -10,4 +15,18 @@ engine = create_engine(
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_session():
-    return SessionLocal()
\ No newline at end of file
+    return SessionLocal()
+
+# Running totals of SQL statements ("queries") and data file reads ("file_reads") per
+# thread, so a caller such as a Streamlit rerun can see what a block of work fetched
+_io = threading.local()
+
+def io_counts():
+    counts = getattr(_io, "counts", None)
+    if counts is None:
+        counts = _io.counts = Counter()
+    return counts
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(*args):
+    io_counts()["queries"] += 1
@@ -0,0 +1,25 @@
+import os
+import streamlit as st
+
+
+def keep_download(key, path):
+    """Hold a prepared export file for offer_download, deleting any earlier one under the same key"""
+    discard_download(key)
+    st.session_state[key] = path
+
+
+def discard_download(key):
+    path = st.session_state.pop(key, None)
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+def offer_download(key, label, file_name, mime, **kwargs):
+    """Download button for a prepared file; the file is deleted once it has been downloaded"""
+    path = st.session_state.get(key)
+    if not path or not os.path.exists(path):
+        return False
+    with open(path, "rb") as f:
+        st.download_button(label, f, file_name=file_name, mime=mime,
+                           on_click=discard_download, args=(key,), **kwargs)
+    return True
@@ -0,0 +1,169 @@
+from datetime import date, timedelta
+import numpy as np
+import plotly.graph_objects as go
+from sqlalchemy import func, select
+from database import get_session
+from models import Progress
+
+DEFAULT_TRIALS = 20000
+HISTORY_DAYS = 90
+MIN_SUBJECT_SAMPLES = 5
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+# Assumed adherence for users without any recorded progress yet
+PRIOR_ADHERENCE = np.array([0.0, 0.5, 0.75, 0.9, 1.0, 1.0, 1.1, 1.25], dtype=np.float32)
+
+
+def get_adherence_history(user_id, plan, session=None, today=None):
+    """Daily studied/planned ratios per subject over its scheduled days in the recent history.
+
+    Hours are summed per day, so manual and timer rows for the same day make
+    one sample, and a scheduled day with nothing recorded counts as 0. The
+    window starts no earlier than the subject's plan or the user's first
+    recorded progress, and stops before today, which isn't over yet.
+    """
+    today = today or date.today()
+    planned = {item["subject"]: item for item in plan if item["hours"] > 0}
+    window_start = today - timedelta(days=HISTORY_DAYS)
+    own_session = session is None
+    if own_session:
+        session = get_session()
+    try:
+        first_day = session.scalar(select(func.min(Progress.date)).where(Progress.user_id == user_id))
+        rows = session.execute(
+            select(Progress.date, Progress.subject, func.sum(Progress.hours_studied)).where(
+                Progress.user_id == user_id,
+                Progress.date >= window_start,
+                Progress.date < today,
+                Progress.subject.in_(planned.keys()),
+            ).group_by(Progress.date, Progress.subject)
+        ).all()
+    finally:
+        if own_session:
+            session.close()
+
+    studied = {(day, subject): hours for day, subject, hours in rows}
+    ratios = {}
+    for subject, item in planned.items():
+        start = item.get("start_date") or first_day
+        if start is None:
+            ratios[subject] = np.array([], dtype=np.float32)
+            continue
+        days = (today - max(start, window_start)).days
+        window = [today - timedelta(days=n) for n in range(days, 0, -1)]
+        ratios[subject] = np.array([
+            studied.get((day, subject), 0.0) / hours
+            for day, hours in zip(window, planned_hours(item, window)) if hours > 0
+        ], dtype=np.float32)
+    return ratios
+
+
+def planned_hours(item, dates):
+    """Hours a plan item schedules on each of the dates.
+
+    Plans with several deadlines carry a day-by-day daily_allocation;
+    otherwise the item's daily hours fall on its study days.
+    """
+    allocation = item.get("daily_allocation")
+    if allocation:
+        return np.array([allocation.get(day, 0.0) for day in dates], dtype=np.float32)
+    study_days = [WEEKDAYS.index(d) for d in item["study_days"] if d in WEEKDAYS]
+    scheduled = np.isin([day.weekday() for day in dates], study_days)
+    return np.where(scheduled, np.float32(item["hours"]), np.float32(0.0))
+
+
+def _adherence_samples(subject, adherence):
+    samples = adherence.get(subject)
+    if samples is not None and len(samples) >= MIN_SUBJECT_SAMPLES:
+        return samples
+    pooled = [s for s in adherence.values() if len(s)]
+    if pooled and sum(len(s) for s in pooled) >= MIN_SUBJECT_SAMPLES:
+        return np.concatenate(pooled)
+    return PRIOR_ADHERENCE
+
+
+def simulate_feasibility(plan, exam_date, adherence, trials=DEFAULT_TRIALS, seed=None, today=None):
+    """Monte Carlo estimate of finishing each subject's planned hours by its deadline.
+
+    Each subject runs up to its own deadline (exam_date if it has none),
+    over the hours its daily_allocation or study days schedule. Each trial
+    draws a daily adherence ratio for every scheduled day from the user's
+    own history. Returns, per subject, the calendar dates and the
+    probability that the cumulative hours have reached the target by each
+    date, plus the expected fraction of the target covered.
+    """
+    today = today or date.today()
+    rng = np.random.default_rng(seed)
+
+    results = {}
+    for item in plan:
+        n_days = ((item.get("deadline") or exam_date) - today).days
+        if n_days <= 0:
+            continue
+        dates = [today + timedelta(days=i) for i in range(n_days)]
+        planned = planned_hours(item, dates)
+        scheduled = planned > 0
+        n_sessions = int(scheduled.sum())
+        target = float(planned.sum())
+        if n_sessions == 0 or target <= 0:
+            continue
+
+        samples = _adherence_samples(item["subject"], adherence).astype(np.float32)
+        index_type = np.uint8 if len(samples) <= 256 else np.int32
+        draws = rng.integers(len(samples), size=(trials, n_sessions), dtype=index_type)
+        cumulative = np.take(samples, draws)
+        cumulative *= planned[scheduled]
+        np.cumsum(cumulative, axis=1, out=cumulative)
+        done_by_session = np.count_nonzero(cumulative >= target * 0.999, axis=0) / trials
+
+        # Map each calendar day onto the latest scheduled session before it
+        session_index = np.cumsum(scheduled) - 1
+        probability = np.where(session_index >= 0, done_by_session[np.maximum(session_index, 0)], 0.0)
+
+        results[item["subject"]] = {
+            "dates": dates,
+            "probability": probability,
+            "final": float(probability[-1]),
+            "expected_coverage": float(np.minimum(cumulative[:, -1] / target, 1.0).mean()),
+        }
+    return results
+
+
+def create_feasibility_chart(results):
+    fig = go.Figure()
+    for subject, result in results.items():
+        fig.add_trace(go.Scatter(
+            x=result["dates"],
+            y=result["probability"] * 100,
+            mode="lines",
+            name=f"{subject} ({result['final'] * 100:.0f}%)"
+        ))
+
+    fig.update_layout(
+        title="Chance of Completing Planned Hours",
+        xaxis_title="Date",
+        yaxis_title="Probability (%)",
+        yaxis=dict(range=[0, 100]),
+        plot_bgcolor="rgba(0,0,0,0)",
+        hovermode="x"
+    )
+    return fig
+
+
+if __name__ == "__main__":
+    import time
+
+    plan = [
+        {"subject": f"Subject {i}", "hours": 1.0 + i % 3, "study_days": WEEKDAYS[: 2 + i % 5]}
+        for i in range(10)
+    ]
+    rng = np.random.default_rng(0)
+    adherence = {item["subject"]: rng.uniform(0.5, 1.3, 60).astype(np.float32) for item in plan}
+    exam_date = date.today() + timedelta(days=180)
+
+    started = time.perf_counter()
+    results = simulate_feasibility(plan, exam_date, adherence, seed=1)
+    elapsed = time.perf_counter() - started
+    print(f"{len(plan)} subjects x {DEFAULT_TRIALS} trials x 180 days in {elapsed * 1000:.0f} ms")
+    for subject, result in results.items():
+        print(f"{subject}: {result['final'] * 100:.1f}% complete, {result['expected_coverage'] * 100:.1f}% covered")
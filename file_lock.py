@@ -0,0 +1,49 @@
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: threads in this process are still kept apart, other processes aren't
+    fcntl = None
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on `path` against other threads and processes.
+
+    The lock is an flock on a `<path>.lock` file next to it, so the data
+    file itself can be replaced while the lock is held.
+    """
+    lock_path = f"{os.path.abspath(path)}.lock"
+    with _locks_lock:
+        thread_lock = _locks.setdefault(lock_path, threading.Lock())
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def replace_atomically(path, write):
+    """Write a file through a unique temp file in the same directory and swap it in with os.replace"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                    prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
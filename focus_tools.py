@@ -1,66 +1,21 @@
 import streamlit as st
 import time
-import random
-import json
-import os
-from datetime import datetime, timedelta
+from datetime import datetime
 import plotly.graph_objects as go
+import io
+from blocklist import spool_to_file, EXPORT_FORMATS
+from downloads import keep_download, offer_download
+from pomodoro_timer import plan_subjects, timer_owner, timer_preferences
+from core.sessions import save_focus_session, get_focus_history
+from core.blocked_sites import (
+    get_blocked_sites,
+    is_site_blocked,
+    add_blocked_sites,
+    remove_blocked_site,
+    import_blocked_sites,
+)
 
-FOCUS_SESSIONS_FILE = "focus_sessions.json"
-BLOCKED_SITES_FILE = "blocked_sites.json"
-
-def init_focus_files():
-    if not os.path.exists(FOCUS_SESSIONS_FILE):
-        with open(FOCUS_SESSIONS_FILE, "w") as f:
-            json.dump([], f)
-    
-    if not os.path.exists(BLOCKED_SITES_FILE):
-        with open(BLOCKED_SITES_FILE, "w") as f:
-            json.dump([], f)
-
-def save_focus_session(start, end, distractions=0):
-    session = {
-        "start": start.isoformat(),
-        "end": end.isoformat(),
-        "duration": (end - start).total_seconds() / 60,
-        "distractions": distractions
-    }
-    
-    sessions = []
-    if os.path.exists(FOCUS_SESSIONS_FILE):
-        with open(FOCUS_SESSIONS_FILE, "r") as f:
-            sessions = json.load(f)
-    
-    sessions.append(session)
-    
-    with open(FOCUS_SESSIONS_FILE, "w") as f:
-        json.dump(sessions, f)
-
-def get_focus_sessions():
-    if os.path.exists(FOCUS_SESSIONS_FILE):
-        with open(FOCUS_SESSIONS_FILE, "r") as f:
-            return json.load(f)
-    return []
-
-def get_blocked_sites():
-    if os.path.exists(BLOCKED_SITES_FILE):
-        with open(BLOCKED_SITES_FILE, "r") as f:
-            return json.load(f)
-    return []
-
-def add_blocked_site(site):
-    sites = get_blocked_sites()
-    if site not in sites:
-        sites.append(site)
-        with open(BLOCKED_SITES_FILE, "w") as f:
-            json.dump(sites, f)
-
-def remove_blocked_site(site):
-    sites = get_blocked_sites()
-    if site in sites:
-        sites.remove(site)
-        with open(BLOCKED_SITES_FILE, "w") as f:
-            json.dump(sites, f)
+MAX_LISTED_SITES = 50
 
 def show_focus_mode():
     st.subheader("🚀 Deep Focus Mode")
@@ -76,7 +31,9 @@ def show_focus_mode():
     
     # Focus mode activation
     if not st.session_state.focus_active:
-        goal = st.number_input("Set focus duration (minutes)", 15, 120, 45)
+        goal = st.number_input("Set focus duration (minutes)", 15, 120, timer_preferences()['focus_minutes'],
+                               key="focus_goal_input")
+        subject = st.selectbox("What are you studying?", plan_subjects(), key="focus_subject_choice")
         st.info("Focus mode will:")
         st.write("- Hide non-essential UI elements")
         st.write("- Block distracting websites (via browser extension)")
@@ -87,6 +44,7 @@ def show_focus_mode():
             st.session_state.focus_active = True
             st.session_state.focus_start = datetime.now()
             st.session_state.focus_goal = goal
+            st.session_state.focus_subject = subject
             st.session_state.distraction_count = 0
             st.experimental_rerun()
     else:
@@ -119,20 +77,26 @@ def show_focus_mode():
         
         # End session button
         if st.button("End Focus Session Early"):
+            user_id, subject = timer_owner('focus_subject')
             save_focus_session(
                 st.session_state.focus_start,
                 datetime.now(),
-                st.session_state.distraction_count
+                st.session_state.distraction_count,
+                user_id=user_id,
+                subject=subject
             )
             st.session_state.focus_active = False
             st.experimental_rerun()
         
         # Auto-end when goal reached
         if elapsed_minutes >= st.session_state.focus_goal:
+            user_id, subject = timer_owner('focus_subject')
             save_focus_session(
                 st.session_state.focus_start,
                 datetime.now(),
-                st.session_state.distraction_count
+                st.session_state.distraction_count,
+                user_id=user_id,
+                subject=subject
             )
             st.session_state.focus_active = False
             st.balloons()
@@ -145,17 +109,24 @@ def show_website_blocker():
     st.caption("Block distracting websites during study sessions")
     
     sites = get_blocked_sites()
-    new_site = st.text_input("Add website to block (e.g. youtube.com)")
+    new_sites = st.text_input("Add websites to block (e.g. youtube.com, reddit.com)")
     
     col1, col2 = st.columns(2)
     with col1:
-        if st.button("Add Site") and new_site:
-            add_blocked_site(new_site)
+        if st.button("Add Site") and new_sites:
+            add_blocked_sites(new_sites.replace(",", " ").split())
             st.experimental_rerun()
+    with col2:
+        check_url = st.text_input("Check a URL")
+        if check_url:
+            if is_site_blocked(check_url):
+                st.error(f"{check_url} is blocked")
+            else:
+                st.success(f"{check_url} is not blocked")
     
     if sites:
-        st.write("Blocked Websites:")
-        for site in sites:
+        st.write(f"Blocked Websites ({len(sites)}):")
+        for site in sites[:MAX_LISTED_SITES]:
             col1, col2 = st.columns([4, 1])
             with col1:
                 st.write(f"- {site}")
@@ -163,31 +134,53 @@ def show_website_blocker():
                 if st.button(f"Remove", key=f"remove_{site}"):
                     remove_blocked_site(site)
                     st.experimental_rerun()
+        if len(sites) > MAX_LISTED_SITES:
+            st.caption(f"Showing the first {MAX_LISTED_SITES} sites")
         
-        st.download_button(
-            "Export Block List",
-            "\n".join(sites),
-            file_name="blocked_sites.txt",
-            help="Import into website blockers like BlockSite, Freedom, etc."
-        )
+        export_format = st.selectbox("Export format", list(EXPORT_FORMATS.keys()))
+        exporter, file_name, mime = EXPORT_FORMATS[export_format]
+        # Built only when asked for, not on every rerun of the section
+        if st.button("Prepare Block List Export"):
+            keep_download("blocklist_export", spool_to_file(exporter(sites)))
+            st.session_state.blocklist_export_format = export_format
+        if st.session_state.get("blocklist_export_format") == export_format:
+            offer_download(
+                "blocklist_export",
+                "Export Block List",
+                file_name,
+                mime,
+                help="Import into website blockers like BlockSite, Freedom, etc."
+            )
     else:
         st.info("No websites blocked yet. Add sites you find distracting.")
     
+    uploaded = st.file_uploader("Import a block list (plain, hosts file or adblock rules)", type=["txt", "hosts", "list"])
+    if uploaded and st.button("Import Block List"):
+        progress_bar = st.progress(0)
+        total_bytes = max(1, uploaded.size)
+        
+        def report_progress(parsed, added):
+            progress_bar.progress(min(100, int(uploaded.tell() / total_bytes * 100)))
+        
+        lines = io.TextIOWrapper(uploaded, encoding="utf-8", errors="ignore")
+        parsed, added = import_blocked_sites(lines, progress_callback=report_progress)
+        st.success(f"Imported {added} new sites ({parsed} entries read)")
+    
     st.info("**How to use:** Install a website blocker extension and import this list")
 
-def show_focus_analytics():
-    sessions = get_focus_sessions()
+def show_focus_analytics(history=None):
+    if history is None:
+        history = get_focus_history()
     
-    if not sessions:
+    if not len(history):
         st.info("No focus sessions recorded yet")
         return
     
     # Calculate stats
-    total_minutes = sum(s['duration'] for s in sessions)
-    avg_duration = total_minutes / len(sessions)
-    distractions = sum(s['distractions'] for s in sessions)
-    avg_distractions = distractions / len(sessions)
-    best_session = max(sessions, key=lambda x: x['duration'])
+    total_minutes = history.total_minutes()
+    avg_duration = history.mean_minutes()
+    avg_distractions = history.mean_distractions()
+    best_session = history.longest()
     
     # Metrics
     col1, col2, col3 = st.columns(3)
@@ -197,9 +190,10 @@ def show_focus_analytics():
     
     # Timeline
     st.subheader("Focus History")
-    dates = [datetime.fromisoformat(s['start']).strftime("%Y-%m-%d") for s in sessions]
-    durations = [s['duration'] for s in sessions]
-    distractions = [s['distractions'] for s in sessions]
+    n = len(history)
+    dates = history.start_dates().astype(str)
+    durations = history.duration[:n]
+    distractions = history.distractions[:n]
     
     fig = go.Figure()
     fig.add_trace(go.Bar(
@@ -237,7 +231,7 @@ def show_focus_analytics():
     if avg_duration < 30:
         st.info("**Short session length:** Consider using the Pomodoro technique to build focus stamina")
     
-    st.write(f"**Longest session:** {best_session['duration']:.0f} min on {datetime.fromisoformat(best_session['start']).strftime('%b %d')}")
+    st.write(f"**Longest session:** {best_session['duration']:.0f} min on {best_session['start'].strftime('%b %d')}")
     
     with st.expander("Focus Improvement Tips"):
         st.markdown("""
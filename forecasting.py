@@ -0,0 +1,265 @@
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+import numpy as np
+import plotly.graph_objects as go
+from sqlalchemy import select, func
+from database import get_session
+from models import Progress, ActivityEvent, ProjectionCheckpoint
+from activity_log import PROJECTOR_NAME
+
+ROLLING_WINDOW = 7
+EWMA_ALPHA = 0.3
+EWMA_BLOCK = 32
+CHART_DAYS = 60
+MAX_CACHED_TRENDS = 1000
+
+
+def rolling_mean(values, window=ROLLING_WINDOW):
+    """Trailing mean; the first few days average over what is available"""
+    if len(values) == 0:
+        return values.copy()
+    sums = np.cumsum(np.concatenate(([0.0], values)))
+    counts = np.minimum(np.arange(1, len(values) + 1), window)
+    starts = np.arange(1, len(values) + 1) - counts
+    return (sums[1:] - sums[starts]) / counts
+
+
+def ewma(values, alpha=EWMA_ALPHA, initial=None):
+    """Exponentially weighted mean computed block by block in closed form.
+
+    Within a block y[t] = d[t+1] * prev + alpha * d[t] * cumsum(x / d)[t]
+    with d = (1 - alpha) ** arange, which stays numerically safe for short
+    blocks and avoids a Python loop over every day.
+    """
+    out = np.empty(len(values))
+    if len(values) == 0:
+        return out
+    prev = values[0] if initial is None else initial
+    decay = (1 - alpha) ** np.arange(EWMA_BLOCK + 1)
+    for start in range(0, len(values), EWMA_BLOCK):
+        block = values[start:start + EWMA_BLOCK]
+        d = decay[:len(block)]
+        out[start:start + len(block)] = decay[1:len(block) + 1] * prev + alpha * d * np.cumsum(block / d)
+        prev = out[start + len(block) - 1]
+    return out
+
+
+def current_streak(daily):
+    """Number of consecutive days with study time at the end of the series"""
+    gaps = np.flatnonzero(daily <= 0)
+    return len(daily) if len(gaps) == 0 else len(daily) - gaps[-1] - 1
+
+
+class ProgressTrends:
+    """Per-subject daily hours, rolling means and EWMA for one user.
+
+    Finished days (before today) are kept as arrays and only new days are
+    fetched and appended on refresh. Today's hours can still change, so they
+    are applied on top when a forecast is requested. A change to the rows
+    for past days triggers a rebuild, and is found without reading the
+    user's history again: rows added or replaced since the last refresh
+    have ids past the highest one seen then, and the timer projector, which
+    updates hours in place, only does so for events past its checkpoint.
+    Save paths in this process also call invalidate_trends directly.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.start = None
+        self.end = None
+        # Highest Progress id and projected event id when the arrays were last brought up to date
+        self.last_id = None
+        self.last_event_id = None
+        self.daily = {}
+        self.ewma = {}
+        self.lock = threading.Lock()
+
+    def _rows(self, session, after, before):
+        stmt = select(Progress.date, Progress.subject, Progress.hours_studied).where(
+            Progress.user_id == self.user_id, Progress.date < before
+        )
+        if after:
+            stmt = stmt.where(Progress.date > after)
+        return session.execute(stmt).all()
+
+    def _high_water(self, session):
+        """(highest Progress id, projector checkpoint, whether rows for days already folded in
+        were added or edited since the last refresh), read in one statement"""
+        columns = [
+            select(func.max(Progress.id)).scalar_subquery(),
+            select(ProjectionCheckpoint.last_event_id)
+            .where(ProjectionCheckpoint.name == PROJECTOR_NAME).scalar_subquery(),
+        ]
+        if self.end is not None:
+            # "+ 0" keeps SQLite on the id range instead of walking every row of the user in their index
+            columns += [
+                select(func.min(Progress.date))
+                .where(Progress.id > self.last_id, Progress.user_id + 0 == self.user_id).scalar_subquery(),
+                select(func.min(ActivityEvent.started_at))
+                .where(ActivityEvent.id > self.last_event_id, ActivityEvent.user_id + 0 == self.user_id)
+                .scalar_subquery(),
+            ]
+        row = session.execute(select(*columns)).one()
+        changed = self.end is not None and (
+            (row[2] is not None and row[2] <= self.end) or (row[3] is not None and row[3].date() <= self.end)
+        )
+        return row[0] or 0, row[1] or 0, changed
+
+    def _append(self, rows, first_day, last_day):
+        n_days = (last_day - first_day).days + 1
+        new_daily = {subject: np.zeros(n_days) for subject in self.daily}
+        for day, subject, hours in rows:
+            if subject not in new_daily:
+                # Subject first seen now: backfill zeros for the days already tracked
+                new_daily[subject] = np.zeros(n_days)
+                if self.start is not None:
+                    self.daily[subject] = np.zeros((first_day - self.start).days)
+                    self.ewma[subject] = np.zeros(len(self.daily[subject]))
+            new_daily[subject][(day - first_day).days] += hours
+        for subject, values in new_daily.items():
+            previous = self.ewma.get(subject)
+            initial = previous[-1] if previous is not None and len(previous) else 0.0
+            self.daily[subject] = np.concatenate((self.daily.get(subject, np.zeros(0)), values))
+            self.ewma[subject] = np.concatenate((
+                previous if previous is not None else np.zeros(0),
+                ewma(values, initial=initial)
+            ))
+
+    def refresh(self, today, session=None):
+        own_session = session is None
+        if own_session:
+            session = get_session()
+        try:
+            with self.lock:
+                yesterday = today - timedelta(days=1)
+                # Read before the rows, so anything committed meanwhile is looked at next time
+                last_id, last_event_id, changed = self._high_water(session)
+                if changed:
+                    self.__init__(self.user_id)
+                if self.end is not None:
+                    self.last_id, self.last_event_id = last_id, last_event_id
+                if self.end is not None and self.end >= yesterday:
+                    return
+                rows = self._rows(session, self.end, today)
+                if self.start is None:
+                    if not rows:
+                        return
+                    self.start = min(day for day, _, _ in rows)
+                first_day = self.end + timedelta(days=1) if self.end else self.start
+                self._append(rows, first_day, yesterday)
+                self.end = yesterday
+                self.last_id, self.last_event_id = last_id, last_event_id
+        finally:
+            if own_session:
+                session.close()
+
+    def today_hours(self, today, session=None):
+        own_session = session is None
+        if own_session:
+            session = get_session()
+        try:
+            rows = session.execute(
+                select(Progress.subject, func.sum(Progress.hours_studied)).where(
+                    Progress.user_id == self.user_id, Progress.date == today
+                ).group_by(Progress.subject)
+            ).all()
+        finally:
+            if own_session:
+                session.close()
+        return dict(rows)
+
+    def daily_totals(self, today, today_hours=None):
+        """(first day, hours per day summed over subjects through today)"""
+        if today_hours is None:
+            today_hours = self.today_hours(today)
+        with self.lock:
+            start = self.start or today
+            totals = np.zeros((today - start).days + 1)
+            for values in self.daily.values():
+                totals[:len(values)] += values
+        totals[-1] = sum(today_hours.values())
+        return start, totals
+
+    def forecast(self, exam_date, today, today_hours=None):
+        """Trend statistics and projected total hours by exam_date per subject"""
+        if today_hours is None:
+            today_hours = self.today_hours(today)
+        days_left = max(0, (exam_date - today).days) if exam_date else 0
+        # refresh() swaps in new arrays rather than editing them, so copies of the dicts are a consistent snapshot
+        with self.lock:
+            start = self.start or today
+            daily_by_subject = dict(self.daily)
+            ewma_by_subject = dict(self.ewma)
+        subjects = set(daily_by_subject) | set(today_hours)
+        result = {}
+        for subject in sorted(subjects):
+            past = daily_by_subject.get(subject, np.zeros((today - start).days))
+            past_ewma = ewma_by_subject.get(subject, np.zeros(len(past)))
+            today_value = today_hours.get(subject, 0.0)
+            daily = np.append(past, today_value)
+            initial = past_ewma[-1] if len(past_ewma) else today_value
+            smoothed = np.append(past_ewma, EWMA_ALPHA * today_value + (1 - EWMA_ALPHA) * initial)
+
+            window = daily[-CHART_DAYS:]
+            # Today counts toward the streak only once something is logged
+            streak_days = daily if today_value > 0 else past
+            rate = float(smoothed[-1])
+            total = float(daily.sum())
+            result[subject] = {
+                "dates": [today - timedelta(days=i) for i in range(len(window) - 1, -1, -1)],
+                "daily": window,
+                "rolling_mean": rolling_mean(daily[-(CHART_DAYS + ROLLING_WINDOW):])[-len(window):],
+                "ewma": smoothed[-len(window):],
+                "rate": rate,
+                "streak": int(current_streak(streak_days)),
+                "total": total,
+                "projected_total": total + rate * days_left,
+            }
+        return result
+
+
+# Least recently used first
+_trends = OrderedDict()
+_trends_lock = threading.Lock()
+
+
+def get_trends(user_id, today):
+    """The user's cached ProgressTrends, brought up to date"""
+    with _trends_lock:
+        trends = _trends.get(user_id)
+        if trends is None:
+            trends = _trends[user_id] = ProgressTrends(user_id)
+            while len(_trends) > MAX_CACHED_TRENDS:
+                _trends.popitem(last=False)
+        _trends.move_to_end(user_id)
+    trends.refresh(today)
+    return trends
+
+
+def invalidate_trends(user_id, day=None):
+    """Drop the user's cached trends after their hours for day (or any day) were edited or deleted"""
+    with _trends_lock:
+        trends = _trends.get(user_id)
+        if trends is not None and (day is None or (trends.end is not None and day <= trends.end)):
+            del _trends[user_id]
+
+
+def get_progress_forecast(user_id, exam_date, today=None):
+    today = today or date.today()
+    return get_trends(user_id, today).forecast(exam_date, today)
+
+
+def create_forecast_chart(subject, forecast):
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=forecast["dates"], y=forecast["daily"], name="Hours", marker_color="#90caf9"))
+    fig.add_trace(go.Scatter(x=forecast["dates"], y=forecast["rolling_mean"], name=f"{ROLLING_WINDOW}-day average", mode="lines"))
+    fig.add_trace(go.Scatter(x=forecast["dates"], y=forecast["ewma"], name="Trend (EWMA)", mode="lines"))
+    fig.update_layout(
+        title=f"{subject}: Daily Hours and Trend",
+        xaxis_title="Date",
+        yaxis_title="Hours",
+        plot_bgcolor="rgba(0,0,0,0)",
+        hovermode="x"
+    )
+    return fig
@@ -0,0 +1,154 @@
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+import numpy as np
+import plotly.graph_objects as go
+from forecasting import get_trends
+from core.sessions import get_focus_history, get_pomodoro_history
+
+CALENDAR_WEEKS = 53
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+SECONDS_PER_DAY = 86400
+# Users whose hourly matrices are kept; the least recently viewed are dropped
+MAX_CACHED_MATRICES = 1000
+
+
+def get_calendar_heatmap(user_id, today=None, weeks=CALENDAR_WEEKS, trends=None, today_hours=None):
+    """Progress hours as a weekday x week grid ending with the current week.
+
+    Daily totals come from the user's cached ProgressTrends, which only
+    fetches days it hasn't seen yet; callers that already refreshed the
+    trends or know today's hours per subject can pass them. Days after
+    today are NaN so they render blank.
+    """
+    today = today or date.today()
+    if trends is None:
+        trends = get_trends(user_id, today)
+    start, totals = trends.daily_totals(today, today_hours)
+    first_day = today - timedelta(days=today.weekday() + 7 * (weeks - 1))
+    today_index = (today - first_day).days
+    grid = np.full(weeks * 7, np.nan)
+    grid[:today_index + 1] = 0.0
+    # totals[0] is start, which may fall before or inside the window
+    offset = (start - first_day).days
+    begin = max(0, offset)
+    grid[begin:today_index + 1] = totals[begin - offset:]
+    return {
+        "week_starts": [first_day + timedelta(weeks=i) for i in range(weeks)],
+        "hours": grid.reshape(weeks, 7).T,
+        "total": float(np.nansum(grid)),
+        "active_days": int(np.count_nonzero(grid > 0)),
+    }
+
+
+class HourlyMatrix:
+    """Weekday x hour-of-day focus minutes and distractions for one user's sessions.
+
+    The session files are shared by every user, so only rows saved with
+    this user's id are counted. Rows already counted are remembered, so after a session is saved only
+    the new rows are binned. Sessions count toward the hour they started in.
+    A rebuilt history (the file changed outside the app) is binned from scratch.
+    """
+
+    def __init__(self, user_id, session_type=None):
+        self.user_id = user_id
+        self.session_type = session_type
+        self.history = None
+        self.seen = 0
+        self.minutes = np.zeros(7 * 24)
+        self.distractions = np.zeros(7 * 24)
+        self.sessions = np.zeros(7 * 24)
+
+    def update(self, history):
+        if history is not self.history:
+            self.__init__(self.user_id, self.session_type)
+            self.history = history
+        n = len(history)
+        if n == self.seen:
+            return self
+        start = history.start[self.seen:n]
+        # 1970-01-01 was a Thursday, so shift by 3 to make Monday 0
+        cells = ((start // SECONDS_PER_DAY + 3) % 7 * 24 + start % SECONDS_PER_DAY // 3600).astype(np.int64)
+        keep = history.user[self.seen:n] == self.user_id
+        if self.session_type is not None:
+            code = history.type_names.index(self.session_type) if self.session_type in history.type_names else -1
+            keep &= history.kind[self.seen:n] == code
+        cells = cells[keep]
+        self.minutes += np.bincount(cells, weights=history.duration[self.seen:n][keep], minlength=7 * 24)
+        self.distractions += np.bincount(cells, weights=history.distractions[self.seen:n][keep], minlength=7 * 24)
+        self.sessions += np.bincount(cells, minlength=7 * 24)
+        self.seen = n
+        return self
+
+
+# user_id -> (focus matrix, pomodoro matrix), least recently used first
+_matrices = OrderedDict()
+_matrices_lock = threading.Lock()
+
+
+def get_hourly_matrix(user_id, focus_history=None, pomodoro_history=None):
+    """The user's focus minutes, distractions and session counts as 7 x 24 arrays (Monday first).
+
+    Minutes combine focus sessions and Pomodoro work sessions; distractions
+    are only tracked for focus sessions.
+    """
+    if focus_history is None:
+        focus_history = get_focus_history()
+    if pomodoro_history is None:
+        pomodoro_history = get_pomodoro_history()
+    with _matrices_lock:
+        matrices = _matrices.get(user_id)
+        if matrices is None:
+            matrices = _matrices[user_id] = (HourlyMatrix(user_id), HourlyMatrix(user_id, "Work"))
+            if len(_matrices) > MAX_CACHED_MATRICES:
+                _matrices.popitem(last=False)
+        else:
+            _matrices.move_to_end(user_id)
+        focus = matrices[0].update(focus_history)
+        pomodoro = matrices[1].update(pomodoro_history)
+        return {
+            "minutes": (focus.minutes + pomodoro.minutes).reshape(7, 24),
+            "distractions": focus.distractions.reshape(7, 24).copy(),
+            "sessions": (focus.sessions + pomodoro.sessions).reshape(7, 24),
+        }
+
+
+def create_calendar_heatmap(calendar):
+    fig = go.Figure(go.Heatmap(
+        z=calendar["hours"],
+        x=calendar["week_starts"],
+        y=WEEKDAYS,
+        colorscale="Greens",
+        xgap=2,
+        ygap=2,
+        hovertemplate="Week of %{x}<br>%{y}: %{z:.1f} h<extra></extra>",
+        colorbar=dict(title="Hours")
+    ))
+    fig.update_layout(
+        title="Study Hours Over the Past Year",
+        yaxis=dict(autorange="reversed"),
+        plot_bgcolor="rgba(0,0,0,0)",
+        height=260
+    )
+    return fig
+
+
+def create_hourly_heatmap(matrix):
+    sessions = matrix["sessions"]
+    distraction_rate = np.divide(matrix["distractions"], sessions, out=np.zeros_like(sessions), where=sessions > 0)
+    fig = go.Figure(go.Heatmap(
+        z=matrix["minutes"],
+        x=[f"{hour:02d}:00" for hour in range(24)],
+        y=WEEKDAYS,
+        customdata=distraction_rate,
+        colorscale="Blues",
+        hovertemplate="%{y} %{x}<br>%{z:.0f} min focused<br>%{customdata:.1f} distractions/session<extra></extra>",
+        colorbar=dict(title="Minutes")
+    ))
+    fig.update_layout(
+        title="Focus Time by Weekday and Hour",
+        xaxis_title="Hour of day",
+        yaxis=dict(autorange="reversed"),
+        plot_bgcolor="rgba(0,0,0,0)"
+    )
+    return fig
@@ -1,8 +1,30 @@
+from sqlalchemy import inspect, text
 from database import engine
 from models import Base
+from notes import create_search_index
+
+def add_missing_columns():
+    # create_all skips tables that already exist, so add newer nullable columns by hand
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
 
 def initialize_database():
+    add_missing_columns()
     Base.metadata.create_all(bind=engine)
+    # Likewise for indexes added to existing tables
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    # Full-text search over notes lives outside the ORM metadata
+    create_search_index(engine)
     print("✅ Database tables created!")
 
 if __name__ == "__main__":
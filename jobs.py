@@ -0,0 +1,158 @@
+import itertools
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_WORKERS = 2
+MAX_PENDING_JOBS = 50
+MAX_FINISHED_JOBS = 200
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """Status record for one background job, also handed to the job function.
+
+    Job functions receive the job as their first argument so they can report
+    progress and stop early with check_cancelled().
+    """
+
+    def __init__(self, job_id, key, name):
+        self.id = job_id
+        self.key = key
+        self.name = name
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self._cancel = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def set_progress(self, progress, message=""):
+        self.progress = max(0.0, min(1.0, progress))
+        if message:
+            self.message = message
+
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+
+class JobRunner:
+    """Bounded thread pool with a job table, de-duplication and cancellation.
+
+    Submitting work under a key that already has a queued or running job
+    returns the existing job instead of starting a second copy, so a key
+    should include every argument that changes the job's result.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, max_pending=MAX_PENDING_JOBS, max_finished=MAX_FINISHED_JOBS):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._active_by_key = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn, *args, name=None, **kwargs):
+        with self._lock:
+            existing = self._active_by_key.get(key)
+            if existing is not None:
+                return existing
+            pending = sum(1 for job in self._active_by_key.values() if job.status == QUEUED)
+            if pending >= self.max_pending:
+                raise RuntimeError("Too many background jobs queued, try again shortly")
+            job = Job(next(self._ids), key, name or getattr(fn, "__name__", "job"))
+            self._jobs[job.id] = job
+            self._active_by_key[key] = job
+            self._prune()
+            job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+            return job
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancel_requested():
+            self._finish(job, CANCELLED)
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = fn(job, *args, **kwargs)
+        except JobCancelled:
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            job.error = f"{e}"
+            job.message = traceback.format_exc(limit=3)
+            self._finish(job, FAILED)
+        else:
+            job.progress = 1.0
+            self._finish(job, DONE)
+
+    def _finish(self, job, status):
+        with self._lock:
+            job.status = status
+            job.finished_at = time.time()
+            if self._active_by_key.get(job.key) is job:
+                del self._active_by_key[job.key]
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def find(self, key):
+        """The queued or running job for a key, if any"""
+        return self._active_by_key.get(key)
+
+    def cancel(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        job._cancel.set()
+        if job.future.cancel():
+            self._finish(job, CANCELLED)
+        return True
+
+    def running_count(self):
+        return sum(1 for job in list(self._jobs.values()) if job.status == RUNNING)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner():
+    """Process-wide runner shared by every Streamlit session"""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+        return _runner
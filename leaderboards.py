@@ -0,0 +1,438 @@
+import random
+import threading
+from datetime import date, timedelta
+from sqlalchemy import select, func
+from database import get_session
+from models import Progress, DailyFocus, CohortMember, User, ActivityEvent, ProjectionCheckpoint
+
+HOURS = "hours"
+FOCUS = "focus"
+STREAK = "streak"
+METRICS = {
+    HOURS: "Study hours this week",
+    FOCUS: "Focus minutes this week",
+    STREAK: "Current streak (days)",
+}
+# Streaks longer than this are cut off when a board is built
+STREAK_LOOKBACK = 366
+MAX_LEVEL = 32
+
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, level):
+        self.key = key
+        self.next = [None] * level
+        self.width = [1] * level
+
+
+class IndexedSkipList:
+    """Sorted keys with O(log n) insert, remove, rank and lookup by position.
+
+    Every link stores how many bottom-level nodes it jumps over, so the
+    position of a key is the sum of the widths along its search path. Links
+    at the end of a level point past the last node and count toward it, which
+    keeps widths correct without a tail sentinel.
+    """
+
+    def __init__(self, seed=None):
+        self._random = random.Random(seed)
+        self.head = _Node(None, MAX_LEVEL)
+        self.size = 0
+
+    @classmethod
+    def from_sorted(cls, keys, seed=None):
+        """Build from already sorted keys in O(n), linking each level left to right"""
+        skiplist = cls(seed)
+        last = [skiplist.head] * MAX_LEVEL
+        last_positions = [0] * MAX_LEVEL
+        for position, key in enumerate(keys, 1):
+            level = skiplist._level()
+            node = _Node(key, level)
+            for i in range(level):
+                last[i].next[i] = node
+                last[i].width[i] = position - last_positions[i]
+                last[i] = node
+                last_positions[i] = position
+            skiplist.size = position
+        for i in range(MAX_LEVEL):
+            last[i].width[i] = skiplist.size + 1 - last_positions[i]
+        return skiplist
+
+    def __len__(self):
+        return self.size
+
+    def _level(self):
+        level = 1
+        while level < MAX_LEVEL and self._random.random() < 0.5:
+            level += 1
+        return level
+
+    def _path(self, key):
+        """Last node before key on each level, with its position (head is 0)"""
+        path = [None] * MAX_LEVEL
+        positions = [0] * MAX_LEVEL
+        node = self.head
+        position = 0
+        for i in reversed(range(MAX_LEVEL)):
+            while node.next[i] is not None and node.next[i].key < key:
+                position += node.width[i]
+                node = node.next[i]
+            path[i] = node
+            positions[i] = position
+        return path, positions
+
+    def insert(self, key):
+        path, positions = self._path(key)
+        rank = positions[0]
+        level = self._level()
+        node = _Node(key, level)
+        for i in range(MAX_LEVEL):
+            prev = path[i]
+            if i < level:
+                node.next[i] = prev.next[i]
+                node.width[i] = prev.width[i] - (rank - positions[i])
+                prev.next[i] = node
+                prev.width[i] = rank - positions[i] + 1
+            else:
+                prev.width[i] += 1
+        self.size += 1
+
+    def remove(self, key):
+        path, _ = self._path(key)
+        node = path[0].next[0]
+        if node is None or node.key != key:
+            raise KeyError(key)
+        for i in range(MAX_LEVEL):
+            prev = path[i]
+            if prev.next[i] is node:
+                prev.width[i] += node.width[i] - 1
+                prev.next[i] = node.next[i]
+            else:
+                prev.width[i] -= 1
+        self.size -= 1
+
+    def rank(self, key):
+        """How many keys sort before key"""
+        return self._path(key)[1][0]
+
+    def _node_at(self, index):
+        node = self.head
+        remaining = index + 1
+        for i in reversed(range(MAX_LEVEL)):
+            while node.width[i] <= remaining and node.next[i] is not None:
+                remaining -= node.width[i]
+                node = node.next[i]
+        return node
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        return self._node_at(index).key
+
+    def slice(self, start, stop):
+        """Keys at positions [start, stop), walking the bottom level from start"""
+        stop = min(stop, self.size)
+        if start >= stop:
+            return []
+        node = self._node_at(start)
+        keys = []
+        for _ in range(stop - start):
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+
+class Leaderboard:
+    """Scores for one metric, ranked highest first.
+
+    Users with no score (zero) are left off the board. members limits the
+    board to a cohort; updates for anyone else are ignored.
+    """
+
+    def __init__(self, period, members=None):
+        self.period = period
+        self.members = members
+        self.scores = {}
+        self.ranked = IndexedSkipList()
+
+    def set(self, user_id, score):
+        if self.members is not None and user_id not in self.members:
+            return
+        old = self.scores.pop(user_id, None)
+        if old is not None:
+            self.ranked.remove((-old, user_id))
+        if score > 0:
+            self.scores[user_id] = score
+            self.ranked.insert((-score, user_id))
+
+    def load(self, scores):
+        """Replace the board with {user_id: score} in one sorted pass"""
+        if self.members is not None:
+            scores = {user_id: score for user_id, score in scores.items() if user_id in self.members}
+        self.scores = {user_id: score for user_id, score in scores.items() if score > 0}
+        self.ranked = IndexedSkipList.from_sorted(sorted((-score, user_id) for user_id, score in self.scores.items()))
+
+    def rank(self, user_id):
+        """1-based rank, shared between tied scores; None if the user has no score"""
+        score = self.scores.get(user_id)
+        if score is None:
+            return None
+        return self.ranked.rank((-score, float("-inf"))) + 1
+
+    def top(self, k):
+        """[(rank, user_id, score)] for the k highest scores"""
+        rows = []
+        rank = 0
+        previous = None
+        for position, (negative, user_id) in enumerate(self.ranked.slice(0, k)):
+            if -negative != previous:
+                rank = position + 1
+                previous = -negative
+            rows.append((rank, user_id, -negative))
+        return rows
+
+    def __len__(self):
+        return len(self.scores)
+
+
+def _week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def _period(metric, today):
+    # Weekly boards roll over on Monday; streaks can break any day
+    return today if metric == STREAK else _week_start(today)
+
+
+def _streaks(days_by_user, today):
+    """Consecutive study days ending today, or yesterday if nothing is logged today yet"""
+    streaks = {}
+    for user_id, days in days_by_user.items():
+        day = today if today in days else today - timedelta(days=1)
+        streak = 0
+        while day in days:
+            streak += 1
+            day -= timedelta(days=1)
+        streaks[user_id] = streak
+    return streaks
+
+
+def _scores(session, metric, today, user_id=None):
+    """{user_id: score} from the database, for everyone or a single user"""
+    from activity_log import STUDY_KINDS
+    if metric == HOURS:
+        stmt = select(Progress.user_id, func.sum(Progress.hours_studied)).where(
+            Progress.date >= _week_start(today), Progress.date <= today
+        ).group_by(Progress.user_id)
+        column = Progress.user_id
+    elif metric == FOCUS:
+        stmt = select(DailyFocus.user_id, func.sum(DailyFocus.minutes)).where(
+            DailyFocus.date >= _week_start(today), DailyFocus.date <= today, DailyFocus.kind.in_(STUDY_KINDS)
+        ).group_by(DailyFocus.user_id)
+        column = DailyFocus.user_id
+    else:
+        stmt = select(Progress.user_id, Progress.date).where(
+            Progress.date > today - timedelta(days=STREAK_LOOKBACK), Progress.date <= today
+        ).group_by(Progress.user_id, Progress.date).having(func.sum(Progress.hours_studied) > 0)
+        column = Progress.user_id
+    if user_id is not None:
+        stmt = stmt.where(column == user_id)
+    rows = session.execute(stmt).all()
+    if metric == STREAK:
+        days_by_user = {}
+        for uid, day in rows:
+            days_by_user.setdefault(uid, set()).add(day)
+        return _streaks(days_by_user, today)
+    return {uid: round(score or 0.0, 2) for uid, score in rows}
+
+
+class Leaderboards:
+    """Process-wide leaderboards kept current by the progress and session writers.
+
+    A board is built with one grouped query the first time it is read in a
+    period, and after that each save re-scores only the user who saved, at
+    O(log n) per board. Cohort boards are built from the global board's
+    scores. Each read also checks the highest Progress id and the activity
+    projector's checkpoint, and re-scores the users behind any rows past
+    them, so writes made by another process are seen too.
+    """
+
+    def __init__(self):
+        self._boards = {}
+        self._lock = threading.Lock()
+        self._last_id = None
+        self._last_event_id = None
+
+    def _board(self, session, metric, cohort_id, today):
+        period = _period(metric, today)
+        board = self._boards.get((metric, cohort_id))
+        if board is not None and board.period == period:
+            return board
+        if cohort_id is None:
+            board = Leaderboard(period)
+            scores = _scores(session, metric, today)
+        else:
+            members = set(session.scalars(
+                select(CohortMember.user_id).where(CohortMember.cohort_id == cohort_id)
+            ))
+            board = Leaderboard(period, members)
+            scores = self._board(session, metric, None, today).scores
+        board.load(scores)
+        self._boards[(metric, cohort_id)] = board
+        return board
+
+    def _rescore(self, session, user_ids, today):
+        for metric in METRICS:
+            period = _period(metric, today)
+            boards = [board for (name, _), board in self._boards.items()
+                      if name == metric and board.period == period]
+            if not boards:
+                continue
+            for user_id in user_ids:
+                score = _scores(session, metric, today, user_id).get(user_id, 0)
+                for board in boards:
+                    board.set(user_id, score)
+
+    def _catch_up(self, session, today):
+        """Re-score users with Progress rows or projected events past the marks the boards were built at"""
+        from activity_log import PROJECTOR_NAME
+        last_id, last_event_id = session.execute(select(
+            select(func.max(Progress.id)).scalar_subquery(),
+            select(ProjectionCheckpoint.last_event_id)
+            .where(ProjectionCheckpoint.name == PROJECTOR_NAME).scalar_subquery(),
+        )).one()
+        last_id, last_event_id = last_id or 0, last_event_id or 0
+        if self._last_id is None or last_id < self._last_id or last_event_id < self._last_event_id:
+            # First read, or the projections were replayed from scratch
+            self._boards.clear()
+        elif (last_id, last_event_id) != (self._last_id, self._last_event_id):
+            user_ids = set(session.scalars(
+                select(Progress.user_id).where(Progress.id > self._last_id, Progress.id <= last_id).distinct()
+            ))
+            user_ids.update(session.scalars(
+                select(ActivityEvent.user_id).where(
+                    ActivityEvent.id > self._last_event_id, ActivityEvent.id <= last_event_id,
+                    ActivityEvent.user_id.isnot(None)
+                ).distinct()
+            ))
+            self._rescore(session, user_ids, today)
+        self._last_id, self._last_event_id = last_id, last_event_id
+
+    def refresh_users(self, user_ids, today=None):
+        """Re-score users on every board already built for the current period"""
+        today = today or date.today()
+        session = get_session()
+        try:
+            with self._lock:
+                self._rescore(session, user_ids, today)
+        finally:
+            session.close()
+
+    def invalidate(self, cohort_id=None):
+        """Drop a cohort's boards (after membership changes), or every board"""
+        with self._lock:
+            if cohort_id is None:
+                self._boards.clear()
+            else:
+                for key in [key for key in self._boards if key[1] == cohort_id]:
+                    del self._boards[key]
+
+    def standings(self, metric, cohort_id=None, user_id=None, k=10, today=None):
+        today = today or date.today()
+        session = get_session()
+        try:
+            with self._lock:
+                self._catch_up(session, today)
+                board = self._board(session, metric, cohort_id, today)
+                top = board.top(k)
+                my_rank = board.rank(user_id) if user_id is not None else None
+                my_score = board.scores.get(user_id, 0)
+                ranked = len(board)
+            names = dict(session.execute(
+                select(User.id, User.username).where(User.id.in_([uid for _, uid, _ in top]))
+            ).all())
+            return {
+                "metric": metric,
+                "label": METRICS[metric],
+                "top": [
+                    {"rank": rank, "user_id": uid, "username": names.get(uid, "?"), "score": score}
+                    for rank, uid, score in top
+                ],
+                "my_rank": my_rank,
+                "my_score": my_score,
+                "ranked": ranked,
+            }
+        finally:
+            session.close()
+
+
+leaderboards = Leaderboards()
+
+
+def get_leaderboard(metric, cohort_id=None, user_id=None, k=10, today=None):
+    """Top k for a metric (everyone, or one cohort) plus the user's own rank"""
+    if metric not in METRICS:
+        raise ValueError(f"Unknown leaderboard: {metric}")
+    return leaderboards.standings(metric, cohort_id, user_id, k, today)
+
+
+def refresh_leaderboards(user_ids, today=None):
+    leaderboards.refresh_users(set(user_ids), today)
+
+
+def _benchmark(users=100_000, views=200, saves=2000):
+    """Page views and saves at 100k users: sorting every user's total per view vs the skiplist"""
+    import time
+
+    rng = random.Random(42)
+    scores = {user_id: round(rng.uniform(0, 40), 2) for user_id in range(1, users + 1)}
+    me = users // 2
+
+    started = time.perf_counter()
+    board = Leaderboard(None)
+    board.load(scores)
+    build = time.perf_counter() - started
+
+    def sort_view():
+        ordered = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        top = ordered[:10]
+        rank = 1 + sum(1 for _, score in ordered if score > scores[me])
+        return top, rank
+
+    def board_view():
+        return board.top(10), board.rank(me)
+
+    sorted_top, sorted_rank = sort_view()
+    board_top, board_rank = board_view()
+    assert [(uid, score) for _, uid, score in board_top] == sorted_top and board_rank == sorted_rank
+
+    def timed(fn, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - started) / repeat
+
+    sort_time = timed(sort_view, 5)
+    view_time = timed(board_view, views)
+    updates = [(rng.randint(1, users), round(rng.uniform(0, 40), 2)) for _ in range(saves)]
+    started = time.perf_counter()
+    for user_id, score in updates:
+        board.set(user_id, score)
+    save_time = (time.perf_counter() - started) / saves
+
+    print(f"{users:,} users (board built once per period in {build * 1000:.0f} ms)")
+    print(f"page view (top 10 + my rank): full sort {sort_time * 1000:7.1f} ms   skiplist {view_time * 1e6:6.1f} us")
+    print(f"score update on save: {save_time * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Study leaderboards")
+    parser.add_argument("command", choices=["benchmark"],
+                        help="benchmark: compare ranking 100k users by sorting against the skiplist")
+    parser.add_argument("--users", type=int, default=100_000)
+    args = parser.parse_args()
+    _benchmark(args.users)
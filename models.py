@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Float, Boolean, Date, DateTime, ForeignKey, Index
 from sqlalchemy.orm import declarative_base
 from datetime import datetime
-import hashlib
+from passwords import hash_password, verify_password
 
 Base = declarative_base()
 
@@ -12,28 +12,158 @@ class User(Base):
     password = Column(String(150), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    # These hash on the calling thread; core.auth goes through the shared PasswordHasher pool
     def set_password(self, password):
-        self.password = hashlib.sha256(password.encode()).hexdigest()
+        self.password = hash_password(password)
     
     def check_password(self, password):
-        return self.password == hashlib.sha256(password.encode()).hexdigest()
+        return verify_password(self.password, password)
 
 class StudyPlan(Base):
     __tablename__ = 'study_plans'
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
     subject = Column(String(150), nullable=False)
     hours = Column(Float, nullable=False)
     priority = Column(String(50), nullable=False)
     difficulty = Column(String(50), nullable=False)
     study_days = Column(String(200), nullable=False)
+    deadline = Column(Date, nullable=True)
+    target_hours = Column(Float, nullable=True)
+    # JSON {"YYYY-MM-DD": hours} for subjects scheduled day by day across deadlines
+    daily_allocation = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # With the row count, the plan's version: lets cached plans notice writes from other processes
+    updated_at = Column(DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class Progress(Base):
     __tablename__ = 'progress'
+    __table_args__ = (Index('ix_progress_user_date_subject', 'user_id', 'date', 'subject'),)
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     subject = Column(String(150), nullable=False)
     date = Column(Date, nullable=False)
     hours_studied = Column(Float, nullable=False)
-    recorded_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    # None for hours entered by hand or imported; "timer" for rows projected from the activity log
+    source = Column(String(20), nullable=True)
+    recorded_at = Column(DateTime, default=datetime.utcnow)
+
+class ActivityEvent(Base):
+    """Append-only log of completed timer sessions; Progress and DailyFocus are projected from it"""
+    __tablename__ = 'activity_events'
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    kind = Column(String(50), nullable=False)
+    subject = Column(String(150), nullable=True)
+    started_at = Column(DateTime, nullable=False)
+    ended_at = Column(DateTime, nullable=False)
+    minutes = Column(Float, nullable=False)
+    distractions = Column(Integer, default=0)
+    recorded_at = Column(DateTime, default=datetime.utcnow)
+
+class DailyFocus(Base):
+    __tablename__ = 'daily_focus'
+    __table_args__ = (Index('ix_daily_focus_user_date', 'user_id', 'date'),)
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    date = Column(Date, nullable=False)
+    kind = Column(String(50), nullable=False)
+    sessions = Column(Integer, nullable=False, default=0)
+    minutes = Column(Float, nullable=False, default=0.0)
+    distractions = Column(Integer, nullable=False, default=0)
+
+class ProjectionCheckpoint(Base):
+    __tablename__ = 'projection_checkpoints'
+    name = Column(String(50), primary_key=True)
+    last_event_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class SentNotification(Base):
+    """A reminder or report claimed by a scheduler, so one sent from several processes goes out once"""
+    __tablename__ = 'sent_notifications'
+    due = Column(DateTime, primary_key=True)
+    kind = Column(String(50), primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    claimed_by = Column(String(32), nullable=False)
+    sent_at = Column(DateTime, default=datetime.utcnow)
+
+class Cohort(Base):
+    __tablename__ = 'cohorts'
+    id = Column(Integer, primary_key=True)
+    name = Column(String(150), nullable=False)
+    join_code = Column(String(20), unique=True, nullable=False)
+    instructor_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    member_count = Column(Integer, nullable=False, default=0)
+    stats_recomputed_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class CohortMember(Base):
+    __tablename__ = 'cohort_members'
+    __table_args__ = (
+        Index('ix_cohort_members_cohort_user', 'cohort_id', 'user_id', unique=True),
+        Index('ix_cohort_members_user', 'user_id'),
+    )
+    id = Column(Integer, primary_key=True)
+    cohort_id = Column(Integer, ForeignKey('cohorts.id'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    joined_at = Column(DateTime, default=datetime.utcnow)
+
+class CohortDailyStats(Base):
+    """Hours per subject and focus minutes per day, summed over a cohort's members.
+
+    Focus minutes are kept on the row with an empty subject.
+    """
+    __tablename__ = 'cohort_daily_stats'
+    __table_args__ = (Index('ix_cohort_daily_stats_key', 'cohort_id', 'date', 'subject', unique=True),)
+    id = Column(Integer, primary_key=True)
+    cohort_id = Column(Integer, ForeignKey('cohorts.id'), nullable=False)
+    date = Column(Date, nullable=False)
+    subject = Column(String(150), nullable=False, default="")
+    hours = Column(Float, nullable=False, default=0.0)
+    focus_minutes = Column(Float, nullable=False, default=0.0)
+
+class CohortPlanStats(Base):
+    """Planned daily hours per subject summed over a cohort's members' current plans"""
+    __tablename__ = 'cohort_plan_stats'
+    __table_args__ = (Index('ix_cohort_plan_stats_key', 'cohort_id', 'subject', unique=True),)
+    id = Column(Integer, primary_key=True)
+    cohort_id = Column(Integer, ForeignKey('cohorts.id'), nullable=False)
+    subject = Column(String(150), nullable=False)
+    planned_hours = Column(Float, nullable=False, default=0.0)
+    students = Column(Integer, nullable=False, default=0)
+
+class UserPreferences(Base):
+    """Settings tab preferences; reminders and reports are scheduled from these rows"""
+    __tablename__ = 'user_preferences'
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    focus_minutes = Column(Integer, nullable=False, default=45)
+    break_minutes = Column(Integer, nullable=False, default=5)
+    daily_reminders = Column(Boolean, nullable=False, default=True)
+    weekly_reports = Column(Boolean, nullable=False, default=True)
+    # Local wall-clock "HH:MM"; weekly reports go out at the same time on report_weekday (0 = Monday)
+    reminder_time = Column(String(5), nullable=False, default="18:00")
+    report_weekday = Column(Integer, nullable=False, default=6)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class StudyNote(Base):
+    """A note or flashcard; a flashcard keeps its question in title and its answer in body.
+
+    The text is indexed by the study_notes_fts FTS5 table that notes.create_search_index
+    keeps in step with triggers.
+    """
+    __tablename__ = 'study_notes'
+    __table_args__ = (
+        Index('ix_study_notes_user_subject', 'user_id', 'subject'),
+        Index('ix_study_notes_user_due', 'user_id', 'due_date'),
+    )
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    subject = Column(String(150), nullable=False)
+    kind = Column(String(20), nullable=False, default="note")
+    title = Column(String(300), nullable=False)
+    body = Column(Text, nullable=False, default="")
+    # Flashcards only: reviews passed in a row and the day the next one is due
+    review_step = Column(Integer, nullable=True)
+    due_date = Column(Date, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,496 @@
+import csv
+import re
+from datetime import date, datetime, timedelta
+from sqlalchemy import insert, func, or_, text
+from database import get_session
+from models import StudyNote
+from study_planner import generate_spaced_repetition_schedule
+
+NOTE = "note"
+FLASHCARD = "flashcard"
+KINDS = (NOTE, FLASHCARD)
+
+MAX_TITLE_LENGTH = 300
+IMPORT_CHUNK_SIZE = 2000
+MAX_REPORTED_ERRORS = 20
+SEARCH_LIMIT = 20
+SNIPPET_TOKENS = 16
+# Matches ranked per search; beyond this only the newest are, which keeps a word that
+# appears in most of a user's notes as fast to search as a rare one
+MAX_RANKED_MATCHES = 500
+# The index keeps 3- and 4-character prefixes, so words being typed match without expanding every term
+MIN_PREFIX_LENGTH = 3
+
+HEADING = re.compile(r"^#{1,6}\s+(.+?)\s*#*\s*$")
+QUESTION = re.compile(r"^Q:\s*(.+)$", re.IGNORECASE)
+ANSWER = re.compile(r"^A:\s*(.*)$", re.IGNORECASE)
+TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# The FTS5 index reads its text through a view so each row also carries an owner
+# token ("u<user_id>"); matching on it intersects with the user's own notes inside
+# the index instead of filtering every user's matches afterwards. Title matches
+# weigh five times as much as body matches.
+SEARCH_INDEX_DDL = [
+    """CREATE VIEW IF NOT EXISTS study_notes_fts_source AS
+       SELECT id, 'u' || user_id AS owner, subject, title, body FROM study_notes""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS study_notes_fts USING fts5(
+       owner, subject, title, body,
+       content='study_notes_fts_source', content_rowid='id',
+       tokenize='unicode61 remove_diacritics 2', prefix='3 4')""",
+    """INSERT INTO study_notes_fts(study_notes_fts, rank) VALUES ('rank', 'bm25(0.0, 1.0, 5.0, 1.0)')""",
+    """CREATE TRIGGER IF NOT EXISTS study_notes_fts_insert AFTER INSERT ON study_notes BEGIN
+       INSERT INTO study_notes_fts(rowid, owner, subject, title, body)
+       VALUES (new.id, 'u' || new.user_id, new.subject, new.title, new.body);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS study_notes_fts_delete AFTER DELETE ON study_notes BEGIN
+       INSERT INTO study_notes_fts(study_notes_fts, rowid, owner, subject, title, body)
+       VALUES ('delete', old.id, 'u' || old.user_id, old.subject, old.title, old.body);
+       END""",
+    # Flashcard reviews only touch review_step/due_date, so they leave the index alone
+    """CREATE TRIGGER IF NOT EXISTS study_notes_fts_update AFTER UPDATE OF user_id, subject, title, body
+       ON study_notes BEGIN
+       INSERT INTO study_notes_fts(study_notes_fts, rowid, owner, subject, title, body)
+       VALUES ('delete', old.id, 'u' || old.user_id, old.subject, old.title, old.body);
+       INSERT INTO study_notes_fts(rowid, owner, subject, title, body)
+       VALUES (new.id, 'u' || new.user_id, new.subject, new.title, new.body);
+       END""",
+]
+
+
+def create_search_index(engine):
+    """Create the FTS5 index and its triggers on SQLite, filling it from existing notes if it is new"""
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'study_notes_fts'"
+        )).first()
+        for statement in SEARCH_INDEX_DDL:
+            conn.execute(text(statement))
+        if not exists:
+            conn.execute(text("INSERT INTO study_notes_fts(study_notes_fts) VALUES ('rebuild')"))
+
+
+def _as_dict(note):
+    return {
+        "id": note.id,
+        "subject": note.subject,
+        "kind": note.kind,
+        "title": note.title,
+        "body": note.body,
+        "due_date": note.due_date,
+    }
+
+
+def _clean(subject, title, body, kind):
+    if kind not in KINDS:
+        raise ValueError(f"Unknown note kind: {kind}")
+    subject = " ".join((subject or "").split())
+    title = (title or "").strip()
+    if not subject:
+        raise ValueError("missing subject")
+    if not title:
+        raise ValueError("missing question" if kind == FLASHCARD else "missing title")
+    body = (body or "").strip()
+    if kind == FLASHCARD and not body:
+        raise ValueError("flashcard has no answer")
+    return subject, title[:MAX_TITLE_LENGTH], body
+
+
+def add_note(user_id, subject, title, body="", kind=NOTE, today=None):
+    """Save a note, or a flashcard (question as title, answer as body) that is due for review right away"""
+    subject, title, body = _clean(subject, title, body, kind)
+    session = get_session()
+    try:
+        note = StudyNote(user_id=user_id, subject=subject, kind=kind, title=title, body=body)
+        if kind == FLASHCARD:
+            note.review_step = 0
+            note.due_date = today or date.today()
+        session.add(note)
+        session.commit()
+        return _as_dict(note)
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+def delete_note(user_id, note_id):
+    session = get_session()
+    try:
+        deleted = session.query(StudyNote).filter_by(id=note_id, user_id=user_id).delete(synchronize_session=False)
+        session.commit()
+        return bool(deleted)
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+def get_notes(user_id, subject=None, kind=None, limit=50):
+    """Most recently added notes and flashcards first"""
+    session = get_session()
+    try:
+        query = session.query(StudyNote).filter(StudyNote.user_id == user_id)
+        if subject:
+            query = query.filter(StudyNote.subject == subject)
+        if kind:
+            query = query.filter(StudyNote.kind == kind)
+        return [_as_dict(note) for note in query.order_by(StudyNote.id.desc()).limit(limit)]
+    finally:
+        session.close()
+
+
+def match_expression(query):
+    """FTS5 query for free text: every word must appear, the last one as a prefix while it is being typed"""
+    tokens = TOKEN.findall(query or "")
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    if query.rstrip() == query and len(tokens[-1]) >= MIN_PREFIX_LENGTH:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_notes(user_id, query, subject=None, limit=SEARCH_LIMIT):
+    """Best matching notes first, each with a snippet of its text and the matches in bold.
+
+    On SQLite this ranks with the FTS5 index (BM25, titles weighted up).
+    Only the newest MAX_RANKED_MATCHES matches are ranked: they are found
+    by walking the user's matches newest first, which FTS5 does without
+    scoring them. The ranking itself matches the search words alone, since
+    BM25 counts the notes matching every phrase in the query, and the
+    owner phrase matches all of the user's notes. Other databases fall back
+    to a substring match on the newest notes.
+    """
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    session = get_session()
+    try:
+        if session.bind.dialect.name != "sqlite":
+            return _search_like(session, user_id, TOKEN.findall(query), subject, limit)
+        match = f"owner:u{int(user_id)} AND ({expression})"
+        filters = ""
+        params = {"terms": expression, "max_ranked": MAX_RANKED_MATCHES, "limit": limit}
+        subject_tokens = TOKEN.findall(subject or "")
+        if subject_tokens:
+            # Narrow inside the index too, so the ranking cutoff counts only this subject's matches
+            match += f' AND subject:"{" ".join(subject_tokens)}"'
+            filters = " AND n.subject = :subject"
+            params["subject"] = subject
+        params["match"] = match
+        # The unary + keeps these away from FTS5, which would run the match again for every
+        # id in the list and score every row in the window, other users' included
+        rows = session.execute(text(f"""
+            WITH newest(id) AS (
+                SELECT rowid FROM study_notes_fts WHERE study_notes_fts MATCH :match
+                ORDER BY rowid DESC LIMIT :max_ranked
+            )
+            SELECT n.id, n.subject, n.kind, n.title, n.due_date,
+                   snippet(study_notes_fts, 3, '**', '**', '…', {SNIPPET_TOKENS}) AS snippet
+            FROM study_notes_fts JOIN study_notes n ON n.id = study_notes_fts.rowid
+            WHERE study_notes_fts MATCH :terms
+              AND study_notes_fts.rowid >= (SELECT min(id) FROM newest)
+              AND +study_notes_fts.rowid IN (SELECT id FROM newest){filters}
+            ORDER BY +rank LIMIT :limit
+        """), params).mappings().all()
+        return [dict(row) for row in rows]
+    finally:
+        session.close()
+
+
+def _search_like(session, user_id, tokens, subject, limit):
+    query = session.query(StudyNote).filter(StudyNote.user_id == user_id)
+    for token in tokens:
+        pattern = f"%{token}%"
+        query = query.filter(or_(StudyNote.title.ilike(pattern), StudyNote.body.ilike(pattern)))
+    if subject:
+        query = query.filter(StudyNote.subject == subject)
+    return [
+        {"id": note.id, "subject": note.subject, "kind": note.kind, "title": note.title,
+         "due_date": note.due_date, "snippet": note.body[:200]}
+        for note in query.order_by(StudyNote.id.desc()).limit(limit)
+    ]
+
+
+# Flashcards follow the subject's spaced-repetition schedule: the offsets from
+# generate_spaced_repetition_schedule are days after the card was learned, so a
+# card that keeps being remembered comes back on exactly the days the plan and
+# the study calendar reserve for reviewing that subject.
+
+def card_intervals(plan, subject, exam_date=None, today=None):
+    """Review offsets in days for a subject's flashcards, from its plan entry when it has one"""
+    today = today or date.today()
+    item = next((item for item in plan or [] if item["subject"] == subject), None)
+    if item and item.get("repetition_schedule"):
+        return item["repetition_schedule"]
+    difficulty = item["difficulty"] if item else "medium"
+    deadline = (item.get("deadline") if item else None) or exam_date or today + timedelta(days=30)
+    return generate_spaced_repetition_schedule(subject, difficulty, deadline)
+
+
+def review_gap(intervals, step):
+    """Days until the next review after `step` reviews in a row were passed; past the schedule its last gap repeats"""
+    if step < len(intervals):
+        gap = intervals[step] - (intervals[step - 1] if step else 0)
+    else:
+        gap = intervals[-1] - (intervals[-2] if len(intervals) > 1 else 0)
+    return max(1, gap)
+
+
+def review_flashcard(user_id, card_id, remembered, intervals, today=None):
+    """Record a review and return the card's next due date.
+
+    A remembered card moves one step along the schedule; a forgotten one
+    starts over from the first interval.
+    """
+    today = today or date.today()
+    session = get_session()
+    try:
+        card = session.query(StudyNote).filter_by(id=card_id, user_id=user_id, kind=FLASHCARD).first()
+        if card is None:
+            raise ValueError(f"No flashcard {card_id}")
+        step = card.review_step or 0
+        if remembered:
+            card.due_date = today + timedelta(days=review_gap(intervals, step))
+            card.review_step = step + 1
+        else:
+            card.due_date = today + timedelta(days=review_gap(intervals, 0))
+            card.review_step = 0
+        session.commit()
+        return card.due_date
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+def get_due_flashcards(user_id, subject=None, today=None, limit=SEARCH_LIMIT):
+    """Flashcards due today or overdue, the longest overdue first"""
+    today = today or date.today()
+    session = get_session()
+    try:
+        query = session.query(StudyNote).filter(
+            StudyNote.user_id == user_id,
+            StudyNote.kind == FLASHCARD,
+            StudyNote.due_date <= today
+        )
+        if subject:
+            query = query.filter(StudyNote.subject == subject)
+        return [_as_dict(card) for card in query.order_by(StudyNote.due_date, StudyNote.id).limit(limit)]
+    finally:
+        session.close()
+
+
+def get_due_counts(user_id, today=None):
+    """Number of flashcards due per subject"""
+    today = today or date.today()
+    session = get_session()
+    try:
+        rows = session.query(StudyNote.subject, func.count(StudyNote.id)).filter(
+            StudyNote.user_id == user_id,
+            StudyNote.kind == FLASHCARD,
+            StudyNote.due_date <= today
+        ).group_by(StudyNote.subject).all()
+        return dict(rows)
+    finally:
+        session.close()
+
+
+def iter_markdown_notes(lines, subject):
+    """(kind, subject, title, body) from Markdown.
+
+    Each heading starts a note whose body runs to the next heading. A
+    "Q:" line starts a flashcard and the "A:" line after it (plus any
+    lines up to a blank one) is its answer. Text before the first heading
+    becomes a note titled by its first line.
+    """
+    current = None
+    answering = False
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+        heading = HEADING.match(line)
+        question = QUESTION.match(line)
+        answer = ANSWER.match(line)
+        if heading or question:
+            if current:
+                yield current[0], subject, current[1], "\n".join(current[2])
+            current = (NOTE, heading.group(1), []) if heading else (FLASHCARD, question.group(1), [])
+            answering = False
+        elif current and current[0] == FLASHCARD:
+            if answer and not answering:
+                current[2].append(answer.group(1))
+                answering = True
+            elif answering and line.strip():
+                current[2].append(line)
+            elif answering:
+                # A blank line ends the answer; what follows belongs to no card
+                yield current[0], subject, current[1], "\n".join(current[2])
+                current = None
+        elif current:
+            current[2].append(line)
+        elif line.strip():
+            current = (NOTE, line.strip(), [])
+    if current:
+        yield current[0], subject, current[1], "\n".join(current[2])
+
+
+def iter_csv_notes(lines, subject=None):
+    """(kind, subject, title, body) from CSV with question/answer columns (flashcards) or title/body (notes).
+
+    A subject column overrides the subject passed in.
+    """
+    reader = csv.DictReader(lines)
+    fields = {name.strip().lower(): name for name in (reader.fieldnames or [])}
+    if "question" in fields and "answer" in fields:
+        kind, title_field, body_field = FLASHCARD, fields["question"], fields["answer"]
+    elif "title" in fields:
+        kind, title_field, body_field = NOTE, fields["title"], fields.get("body")
+    else:
+        raise ValueError("CSV must have question and answer columns, or title and body columns")
+    if "subject" not in fields and not subject:
+        raise ValueError("CSV has no subject column; choose a subject to import into")
+    for row in reader:
+        row_subject = row[fields["subject"]] if "subject" in fields else None
+        yield kind, row_subject or subject, row[title_field], row[body_field] if body_field else ""
+
+
+def import_notes(user_id, notes, progress_callback=None, today=None):
+    """Bulk insert (kind, subject, title, body) tuples in chunked statements.
+
+    Invalid entries are counted and the first few reported rather than
+    failing the import. Imported flashcards are due right away. Returns a
+    stats dict with read/inserted/rejected counts and errors.
+    """
+    today = today or date.today()
+    stats = {"read": 0, "inserted": 0, "rejected": 0}
+    errors = []
+    now = datetime.utcnow()
+    session = get_session()
+    try:
+        chunk = []
+        for kind, subject, title, body in notes:
+            stats["read"] += 1
+            try:
+                subject, title, body = _clean(subject, title, body, kind)
+            except ValueError as e:
+                stats["rejected"] += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append(f"Entry {stats['read']}: {e}")
+                continue
+            chunk.append({
+                "user_id": user_id, "subject": subject, "kind": kind, "title": title, "body": body,
+                "review_step": 0 if kind == FLASHCARD else None,
+                "due_date": today if kind == FLASHCARD else None,
+                "created_at": now, "updated_at": now,
+            })
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                session.execute(insert(StudyNote.__table__), chunk)
+                session.commit()
+                stats["inserted"] += len(chunk)
+                chunk = []
+                if progress_callback:
+                    progress_callback(stats)
+        if chunk:
+            session.execute(insert(StudyNote.__table__), chunk)
+            session.commit()
+            stats["inserted"] += len(chunk)
+        if progress_callback:
+            progress_callback(stats)
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+    stats["errors"] = errors
+    return stats
+
+
+def import_notes_file(user_id, name, lines, subject=None, progress_callback=None):
+    """Import a .md or .csv file of notes and flashcards"""
+    if name.lower().endswith(".csv"):
+        notes = iter_csv_notes(lines, subject)
+    else:
+        if not subject:
+            raise ValueError("Choose a subject to import the Markdown notes into")
+        notes = iter_markdown_notes(lines, subject)
+    return import_notes(user_id, notes, progress_callback=progress_callback)
+
+
+if __name__ == "__main__":
+    # Search latency over 100k notes for one user, with other users' notes in the same index
+    import argparse
+    import itertools
+    import os
+    import random
+    import statistics
+    import tempfile
+    import time
+
+    parser = argparse.ArgumentParser(description="Full-text search benchmark")
+    parser.add_argument("--notes", type=int, default=100000, help="Notes for the searching user")
+    parser.add_argument("--other-notes", type=int, default=50000, help="Notes spread over other users")
+    parser.add_argument("--queries", type=int, default=300)
+    args = parser.parse_args()
+
+    from sqlalchemy import create_engine
+    import database
+    from models import Base
+
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, "notes.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    create_search_index(engine)
+    database.SessionLocal.configure(bind=engine)
+    rng = random.Random(0)
+    syllables = ["ka", "to", "ri", "me", "su", "no", "la", "vi", "de", "po", "gu", "ex", "an", "or", "ith"]
+    vocabulary = sorted({"".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))) for _ in range(20000)})
+    # Zipf-like word frequencies, as in real text
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    subjects = ["Mathematics", "Physics", "Chemistry", "Biology", "History"]
+
+    def sentence(words):
+        return " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=words))
+
+    def generate(count):
+        for i in range(count):
+            kind = FLASHCARD if i % 5 == 0 else NOTE
+            yield kind, subjects[i % len(subjects)], sentence(6), sentence(20 if kind == FLASHCARD else 80)
+
+    started = time.perf_counter()
+    stats = import_notes(1, generate(args.notes))
+    elapsed = time.perf_counter() - started
+    print(f"imported {stats['inserted']} notes in {elapsed:.1f} s ({stats['inserted'] / elapsed:.0f}/s)")
+    for user_id in range(2, 12):
+        import_notes(user_id, generate(args.other_notes // 10))
+    print(f"database {os.path.getsize(path) / 2**20:.0f} MB "
+          f"with {args.other_notes} notes from 10 other users")
+
+    def timed(queries, **kwargs):
+        search_notes(1, queries[0], **kwargs)
+        times, hits = [], []
+        for query in queries:
+            started = time.perf_counter()
+            hits.append(len(search_notes(1, query, **kwargs)))
+            times.append((time.perf_counter() - started) * 1000)
+        times.sort()
+        return statistics.median(times), times[int(len(times) * 0.95)], times[-1], statistics.mean(hits)
+
+    typical = vocabulary[200:]
+    cases = {
+        "one word": [rng.choice(typical) + " " for _ in range(args.queries)],
+        "two words": [f"{rng.choice(typical)} {rng.choice(typical)} " for _ in range(args.queries)],
+        "prefix while typing": [rng.choice(typical)[:rng.randint(3, 6)] for _ in range(args.queries)],
+        "one word, one subject": ([rng.choice(typical) + " " for _ in range(args.queries)], {"subject": "Physics"}),
+        "20 most common words": [vocabulary[i] + " " for i in range(20)],
+    }
+    print(f"{'query':24s} {'median':>8s} {'p95':>8s} {'max':>8s} {'hits':>6s}")
+    for name, case in cases.items():
+        queries, kwargs = case if isinstance(case, tuple) else (case, {})
+        median, p95, worst, hits = timed(queries, **kwargs)
+        print(f"{name:24s} {median:6.2f}ms {p95:6.2f}ms {worst:6.2f}ms {hits:6.1f}")
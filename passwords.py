@@ -0,0 +1,244 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# scrypt with these settings takes ~50 ms and 16 MB per hash
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SCRYPT_MAXMEM = 64 * 2 ** 20
+# Used where OpenSSL was built without scrypt
+PBKDF2_ITERATIONS = 600000
+SALT_BYTES = 16
+
+SCRYPT = "scrypt"
+PBKDF2 = "pbkdf2_sha256"
+DEFAULT_SCHEME = SCRYPT if hasattr(hashlib, "scrypt") else PBKDF2
+
+# Hashing is CPU and memory bound; more workers than cores only adds memory
+MAX_HASH_WORKERS = min(4, os.cpu_count() or 1)
+MAX_PENDING_HASHES = 64
+HASH_WAIT_SECONDS = 5
+
+
+class PasswordHasherBusy(RuntimeError):
+    pass
+
+
+def _b64(raw):
+    return base64.b64encode(raw).decode().rstrip("=")
+
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=SCRYPT_MAXMEM, dklen=32)
+
+
+def _pbkdf2(password, salt, iterations):
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+
+
+def hash_password(password, scheme=DEFAULT_SCHEME):
+    """Salted hash stored as scheme$parameters$salt$hash"""
+    salt = os.urandom(SALT_BYTES)
+    if scheme == SCRYPT:
+        digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+        return f"{SCRYPT}${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+    if scheme == PBKDF2:
+        digest = _pbkdf2(password, salt, PBKDF2_ITERATIONS)
+        return f"{PBKDF2}${PBKDF2_ITERATIONS}${_b64(salt)}${_b64(digest)}"
+    raise ValueError(f"Unknown password scheme: {scheme}")
+
+
+def verify_password(stored, password):
+    """Check a password against a stored hash, including unsalted SHA-256 hashes from before salting"""
+    parts = stored.split("$")
+    if parts[0] == SCRYPT and len(parts) == 6:
+        n, r, p = (int(value) for value in parts[1:4])
+        digest = _scrypt(password, _unb64(parts[4]), n, r, p)
+    elif parts[0] == PBKDF2 and len(parts) == 4:
+        digest = _pbkdf2(password, _unb64(parts[2]), int(parts[1]))
+    elif len(parts) == 1:
+        return hmac.compare_digest(stored, hashlib.sha256(password.encode()).hexdigest())
+    else:
+        return False
+    return hmac.compare_digest(_b64(digest), parts[-1])
+
+
+def needs_rehash(stored, scheme=DEFAULT_SCHEME):
+    """Whether a hash predates the current scheme or its parameters and should be replaced at next login"""
+    if scheme == SCRYPT:
+        return not stored.startswith(f"{SCRYPT}${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$")
+    return not stored.startswith(f"{PBKDF2}${PBKDF2_ITERATIONS}$")
+
+
+class PasswordHasher:
+    """Runs password hashing on a small thread pool with a cap on waiting requests.
+
+    hashlib releases the GIL while it hashes, so up to max_workers hashes
+    run in parallel without stalling other threads. Beyond max_workers +
+    max_pending requests in flight, callers wait up to wait_seconds for a
+    slot and then get PasswordHasherBusy, so a burst of logins can't queue
+    unbounded memory-hard work.
+    """
+
+    def __init__(self, max_workers=MAX_HASH_WORKERS, max_pending=MAX_PENDING_HASHES, wait_seconds=HASH_WAIT_SECONDS):
+        self.max_workers = max_workers
+        self.wait_seconds = wait_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password")
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._dummy = None
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def _call(self, fn, *args):
+        if not self._slots.acquire(timeout=self.wait_seconds):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusy("Too many sign-ins in progress, try again shortly")
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, password):
+        return self._call(hash_password, password)
+
+    def verify(self, stored, password):
+        return self._call(verify_password, stored, password)
+
+    def verify_missing(self, password):
+        """Spend the same time as a real check, so unknown usernames can't be told apart by timing"""
+        if self._dummy is None:
+            self._dummy = self.hash("")
+        self.verify(self._dummy, password)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+
+def get_password_hasher():
+    """Process-wide hasher shared by every Streamlit session and API request"""
+    global _hasher
+    with _hasher_lock:
+        if _hasher is None:
+            _hasher = PasswordHasher()
+        return _hasher
+
+
+if __name__ == "__main__":
+    # Login throughput against a scratch database: legacy SHA-256 vs the
+    # current scheme, sequential and from concurrent clients.
+    import argparse
+    import tempfile
+    import time
+
+    parser = argparse.ArgumentParser(description="Login throughput benchmark")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=16)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'logins.db')}"
+    from database import get_session
+    from init_db import initialize_database
+    from models import User
+    from core.auth import authenticate, register_user
+
+    initialize_database()
+    session = get_session()
+    try:
+        session.add(User(username="legacy", password=hashlib.sha256(b"secret").hexdigest()))
+        session.commit()
+    finally:
+        session.close()
+    register_user("current", "secret")
+
+    def throughput(username, logins, clients):
+        done = threading.Semaphore(0)
+        per_client = [logins // clients + (i < logins % clients) for i in range(clients)]
+        failures = []
+
+        def client(count):
+            for _ in range(count):
+                if authenticate(username, "secret") is None:
+                    failures.append(username)
+            done.release()
+
+        started = time.perf_counter()
+        for count in per_client:
+            threading.Thread(target=client, args=(count,)).start()
+        for _ in per_client:
+            done.acquire()
+        elapsed = time.perf_counter() - started
+        assert not failures, f"{len(failures)} failed logins"
+        return logins / elapsed, elapsed / logins * clients
+
+    started = time.perf_counter()
+    for _ in range(1000):
+        verify_password(hashlib.sha256(b"secret").hexdigest(), "secret")
+    legacy_cost = (time.perf_counter() - started) / 1000
+    started = time.perf_counter()
+    stored = hash_password("secret")
+    for _ in range(5):
+        verify_password(stored, "secret")
+    current_cost = (time.perf_counter() - started) / 6
+    print(f"hash cost: SHA-256 {legacy_cost * 1e6:.1f} µs, {DEFAULT_SCHEME} {current_cost * 1000:.1f} ms")
+
+    # The first login upgrades the legacy hash in place
+    assert authenticate("legacy", "secret") is not None
+    session = get_session()
+    try:
+        upgraded = session.query(User).filter_by(username="legacy").one().password
+    finally:
+        session.close()
+    assert not needs_rehash(upgraded), "legacy hash was not upgraded on login"
+    print(f"legacy hash upgraded to {upgraded.split('$')[0]} on first login")
+
+    hasher = get_password_hasher()
+    for clients in (1, args.clients):
+        rate, latency = throughput("current", args.logins, clients)
+        print(f"{clients:3d} clients: {rate:6.1f} logins/s, {latency * 1000:6.1f} ms per login "
+              f"({hasher.max_workers} hashing workers on {os.cpu_count()} CPUs)")
+
+    # A burst bigger than the pool plus its queue is turned away instead of piling up
+    small = PasswordHasher(max_workers=1, max_pending=2, wait_seconds=0.01)
+    outcomes = []
+
+    def burst():
+        try:
+            small.verify(stored, "secret")
+            outcomes.append("ok")
+        except PasswordHasherBusy:
+            outcomes.append("busy")
+
+    threads = [threading.Thread(target=burst) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"burst of 20 against 1 worker + 2 queued: {outcomes.count('ok')} verified, "
+          f"{outcomes.count('busy')} told to retry")
+
+    # Concurrent registrations of one name: exactly one wins
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(register_user("race", "secret"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(True) == 1, f"{results.count(True)} registrations succeeded"
+    print(f"8 concurrent registrations of one username: 1 created, {results.count(False)} rejected")
@@ -0,0 +1,79 @@
+import copy
+import threading
+from collections import OrderedDict
+
+MAX_CACHED_PLANS = 1000
+MAX_GENERATED_PLANS = 500
+
+# Stored for users known to have no plan, so they don't miss every time either
+NO_PLAN = object()
+
+
+class PlanCache:
+    """Process-wide LRU of decoded study plans keyed by user ID.
+
+    Plans are copied on the way in and out, so callers that edit a plan in
+    place (replanning, the Streamlit form) can't change the cached version.
+    Entries can be stored with a version read from the database; a lookup
+    with a different version is a miss, so writes from another process
+    are picked up on the next read.
+    study_planner keeps a second instance keyed by normalized generation
+    inputs, so identical "Generate Study Plan" requests share one result.
+    """
+
+    def __init__(self, max_entries=MAX_CACHED_PLANS):
+        self.max_entries = max_entries
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id, version=None):
+        """The cached plan (or NO_PLAN), or None on a miss or when it was stored under another version"""
+        with self._lock:
+            cached_version, plan = self._plans.get(user_id, (None, None))
+            if plan is None or cached_version != version:
+                self.misses += 1
+                return None
+            self._plans.move_to_end(user_id)
+            self.hits += 1
+        return plan if plan is NO_PLAN else copy.deepcopy(plan)
+
+    def put(self, user_id, plan, version=None):
+        plan = NO_PLAN if not plan else copy.deepcopy(plan)
+        with self._lock:
+            self._plans[user_id] = (version, plan)
+            self._plans.move_to_end(user_id)
+            while len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+                self.evictions += 1
+
+    def update(self, user_id, fn, version=None):
+        """Apply fn to the cached plan in place, if one is cached, and store it under version"""
+        with self._lock:
+            if user_id not in self._plans:
+                return
+            _, plan = self._plans[user_id]
+            if plan is not NO_PLAN:
+                fn(plan)
+            self._plans[user_id] = (version, plan)
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._plans.clear()
+            else:
+                self._plans.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._plans),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -1,36 +1,28 @@
 import streamlit as st
 import time
 from datetime import datetime, timedelta
-import json
-import os
 import random
+from core.sessions import save_session, get_pomodoro_history
+from core.preferences import DEFAULT_PREFERENCES
 
-POMODORO_FILE = "pomodoro_sessions.json"
+HISTORY_PAGE_SIZE = 5
+NO_SUBJECT = "No subject"
 
-def save_session(start_time, end_time, session_type):
-    session = {
-        "start": start_time.isoformat(),
-        "end": end_time.isoformat(),
-        "type": session_type
-    }
-    
-    sessions = []
-    if os.path.exists(POMODORO_FILE):
-        with open(POMODORO_FILE, "r") as f:
-            sessions = json.load(f)
-    
-    sessions.append(session)
-    
-    with open(POMODORO_FILE, "w") as f:
-        json.dump(sessions, f)
+def plan_subjects():
+    """Subjects from the current plan, for tagging timer sessions"""
+    return [NO_SUBJECT] + [item['subject'] for item in st.session_state.get('plan') or []]
+
+def timer_owner(subject_key):
+    """(user_id, subject) to log a finished timer session under"""
+    user = st.session_state.get('user')
+    subject = st.session_state.get(subject_key)
+    return (user.id if user else None), (None if subject == NO_SUBJECT else subject)
 
-def load_sessions():
-    if os.path.exists(POMODORO_FILE):
-        with open(POMODORO_FILE, "r") as f:
-            return json.load(f)
-    return []
+def timer_preferences():
+    """Saved focus and break lengths for the logged-in user"""
+    return st.session_state.get('preferences') or DEFAULT_PREFERENCES
 
-def show_pomodoro_timer():
+def show_pomodoro_timer(history=None):
     st.subheader("🍅 Pomodoro Timer")
     st.caption("Work in focused 25-minute intervals with 5-minute breaks")
     
@@ -48,7 +40,10 @@ def show_pomodoro_timer():
     
     with col1:
         session_type = st.radio("Session Type", ["Work", "Break"], index=0 if st.session_state.session_type == "Work" else 1)
-        session_length = st.slider("Minutes", 1, 60, 25 if session_type == "Work" else 5)
+        prefs = timer_preferences()
+        session_length = st.slider("Minutes", 1, 60, min(60, prefs['focus_minutes']) if session_type == "Work" else prefs['break_minutes'])
+        subject = st.selectbox("Subject", plan_subjects(), key="pomodoro_subject",
+                               disabled=st.session_state.timer_running)
     
     with col2:
         time_placeholder = st.empty()
@@ -61,10 +56,13 @@ def show_pomodoro_timer():
         
         if remaining.total_seconds() <= 0:
             st.session_state.timer_running = False
+            user_id, timer_subject = timer_owner('timer_subject')
             save_session(
                 st.session_state.start_time,
                 datetime.now(),
-                st.session_state.session_type
+                st.session_state.session_type,
+                user_id=user_id,
+                subject=timer_subject
             )
             st.session_state.start_time = None
             st.session_state.end_time = None
@@ -76,10 +74,13 @@ def show_pomodoro_timer():
         
         if button_placeholder.button("Stop Session"):
             st.session_state.timer_running = False
+            user_id, timer_subject = timer_owner('timer_subject')
             save_session(
                 st.session_state.start_time,
                 datetime.now(),
-                st.session_state.session_type
+                st.session_state.session_type,
+                user_id=user_id,
+                subject=timer_subject
             )
             st.session_state.start_time = None
             st.session_state.end_time = None
@@ -93,35 +94,40 @@ def show_pomodoro_timer():
             st.session_state.start_time = datetime.now()
             st.session_state.end_time = datetime.now() + timedelta(minutes=session_length)
             st.session_state.session_type = session_type
+            st.session_state.timer_subject = subject
             st.experimental_rerun()
     
     # Session history
     st.subheader("Session History")
-    sessions = load_sessions()
+    if history is None:
+        history = get_pomodoro_history()
     
-    if sessions:
+    if len(history):
         # Calculate stats
-        work_sessions = sum(1 for s in sessions if s['type'] == 'Work')
-        break_sessions = sum(1 for s in sessions if s['type'] == 'Break')
-        
-        # Fixed: Corrected parentheses mismatch
-        total_work_minutes = sum(
-            (datetime.fromisoformat(s['end']) - datetime.fromisoformat(s['start'])).total_seconds() / 60
-            for s in sessions if s['type'] == 'Work'
-        )
+        work_sessions = history.count('Work')
+        break_sessions = history.count('Break')
+        total_work_minutes = history.total_minutes('Work')
         
         col1, col2, col3 = st.columns(3)
         col1.metric("Work Sessions", work_sessions)
         col2.metric("Break Sessions", break_sessions)
         col3.metric("Total Work Time", f"{total_work_minutes:.1f} min")
         
-        # Show recent sessions
+        # Show recent sessions, newest first, a page at a time
+        if 'pomodoro_history_shown' not in st.session_state:
+            st.session_state.pomodoro_history_shown = HISTORY_PAGE_SIZE
+        
         st.write("Recent Sessions:")
-        for session in sessions[-5:]:
-            start = datetime.fromisoformat(session['start']).strftime("%Y-%m-%d %H:%M")
-            end = datetime.fromisoformat(session['end']).strftime("%H:%M")
-            duration = (datetime.fromisoformat(session['end']) - datetime.fromisoformat(session['start'])).seconds // 60
+        sessions, cursor = history.page(limit=st.session_state.pomodoro_history_shown)
+        for session in sessions:
+            start = session['start'].strftime("%Y-%m-%d %H:%M")
+            end = session['end'].strftime("%H:%M")
+            duration = int(session['duration'])
             st.caption(f"🕒 {start} to {end} | {session['type']} session | {duration} min")
+        
+        if cursor is not None and st.button("Load more sessions"):
+            st.session_state.pomodoro_history_shown += HISTORY_PAGE_SIZE
+            st.experimental_rerun()
     else:
         st.info("No sessions recorded yet. Start a session to see your history.")
     
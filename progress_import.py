@@ -0,0 +1,179 @@
+import csv
+import io
+from datetime import date, datetime
+from sqlalchemy import select, insert
+from database import get_session
+from models import User, Progress, StudyPlan
+from cohorts import apply_progress_delta
+from leaderboards import refresh_leaderboards
+
+CHUNK_SIZE = 5000
+CHUNKS_PER_TRANSACTION = 20
+MAX_REPORTED_ERRORS = 20
+
+DATE_FORMATS = ["%m/%d/%Y", "%d.%m.%Y"]
+HOURS_COLUMNS = ["hours", "hours_studied"]
+# Excel starts UTF-8 CSVs with a byte order mark, which this codec drops
+CSV_ENCODING = "utf-8-sig"
+
+
+def csv_text(raw):
+    """Text lines of an uploaded CSV file's bytes"""
+    return io.TextIOWrapper(raw, encoding=CSV_ENCODING, errors="ignore", newline="")
+
+
+def _parse_date(value):
+    value = value.strip()
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognized date '{value}'")
+
+
+def _parse_hours(value):
+    hours = float(value)
+    if not 0 <= hours <= 24:
+        raise ValueError(f"hours out of range: {hours}")
+    return hours
+
+
+def _subject_map(session, user_id):
+    """Map lowercased plan subjects to their canonical spelling"""
+    subjects = session.scalars(select(StudyPlan.subject).where(StudyPlan.user_id == user_id)).all()
+    return {subject.lower(): subject for subject in subjects}
+
+
+def iter_progress_rows(lines, subject_map, errors, stats):
+    """Parse and validate CSV rows, yielding (date, subject, hours)"""
+    reader = csv.DictReader(lines)
+    fields = {name.strip().lower(): name for name in (reader.fieldnames or [])}
+    hours_field = next((fields[c] for c in HOURS_COLUMNS if c in fields), None)
+    if "date" not in fields or "subject" not in fields or not hours_field:
+        raise ValueError("CSV must have date, subject and hours columns")
+
+    for line_number, row in enumerate(reader, start=2):
+        stats["read"] += 1
+        try:
+            day = _parse_date(row[fields["date"]] or "")
+            hours = _parse_hours(row[hours_field] or "")
+            subject = (row[fields["subject"]] or "").strip()
+            if not subject:
+                raise ValueError("missing subject")
+            if subject_map:
+                if subject.lower() not in subject_map:
+                    raise ValueError(f"subject '{subject}' is not in your plan")
+                subject = subject_map[subject.lower()]
+        except (ValueError, TypeError) as e:
+            stats["rejected"] += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append(f"Line {line_number}: {e}")
+            continue
+        yield day, subject, hours
+
+
+def _insert_chunk(session, user_id, chunk, stats):
+    # Last row wins for duplicates inside the file
+    rows = {(day, subject): hours for day, subject, hours in chunk}
+    stats["skipped"] += len(chunk) - len(rows)
+
+    days = [day for day, _ in rows]
+    existing = session.execute(
+        select(Progress.date, Progress.subject).where(
+            Progress.user_id == user_id,
+            Progress.date.between(min(days), max(days)),
+            Progress.subject.in_({subject for _, subject in rows}),
+        )
+    ).all()
+    for key in existing:
+        if rows.pop(tuple(key), None) is not None:
+            stats["skipped"] += 1
+
+    if rows:
+        # Core insert skips ORM bookkeeping for plain executemany batches
+        session.execute(insert(Progress.__table__), [
+            {"user_id": user_id, "date": day, "subject": subject, "hours_studied": hours}
+            for (day, subject), hours in rows.items()
+        ])
+        apply_progress_delta(session, user_id, rows)
+        stats["inserted"] += len(rows)
+
+
+def import_progress_csv(user_id, lines, progress_callback=None, session=None):
+    """Stream a date/subject/hours CSV into the Progress table.
+
+    Rows are inserted in chunked bulk statements, committing every few
+    chunks, and (user, date, subject) rows that already exist are skipped.
+    Subjects are matched case-insensitively against the user's plan when
+    one exists. Returns a stats dict with read/inserted/skipped/rejected
+    counts and the first few validation errors.
+    """
+    stats = {"read": 0, "inserted": 0, "skipped": 0, "rejected": 0}
+    errors = []
+    own_session = session is None
+    if own_session:
+        session = get_session()
+    try:
+        subject_map = _subject_map(session, user_id)
+        chunk = []
+        chunks_in_transaction = 0
+        for row in iter_progress_rows(lines, subject_map, errors, stats):
+            chunk.append(row)
+            if len(chunk) < CHUNK_SIZE:
+                continue
+            _insert_chunk(session, user_id, chunk, stats)
+            chunk = []
+            chunks_in_transaction += 1
+            if chunks_in_transaction >= CHUNKS_PER_TRANSACTION:
+                session.commit()
+                chunks_in_transaction = 0
+            if progress_callback:
+                progress_callback(stats)
+        if chunk:
+            _insert_chunk(session, user_id, chunk, stats)
+        session.commit()
+        if progress_callback:
+            progress_callback(stats)
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        if own_session:
+            session.close()
+    if stats["inserted"]:
+        refresh_leaderboards([user_id])
+    stats["errors"] = errors
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Import study history (date, subject, hours) from a CSV file")
+    parser.add_argument("username")
+    parser.add_argument("csv_file")
+    args = parser.parse_args()
+
+    session = get_session()
+    try:
+        user = session.query(User).filter_by(username=args.username).first()
+    finally:
+        session.close()
+    if not user:
+        sys.exit(f"Unknown user: {args.username}")
+
+    def report(stats):
+        print(f"\r{stats['read']} rows read, {stats['inserted']} inserted, "
+              f"{stats['skipped']} duplicates, {stats['rejected']} rejected", end="", flush=True)
+
+    with open(args.csv_file, newline="", encoding=CSV_ENCODING) as f:
+        result = import_progress_csv(user.id, f, progress_callback=report)
+    print()
+    for error in result["errors"]:
+        print(error)
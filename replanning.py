@@ -0,0 +1,118 @@
+from datetime import date, timedelta
+from sqlalchemy import select, func
+from database import get_session
+from models import Progress
+from allocation import allocate_hours
+from study_planner import update_plan_hours
+
+REPLAN_TOLERANCE = 0.25
+MIN_DAILY_HOURS = 0.5
+
+
+def get_studied_hours(user_id, subjects, since, session=None):
+    """Total hours recorded per subject since a date, in one grouped query"""
+    own_session = session is None
+    if own_session:
+        session = get_session()
+    try:
+        rows = session.execute(
+            select(Progress.subject, func.sum(Progress.hours_studied)).where(
+                Progress.user_id == user_id,
+                Progress.subject.in_(subjects),
+                Progress.date >= since,
+            ).group_by(Progress.subject)
+        ).all()
+    finally:
+        if own_session:
+            session.close()
+    return {subject: total or 0.0 for subject, total in rows}
+
+
+def planned_hours_on(item, day):
+    if item.get("daily_allocation"):
+        return item["daily_allocation"].get(day, 0.0)
+    return item["hours"]
+
+
+def _target_hours(item, deadline):
+    if item.get("target_hours") is not None:
+        return item["target_hours"]
+    start = item.get("start_date") or date.today()
+    return item["hours"] * max(1, (deadline - start).days)
+
+
+def _residual_capacity(plan, affected, start):
+    """Hours per day still free once untouched subjects keep their allocations"""
+    totals = {}
+    for item in plan:
+        for day, hours in item.get("daily_allocation", {}).items():
+            if day >= start:
+                totals.setdefault(day, [0.0, 0.0])
+                totals[day][item["subject"] in affected] += hours
+    capacity = max([sum(t) for t in totals.values()] + [sum(item["hours"] for item in plan)])
+    return capacity, {day: round(capacity - untouched, 1) for day, (untouched, _) in totals.items()}
+
+
+def replan_after_progress(user_id, plan, exam_date, saved_hours, today=None):
+    """Rebalance only the subjects whose recorded hours today missed the plan.
+
+    For each such subject the hours still owed towards its target are spread
+    over the days left until its deadline. Subjects with a day-by-day
+    allocation are re-allocated into the capacity that untouched subjects
+    leave free, keeping those subjects' existing allocations as they are.
+    Updates the plan items in place, persists only the changed rows (hours
+    and allocations) and returns {subject: new daily hours}.
+    """
+    today = today or date.today()
+    affected = {
+        item["subject"] for item in plan
+        if item["subject"] in saved_hours
+        and abs(saved_hours[item["subject"]] - planned_hours_on(item, today)) >= REPLAN_TOLERANCE
+    }
+    if not affected:
+        return {}
+
+    items = [item for item in plan if item["subject"] in affected]
+    since = min(item.get("start_date") or today for item in items)
+    studied = get_studied_hours(user_id, list(affected), since)
+    tomorrow = today + timedelta(days=1)
+
+    remaining = {}
+    for item in items:
+        deadline = item.get("deadline") or exam_date
+        days_left = (deadline - tomorrow).days
+        if days_left > 0:
+            owed = _target_hours(item, deadline) - studied.get(item["subject"], 0.0)
+            remaining[item["subject"]] = (max(0.0, owed), deadline, days_left)
+
+    allocated = [item for item in items if item.get("daily_allocation") and item["subject"] in remaining]
+    allocations = {}
+    if allocated:
+        capacity, residual = _residual_capacity(plan, affected, tomorrow)
+        new_allocation, _ = allocate_hours([
+            {
+                "subject": item["subject"],
+                "deadline": remaining[item["subject"]][1],
+                "required_hours": remaining[item["subject"]][0],
+                "max_daily_hours": max(MIN_DAILY_HOURS, item["hours"] * 2)
+            }
+            for item in allocated
+        ], capacity, start=tomorrow, capacity_by_day=residual)
+        for item in allocated:
+            subject = item["subject"]
+            kept = {day: hours for day, hours in item["daily_allocation"].items() if day < tomorrow}
+            kept.update({day: hours[subject] for day, hours in new_allocation.items() if subject in hours})
+            if kept != item["daily_allocation"]:
+                item["daily_allocation"] = allocations[subject] = kept
+
+    changes = {}
+    for item in items:
+        if item["subject"] not in remaining:
+            continue
+        owed, _, days_left = remaining[item["subject"]]
+        hours = max(MIN_DAILY_HOURS, round(owed / days_left, 1))
+        if hours != item["hours"]:
+            item["hours"] = changes[item["subject"]] = hours
+    if changes or allocations:
+        update_plan_hours(user_id, changes, allocations)
+    return changes
@@ -4,7 +4,7 @@ import pandas as pd
 import os
 import tempfile
 
-def generate_study_report(user, plan, exam_date, resources, focus_data):
+def generate_study_report(user, plan, exam_date, resources, focus_history, forecast=None):
     # Create PDF report
     pdf = FPDF()
     pdf.add_page()
@@ -55,18 +55,35 @@ def generate_study_report(user, plan, exam_date, resources, focus_data):
         pdf.cell(200, 10, f"{subject}: {url}", ln=1)
     
     # Focus analytics
-    if focus_data:
+    if len(focus_history):
         pdf.ln(10)
         pdf.set_font("Arial", 'B', 14)
         pdf.cell(200, 10, "Focus Analytics", ln=1)
         pdf.set_font("Arial", size=10)
         
-        total_minutes = sum(s['duration'] for s in focus_data)
-        avg_duration = total_minutes / len(focus_data)
+        pdf.cell(200, 10, f"Total Focus Time: {focus_history.total_minutes():.0f} minutes", ln=1)
+        pdf.cell(200, 10, f"Average Session: {focus_history.mean_minutes():.1f} minutes", ln=1)
+        pdf.cell(200, 10, f"Sessions Completed: {len(focus_history)}", ln=1)
+    
+    # Study forecast
+    if forecast:
+        pdf.ln(10)
+        pdf.set_font("Arial", 'B', 14)
+        pdf.cell(200, 10, "Study Forecast", ln=1)
+        pdf.set_font("Arial", size=10)
         
-        pdf.cell(200, 10, f"Total Focus Time: {total_minutes:.0f} minutes", ln=1)
-        pdf.cell(200, 10, f"Average Session: {avg_duration:.1f} minutes", ln=1)
-        pdf.cell(200, 10, f"Sessions Completed: {len(focus_data)}", ln=1)
+        col_widths = [50, 30, 35, 25, 50]
+        headers = ["Subject", "Total Hours", "7-Day Avg/Day", "Streak", "Projected by Exam"]
+        for i, header in enumerate(headers):
+            pdf.cell(col_widths[i], 10, header, 1)
+        pdf.ln()
+        for subject, trend in forecast.items():
+            pdf.cell(col_widths[0], 10, subject, 1)
+            pdf.cell(col_widths[1], 10, f"{trend['total']:.1f}", 1)
+            pdf.cell(col_widths[2], 10, f"{trend['rolling_mean'][-1]:.1f}", 1)
+            pdf.cell(col_widths[3], 10, f"{trend['streak']} days", 1)
+            pdf.cell(col_widths[4], 10, f"{trend['projected_total']:.0f} h", 1)
+            pdf.ln()
     
     # Save to temp file
     temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
@@ -84,9 +101,9 @@ def generate_study_schedule_csv(plan):
                 schedule[day].append(f"{subject['subject']} ({subject['hours']}h)")
     
     # Create CSV content
-    csv_content = "Day,Subjects\n"
+    lines = ["Day,Subjects\n"]
     for day in days:
         subjects = "; ".join(schedule[day]) if schedule[day] else "Rest day"
-        csv_content += f"{day},{subjects}\n"
+        lines.append(f"{day},{subjects}\n")
     
-    return csv_content
\ No newline at end of file
+    return "".join(lines)
\ No newline at end of file
@@ -0,0 +1,209 @@
+"""Rerun latency of the Streamlit app per interaction, with every section as a tab vs only the active one.
+
+Drives streamlit_app.py headlessly with streamlit.testing's AppTest against
+a scratch database and session files in a temporary directory, for a user
+with a five-subject plan, a year of progress and a few thousand timer
+sessions. Each interaction is repeated and the median rerun time reported,
+along with the SQL statements and data file reads the rerun made.
+tests/test_rerun_data.py drives the same interactions and checks that no
+rerun reads a session file again or fetches the same data twice.
+
+    python rerun_benchmark.py --repeat 5
+"""
+import argparse
+import importlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+SUBJECTS = ["Mathematics", "Physics", "Chemistry", "Biology", "History"]
+PLAN_SECTION = "📚 Study Plan"
+SETTINGS_SECTION = "⚙️ Settings"
+ANALYTICS_SECTION = "📊 Analytics"
+# The loaders behind RerunData's datasets, by defining module
+DATASET_LOADERS = {
+    "core.progress": ["get_progress_since", "get_timer_hours"],
+    "core.sessions": ["get_focus_history", "get_pomodoro_history"],
+    "core.plans": ["recommend_resources"],
+    "core.preferences": ["get_preferences"],
+    "forecasting": ["get_trends"],
+    "heatmaps": ["get_calendar_heatmap", "get_hourly_matrix"],
+    "notes": ["get_due_counts"],
+}
+# Modules that import the loaders by name; streamlit_app itself re-imports them on every rerun
+APP_MODULES = ["core", "core.rerun_data", "pomodoro_timer", "focus_tools"]
+
+
+def seed(workdir, sessions=3000):
+    """Scratch user with a plan, a year of progress and timer session files; returns the user"""
+    from database import get_session
+    from init_db import initialize_database
+    from models import User
+    from core.plans import generate_ai_study_plan, save_user_state
+    from progress_import import import_progress_csv
+
+    initialize_database()
+    session = get_session()
+    try:
+        user = User(username="rerun-benchmark")
+        user.set_password("rerun-benchmark")
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        session.expunge(user)
+    finally:
+        session.close()
+
+    _, plan = generate_ai_study_plan(
+        [{"subject": subject, "difficulty": "medium", "priority": "high"} for subject in SUBJECTS],
+        7, "medium", 4, date.today() + timedelta(days=60)
+    )
+    save_user_state(user.id, plan)
+    rows = ["date,subject,hours"] + [
+        f"{date.today() - timedelta(days=day)},{subject},{(day + n) % 4 * 0.5}"
+        for day in range(1, 366) for n, subject in enumerate(SUBJECTS)
+    ]
+    import_progress_csv(user.id, [row + "\n" for row in rows])
+
+    first = datetime.now() - timedelta(days=365)
+    focus, pomodoro = [], []
+    for i in range(sessions):
+        start = first + timedelta(hours=3 * i)
+        focus.append({"start": start.isoformat(), "end": (start + timedelta(minutes=45)).isoformat(),
+                      "duration": 45, "distractions": i % 4})
+        pomodoro.append({"start": start.isoformat(), "end": (start + timedelta(minutes=25)).isoformat(),
+                         "type": "Work" if i % 2 == 0 else "Break"})
+    with open(os.path.join(workdir, "focus_sessions.json"), "w") as f:
+        json.dump(focus, f)
+    with open(os.path.join(workdir, "pomodoro_sessions.json"), "w") as f:
+        json.dump(pomodoro, f)
+    return user
+
+
+def count_fetches(patch=setattr):
+    """Make every dataset loader, wherever the app imported it, count its calls in io_counts()"""
+    from database import io_counts
+
+    for name in APP_MODULES:
+        importlib.import_module(name)
+    app_modules = [module for module in list(sys.modules.values())
+                   if (getattr(module, "__file__", None) or "").startswith(APP_DIR)]
+    for module_name, names in DATASET_LOADERS.items():
+        defining = importlib.import_module(module_name)
+        for name in names:
+            original = getattr(defining, name)
+
+            def counted(*args, _original=original, _name=name, **kwargs):
+                io_counts()[("fetch", _name)] += 1
+                return _original(*args, **kwargs)
+            for module in app_modules:
+                if getattr(module, name, None) is original:
+                    patch(module, name, counted)
+
+
+def fetches(rerun_data):
+    """Calls per dataset loader on the rerun's thread since the RerunData was created"""
+    counts = Counter(rerun_data.counts)
+    counts.subtract(rerun_data.started)
+    return {key[1]: count for key, count in counts.items() if isinstance(key, tuple) and count}
+
+
+def timed(at, io=None):
+    started = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - started
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    if io is not None:
+        rerun_data = at.session_state["rerun_data"]
+        stats = rerun_data.stats()
+        stats["fetches"] = fetches(rerun_data)
+        io.append(stats)
+    return elapsed
+
+
+def measure(navigation, user, repeat):
+    """Median rerun seconds and the SQL statements and file reads per interaction for one navigation mode"""
+    from streamlit.testing.v1 import AppTest
+    from core.plans import load_user_state
+    from core.preferences import get_preferences
+
+    os.environ["STUDY_PLANNER_NAVIGATION"] = navigation
+    at = AppTest.from_file(os.path.join(APP_DIR, "streamlit_app.py"), default_timeout=120)
+    # What logging in loads
+    at.session_state["user"] = user
+    at.session_state["plan"] = load_user_state(user.id)
+    at.session_state["preferences"] = get_preferences(user.id)
+    at.run()
+    at.run()
+    sections = navigation == "sections"
+    results = {"first load": [], "drag a Study Plan slider": [], "type a subject": [],
+               "toggle a Settings checkbox": [], "open Analytics": []}
+    io = {name: [] for name in results}
+
+    def go(section, io=None):
+        at.radio(key="section").set_value(section)
+        return timed(at, io)
+
+    for i in range(repeat):
+        results["first load"].append(timed(at, io["first load"]))
+        if sections:
+            go(PLAN_SECTION)
+        at.slider(key="plan_motivation").set_value(3 + i % 5)
+        results["drag a Study Plan slider"].append(timed(at, io["drag a Study Plan slider"]))
+        at.text_input(key="plan_subjects").input(f"Statistics {i}")
+        results["type a subject"].append(timed(at, io["type a subject"]))
+
+        if sections:
+            results["open Analytics"].append(go(ANALYTICS_SECTION, io["open Analytics"]))
+            go(SETTINGS_SECTION)
+            # Form inputs in hidden sections keep their values
+            assert at.session_state["plan_subjects"] == f"Statistics {i}", "plan form lost its state"
+        checkbox = [c for c in at.checkbox if c.label == "Send Weekly Progress Reports"][0]
+        checkbox.set_value(not checkbox.value)
+        results["toggle a Settings checkbox"].append(timed(at, io["toggle a Settings checkbox"]))
+    if not sections:
+        # Tabs switch in the browser without a rerun
+        results["open Analytics"] = None
+    return {
+        name: (statistics.median(values), io[name][-1]) if values else None
+        for name, values in results.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--sessions", type=int, default=3000, help="Focus and Pomodoro sessions to seed")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'rerun.db')}"
+    os.environ["NOTIFICATION_OUTBOX"] = os.path.join(workdir, "outbox.jsonl")
+    os.chdir(workdir)
+    sys.path.insert(0, APP_DIR)
+    user = seed(workdir, args.sessions)
+    count_fetches()
+
+    timings = {navigation: measure(navigation, user, args.repeat) for navigation in ("tabs", "sections")}
+    print(f"median rerun over {args.repeat} runs ({args.sessions} timer sessions, 365 days of progress)")
+    print(f"{'interaction':28s} {'all tabs':>22s} {'active section':>22s}")
+    for name in timings["tabs"]:
+        columns = []
+        for navigation in ("tabs", "sections"):
+            if timings[navigation][name] is None:
+                columns.append("browser")
+                continue
+            elapsed, stats = timings[navigation][name]
+            columns.append(f"{elapsed * 1000:.0f} ms, {stats['queries']} queries")
+        print(f"{name:28s} {columns[0]:>22s} {columns[1]:>22s}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import csv
+import io
+import zlib
+from datetime import date, datetime, time, timedelta
+from study_planner import generate_spaced_repetition_schedule
+
+DAY_START = time(9, 0)
+REVIEW_MINUTES = 30
+EVENTS_PER_CHUNK = 500
+CSV_FIELDS = ["date", "start", "end", "subject", "kind", "hours"]
+
+
+def _review_days(item, start, end):
+    """Spaced repetition review dates: the schedule's offsets from start, then every last interval until end"""
+    intervals = item.get("repetition_schedule") or generate_spaced_repetition_schedule(
+        item["subject"], item["difficulty"], end
+    )
+    days = set()
+    offset = 0
+    for offset in intervals:
+        days.add(start + timedelta(days=offset))
+    step = max(1, intervals[-1] - (intervals[-2] if len(intervals) > 1 else 0))
+    while start + timedelta(days=offset) < end:
+        offset += step
+        days.add(start + timedelta(days=offset))
+    return {day for day in days if day < end}
+
+
+def iter_plan_events(plan, exam_date, start=None):
+    """Dated study and review sessions from start (today) up to the exam date, in time order.
+
+    Days are walked one at a time and only the current day's events exist
+    at once, so a year of a large plan costs no more memory than a week.
+    Subjects with a day-by-day allocation follow it; the rest study their
+    daily hours on their study days until their own deadline. Sessions on
+    a day are laid out back to back from DAY_START.
+    """
+    start = start or date.today()
+    deadlines = [min(item.get("deadline") or exam_date, exam_date) for item in plan]
+    reviews = [_review_days(item, start, deadline) for item, deadline in zip(plan, deadlines)]
+    day = start
+    while day < exam_date:
+        weekday = day.strftime("%a")
+        clock = datetime.combine(day, DAY_START)
+        for item, deadline, review_days in zip(plan, deadlines, reviews):
+            if day >= deadline:
+                continue
+            allocation = item.get("daily_allocation")
+            if allocation is not None:
+                hours = allocation.get(day, 0.0)
+            else:
+                hours = item["hours"] if weekday in item["study_days"] else 0.0
+            if hours > 0:
+                end = clock + timedelta(hours=hours)
+                yield {"date": day, "start": clock, "end": end, "subject": item["subject"],
+                       "kind": "study", "hours": round(hours, 2)}
+                clock = end
+            if day in review_days:
+                end = clock + timedelta(minutes=REVIEW_MINUTES)
+                yield {"date": day, "start": clock, "end": end, "subject": item["subject"],
+                       "kind": "review", "hours": REVIEW_MINUTES / 60}
+                clock = end
+        day += timedelta(days=1)
+
+
+def _chunked(events, render, events_per_chunk):
+    chunk = []
+    for event in events:
+        chunk.append(render(event))
+        if len(chunk) >= events_per_chunk:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def export_csv(events, events_per_chunk=EVENTS_PER_CHUNK):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def render(event):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow([
+            event["date"].isoformat(), event["start"].strftime("%H:%M"), event["end"].strftime("%H:%M"),
+            event["subject"], event["kind"], event["hours"]
+        ])
+        return buffer.getvalue()
+
+    yield ",".join(CSV_FIELDS) + "\n"
+    yield from _chunked(events, render, events_per_chunk)
+
+
+def _ics_text(value):
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _ics_line(line):
+    """Fold to 75 octets per RFC 5545, continuing lines with a leading space"""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    while encoded:
+        cut = min(len(encoded), 75 if not parts else 74)
+        # Don't split a UTF-8 sequence
+        while cut < len(encoded) and encoded[cut] & 0xC0 == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode())
+        encoded = encoded[cut:]
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def export_ics(events, events_per_chunk=EVENTS_PER_CHUNK):
+    """iCalendar feed; times are floating local times so they show at the same hour in any calendar"""
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+
+    def render(event):
+        title = f"{'Review' if event['kind'] == 'review' else 'Study'}: {event['subject']}"
+        uid = f"{event['start']:%Y%m%dT%H%M}-{event['kind']}-{zlib.crc32(event['subject'].encode()):08x}@study-planner"
+        return "".join(_ics_line(line) for line in (
+            "BEGIN:VEVENT",
+            f"UID:{uid}",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART:{event['start']:%Y%m%dT%H%M%S}",
+            f"DTEND:{event['end']:%Y%m%dT%H%M%S}",
+            f"SUMMARY:{_ics_text(title)}",
+            f"CATEGORIES:{event['kind'].upper()}",
+            "END:VEVENT",
+        ))
+
+    yield "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//AI-Powered Study Planner//EN\r\nCALSCALE:GREGORIAN\r\n"
+    yield from _chunked(events, render, events_per_chunk)
+    yield "END:VCALENDAR\r\n"
+
+
+CALENDAR_FORMATS = {
+    "Calendar (ICS)": (export_ics, "study_calendar.ics", "text/calendar"),
+    "Spreadsheet (CSV)": (export_csv, "study_calendar.csv", "text/csv"),
+}
+
+
+if __name__ == "__main__":
+    # A 365-day, 20-subject calendar: peak memory while streaming stays flat
+    import time as timer
+    import tracemalloc
+
+    subjects = [{
+        "subject": f"Subject {i}",
+        "hours": 0.5 + i % 4 * 0.25,
+        "difficulty": ["easy", "medium", "hard"][i % 3],
+        "study_days": ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"][i % 3:i % 3 + 4],
+    } for i in range(20)]
+    exam_date = date.today() + timedelta(days=365)
+    for name, (exporter, _, _) in CALENDAR_FORMATS.items():
+        started = timer.perf_counter()
+        size = chunks = 0
+        for chunk in exporter(iter_plan_events(subjects, exam_date)):
+            size += len(chunk)
+            chunks += 1
+        elapsed = timer.perf_counter() - started
+
+        tracemalloc.start()
+        for chunk in exporter(iter_plan_events(subjects, exam_date)):
+            pass
+        streamed_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        "".join(exporter(list(iter_plan_events(subjects, exam_date))))
+        joined_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{name}: {size / 2**20:.1f} MB in {chunks} chunks, {elapsed * 1000:.0f} ms; peak memory "
+              f"streamed {streamed_peak / 2**10:.0f} KB vs built in memory {joined_peak / 2**10:.0f} KB")
@@ -1,19 +1,63 @@
 import streamlit as st
 from datetime import date, timedelta
-import time
-from study_planner import generate_ai_study_plan, save_user_state, load_user_state, create_progress_chart, recommend_resources
-from database import get_session
-from models import User, Progress
+from study_planner import generate_ai_study_plan, save_user_state, load_user_state, create_progress_chart
+from core.auth import authenticate, register_user
+from passwords import PasswordHasherBusy
+from core.progress import save_daily_progress
+from core.rerun_data import RerunData
+from core.preferences import get_preferences, save_preferences
 import plotly.graph_objects as go
 from pomodoro_timer import show_pomodoro_timer, show_study_techniques, show_motivational_tools, show_mindfulness_break
 from focus_tools import show_focus_mode, show_website_blocker, show_focus_analytics, show_concentration_exercises
-from report_generator import generate_study_report, generate_study_schedule_csv
+from report_generator import generate_study_report
+from schedule_export import iter_plan_events, CALENDAR_FORMATS
+from blocklist import spool_to_file
+from downloads import keep_download, offer_download
+from data_export import export_user_data_to_file
+from progress_import import import_progress_csv, csv_text, CSV_ENCODING
+from feasibility import get_adherence_history, simulate_feasibility, create_feasibility_chart
+from allocation import create_allocation_chart
+from replanning import replan_after_progress
+from forecasting import get_progress_forecast, create_forecast_chart
+from cohorts import (
+    create_cohort,
+    join_cohort,
+    leave_cohort,
+    get_user_cohorts,
+    get_cohort_dashboard,
+    needs_recompute,
+    recompute_cohort_stats,
+    create_cohort_subject_chart,
+    create_cohort_daily_chart,
+    DASHBOARD_DAYS,
+)
+from leaderboards import get_leaderboard, METRICS, HOURS, FOCUS
+from notes import (
+    add_note,
+    delete_note,
+    get_notes,
+    search_notes,
+    get_due_flashcards,
+    review_flashcard,
+    card_intervals,
+    import_notes_file,
+    NOTE,
+    FLASHCARD,
+)
+from heatmaps import create_calendar_heatmap, create_hourly_heatmap
+from reminders import start_scheduler, parse_reminder_time
+from jobs import get_job_runner, QUEUED, RUNNING, DONE, FAILED, CANCELLED
 import random
 import tempfile
 import os
+import io
+import hashlib
+
+# "sections" runs only the section picked in the navigation bar; "tabs" renders every section as a tab
+NAVIGATION = os.getenv("STUDY_PLANNER_NAVIGATION", "sections")
 
 # Initialize focus files
-from focus_tools import init_focus_files
+from core.sessions import init_focus_files
 init_focus_files()
 
 # Set up page config
@@ -24,6 +68,12 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Create or upgrade database tables once per process
+from init_db import initialize_database
+st.cache_resource(show_spinner=False)(initialize_database)()
+# One reminder scheduler per process, woken only when a reminder or report is due
+st.cache_resource(show_spinner=False)(start_scheduler)()
+
 # Custom CSS for styling
 st.markdown("""
 <style>
@@ -60,32 +110,767 @@ if 'daily_quote' not in st.session_state:
 if 'focus_mode' not in st.session_state:
     st.session_state.focus_mode = False
 
-# Authentication functions
-def authenticate(username, password):
-    session = get_session()
-    try:
-        user = session.query(User).filter_by(username=username).first()
-        if user and user.check_password(password):
-            return user
-        return None
-    finally:
-        session.close()
-
-def register_user(username, password):
-    session = get_session()
-    try:
-        if session.query(User).filter_by(username=username).first():
-            return False
-        new_user = User(username=username)
-        new_user.set_password(password)
-        session.add(new_user)
-        session.commit()
-        return True
-    except Exception as e:
-        session.rollback()
-        return False
-    finally:
-        session.close()
+# Background jobs
+def show_job_status(job):
+    """Render a background job's progress and return its status"""
+    if job.status in (QUEUED, RUNNING):
+        st.progress(int(job.progress * 100))
+        st.caption(f"{job.name}: {job.status} {job.message}")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.button("Refresh", key=f"job_refresh_{job.id}")
+        with col2:
+            if st.button("Cancel", key=f"job_cancel_{job.id}"):
+                get_job_runner().cancel(job.id)
+                st.experimental_rerun()
+    elif job.status == FAILED:
+        st.error(f"{job.name} failed: {job.error}")
+    elif job.status == CANCELLED:
+        st.info(f"{job.name} was cancelled")
+    return job.status
+
+def run_report_job(job, user, plan, exam_date, resources, focus_history):
+    job.set_progress(0.1, "Collecting data")
+    forecast = get_progress_forecast(user.id, exam_date)
+    job.check_cancelled()
+    job.set_progress(0.5, "Rendering PDF")
+    return generate_study_report(user, plan, exam_date, resources, focus_history, forecast)
+
+def run_export_job(job, user_id):
+    job.set_progress(0.1, "Packaging your data")
+    return export_user_data_to_file(user_id)
+
+def run_calendar_job(job, plan, exam_date, calendar_format):
+    exporter, file_name, _ = CALENDAR_FORMATS[calendar_format]
+    job.set_progress(0.1, "Laying out sessions")
+    return spool_to_file(exporter(iter_plan_events(plan, exam_date)), suffix=os.path.splitext(file_name)[1])
+
+def run_import_job(job, user_id, data):
+    raw = io.BytesIO(data)
+    
+    def report_import(stats):
+        job.check_cancelled()
+        job.set_progress(raw.tell() / max(1, len(data)),
+                         f"{stats['read']} rows read, {stats['inserted']} imported, "
+                         f"{stats['skipped']} duplicates, {stats['rejected']} rejected")
+    
+    return import_progress_csv(user_id, csv_text(raw), progress_callback=report_import)
+
+def run_notes_import_job(job, user_id, name, data, subject):
+    raw = io.BytesIO(data)
+    
+    def report_import(stats):
+        job.check_cancelled()
+        job.set_progress(raw.tell() / max(1, len(data)),
+                         f"{stats['read']} entries read, {stats['inserted']} imported, {stats['rejected']} rejected")
+    
+    lines = io.TextIOWrapper(raw, encoding=CSV_ENCODING, errors="ignore", newline="")
+    return import_notes_file(user_id, name, lines, subject, progress_callback=report_import)
+
+def run_cohort_recompute_job(job, cohort_id):
+    job.set_progress(0.1, "Recomputing cohort statistics")
+    recompute_cohort_stats(cohort_id)
+
+def get_session_job(name):
+    return get_job_runner().get(st.session_state.get(name))
+
+def job_key(kind, user_id, *args):
+    """Job runner key for one request: a repeat of it joins the running job, other arguments start a new one"""
+    digest = hashlib.sha1()
+    for arg in args:
+        digest.update(arg if isinstance(arg, bytes) else repr(arg).encode())
+    return (kind, user_id, digest.hexdigest())
+
+# Streamlit forgets the value of any widget that isn't rendered, so form inputs in the
+# sections that aren't shown are written back to session state until the user returns
+SECTION_WIDGET_KEYS = {
+    "📚 Study Plan": ("plan_", "diff_", "prio_", "deadline_", "required_"),
+    "⏱️ Focus Timer": ("pomodoro_subject", "focus_subject_choice", "focus_goal_input"),
+    "🗂️ Notes": ("note_query", "note_search_subject", "note_import_subject", "note_recent_subject", "new_note_kind"),
+}
+
+def keep_widget_state(active_section):
+    for section, prefixes in SECTION_WIDGET_KEYS.items():
+        if section == active_section:
+            continue
+        for key in list(st.session_state.keys()):
+            if key.startswith(prefixes):
+                st.session_state[key] = st.session_state[key]
+
+# Sections, one function each so only the visible one has to run
+def show_plan_section(data):
+    # Plan management
+    with st.expander("📝 Create New Study Plan", expanded=not st.session_state.plan):
+        subjects_input = st.text_input("Enter subjects (comma separated)", 
+                                      placeholder="e.g., Mathematics, Machine Learning, Statistics",
+                                      key="plan_subjects")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            motivation = st.slider("How motivated are you today?", 1, 10, 7, key="plan_motivation")
+            study_hours = st.number_input("Daily study hours", min_value=1, max_value=24, value=4, key="plan_study_hours")
+        with col2:
+            energy = st.selectbox("Energy level", ["low", "medium", "high"], index=1, key="plan_energy")
+            exam_date = st.date_input("Goal date", date.today() + timedelta(days=30), key="plan_exam_date")
+            st.session_state.exam_date = exam_date
+        
+        subjects = [s.strip() for s in subjects_input.split(",") if s.strip()]
+        subject_details = []
+        
+        if subjects:
+            st.subheader("Subject Details")
+            for i, subject in enumerate(subjects):
+                with st.container():
+                    st.markdown(f'<div class="subject-card">', unsafe_allow_html=True)
+                    st.markdown(f"**{subject}**")
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        difficulty = st.selectbox(
+                            "Difficulty", 
+                            ["easy", "medium", "hard"], 
+                            key=f"diff_{i}"
+                        )
+                    with col2:
+                        priority = st.selectbox(
+                            "Priority", 
+                            ["low", "medium", "high"], 
+                            key=f"prio_{i}"
+                        )
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        deadline = st.date_input(
+                            "Deadline",
+                            exam_date,
+                            key=f"deadline_{i}"
+                        )
+                    with col2:
+                        required_hours = st.number_input(
+                            "Total hours needed (0 = auto)",
+                            min_value=0,
+                            max_value=2000,
+                            value=0,
+                            key=f"required_{i}"
+                        )
+                    st.markdown('</div>', unsafe_allow_html=True)
+                    subject_details.append({
+                        "subject": subject,
+                        "difficulty": difficulty,
+                        "priority": priority,
+                        "deadline": deadline,
+                        "required_hours": required_hours
+                    })
+        
+        if st.button("Generate Study Plan", use_container_width=True) and subjects:
+            with st.spinner("Creating your personalized study plan..."):
+                msg, plan = generate_ai_study_plan(
+                    subject_details,
+                    motivation,
+                    energy,
+                    study_hours,
+                    exam_date
+                )
+                
+                if plan:
+                    st.session_state.plan = plan
+                    save_user_state(st.session_state.user.id, plan)
+                    if any(item.get("unmet_hours") for item in plan):
+                        st.warning(msg)
+                    else:
+                        st.success("Plan generated successfully!")
+                        st.balloons()
+                else:
+                    st.error(msg)
+        elif not subjects:
+            st.warning("Please enter at least one subject")
+    
+    # Display existing plan
+    if st.session_state.plan:
+        st.subheader("📊 Your Study Plan")
+        
+        # Plan overview
+        if st.session_state.exam_date:
+            days_remaining = (st.session_state.exam_date - date.today()).days
+        else:
+            days_remaining = 0
+            
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Total Subjects", len(st.session_state.plan))
+        col2.metric("Daily Study Hours", round(sum(item['hours'] for item in st.session_state.plan), 1))
+        col3.metric("Days Until Goal", days_remaining)
+        
+        # Progress chart
+        st.plotly_chart(create_progress_chart(st.session_state.plan), use_container_width=True)
+        if any(item.get("daily_allocation") for item in st.session_state.plan):
+            st.plotly_chart(create_allocation_chart(st.session_state.plan), use_container_width=True)
+        
+        # Feasibility simulation, rerun only when the plan or goal date changes
+        if st.session_state.exam_date and days_remaining > 0:
+            feasibility_key = (
+                tuple((item['subject'], item['hours'], tuple(item['study_days']), item.get('deadline'),
+                       tuple(sorted(item.get('daily_allocation', {}).items())))
+                      for item in st.session_state.plan),
+                st.session_state.exam_date,
+                date.today()
+            )
+            if st.session_state.get('feasibility_key') != feasibility_key:
+                adherence = get_adherence_history(st.session_state.user.id, st.session_state.plan)
+                st.session_state.feasibility = simulate_feasibility(
+                    st.session_state.plan, st.session_state.exam_date, adherence
+                )
+                st.session_state.feasibility_key = feasibility_key
+            if st.session_state.feasibility:
+                st.plotly_chart(create_feasibility_chart(st.session_state.feasibility), use_container_width=True)
+                st.caption("Based on how closely you have followed your plan over the last 90 days")
+        
+        # Resource recommendations
+        st.subheader("📚 Recommended Resources")
+        resources = data.resources(item['subject'] for item in st.session_state.plan)
+        
+        for subject, url in resources.items():
+            st.markdown(f"🔗 **{subject}**: [{url}]({url})")
+        
+        # Progress tracking
+        st.subheader("📈 Track Your Progress")
+        today = date.today().isoformat()
+        
+        if today not in st.session_state.progress:
+            st.session_state.progress[today] = {}
+        
+        # Timer sessions tagged with a subject are logged automatically; sliders add other study time
+        timer_hours = data.timer_hours()
+        
+        for item in st.session_state.plan:
+            subject = item['subject']
+            planned = item['hours']
+            
+            col1, col2 = st.columns([1, 3])
+            with col1:
+                studied = st.slider(
+                    f"Hours studied for {subject}",
+                    min_value=0.0,
+                    max_value=float(planned) * 2,
+                    value=min(float(planned) * 2, st.session_state.progress[today].get(subject, 0.0)),
+                    step=0.5,
+                    key=f"progress_{subject}_{today}"  # Unique key
+                )
+                st.session_state.progress[today][subject] = studied
+                if timer_hours.get(subject):
+                    st.caption(f"⏱️ +{timer_hours[subject]:.1f}h from timed sessions")
+            
+            with col2:
+                total_studied = studied + timer_hours.get(subject, 0.0)
+                progress_percent = min(100, int((total_studied / planned) * 100)) if planned > 0 else 0
+                st.markdown(f"""
+                <div style="margin-top: 15px;">
+                    <div style="width: 100%; background: #e0e0e0; border-radius: 5px;">
+                        <div class="progress-bar" style="width: {progress_percent}%; 
+                                height: 20px; border-radius: 5px; text-align: center; 
+                                color: white; font-weight: bold;">
+                            {progress_percent}%
+                        </div>
+                    </div>
+                </div>
+                """, unsafe_allow_html=True)
+        
+        if st.button("Save Progress", use_container_width=True):
+            try:
+                save_daily_progress(st.session_state.user.id, st.session_state.progress[today])
+                st.session_state.pop('feasibility_key', None)
+                st.success("Progress saved successfully!")
+                
+                # Rebalance only the subjects that went off plan today, from hours that were actually stored
+                rebalanced = replan_after_progress(
+                    st.session_state.user.id,
+                    st.session_state.plan,
+                    st.session_state.exam_date or date.today(),
+                    {
+                        subject: hours + timer_hours.get(subject, 0.0)
+                        for subject, hours in st.session_state.progress[today].items()
+                    }
+                )
+                if rebalanced:
+                    st.info("Adjusted daily hours: " + ", ".join(
+                        f"{subject} → {hours}h" for subject, hours in rebalanced.items()
+                    ))
+            except Exception as e:
+                st.error(f"Error saving progress: {e}")
+        
+        with st.expander("📥 Import Study History from CSV"):
+            st.caption("Columns: date, subject, hours. Rows already recorded for the same day and subject are skipped.")
+            history_file = st.file_uploader("Study log CSV", type=["csv"], key="progress_csv")
+            if history_file and st.button("Import History"):
+                st.session_state.import_job = get_job_runner().submit(
+                    job_key("progress_import", st.session_state.user.id, history_file.getvalue()),
+                    run_import_job,
+                    st.session_state.user.id,
+                    history_file.getvalue(),
+                    name="History import"
+                ).id
+            
+            import_job = get_session_job("import_job")
+            if import_job and show_job_status(import_job) == DONE:
+                st.success(f"Imported {import_job.result['inserted']} study log entries")
+                for error in import_job.result["errors"]:
+                    st.caption(error)
+        
+        # Progress history
+        st.subheader("⏱️ Study History")
+        progress_data = data.progress_history(7)
+
+        if progress_data:
+            history = {}
+            for record in progress_data:
+                date_str = record['date'].isoformat()
+                if date_str not in history:
+                    history[date_str] = {}
+                history[date_str][record['subject']] = record['hours_studied']
+
+            # Create history chart
+            dates = list(history.keys())
+            subjects = list({s for day in history.values() for s in day.keys()})
+
+            fig = go.Figure()
+            for subject in subjects:
+                hours = [history[date].get(subject, 0) for date in dates]
+                fig.add_trace(go.Bar(
+                    x=dates,
+                    y=hours,
+                    name=subject
+                ))
+
+            fig.update_layout(
+                barmode='stack',
+                title='Recent Study Progress',
+                xaxis_title='Date',
+                yaxis_title='Hours Studied'
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.info("No study history yet. Track your progress to see insights here.")
+            
+        # Report generation
+        st.subheader("📤 Export Your Plan")
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            if st.button("Generate PDF Report"):
+                st.session_state.report_job = get_job_runner().submit(
+                    job_key("pdf_report", st.session_state.user.id, st.session_state.plan,
+                            st.session_state.exam_date, data.focus_history().size),
+                    run_report_job,
+                    st.session_state.user,
+                    st.session_state.plan,
+                    st.session_state.exam_date,
+                    data.resources(item['subject'] for item in st.session_state.plan),
+                    data.focus_history(),
+                    name="PDF report"
+                ).id
+            
+            report_job = get_session_job("report_job")
+            if report_job and show_job_status(report_job) == DONE:
+                keep_download("report_file", report_job.result)
+                del st.session_state["report_job"]
+            offer_download("report_file", "Download PDF Report",
+                           f"study_plan_{st.session_state.user.username}.pdf", "application/pdf")
+        
+        with col2:
+            calendar_format = st.selectbox("Calendar format", list(CALENDAR_FORMATS.keys()))
+            _, file_name, mime = CALENDAR_FORMATS[calendar_format]
+            if st.button("Prepare Study Calendar",
+                         help="Every study session and spaced-repetition review from today until your goal date"):
+                st.session_state.calendar_job_format = calendar_format
+                st.session_state.calendar_job = get_job_runner().submit(
+                    job_key("calendar_export", st.session_state.user.id, calendar_format,
+                            st.session_state.plan, st.session_state.exam_date),
+                    run_calendar_job,
+                    st.session_state.plan,
+                    st.session_state.exam_date,
+                    calendar_format,
+                    name="Study calendar"
+                ).id
+            
+            calendar_job = get_session_job("calendar_job")
+            if calendar_job and show_job_status(calendar_job) == DONE:
+                keep_download("calendar_file", calendar_job.result)
+                st.session_state.calendar_file_format = st.session_state.calendar_job_format
+                del st.session_state["calendar_job"]
+            if st.session_state.get("calendar_file_format") == calendar_format:
+                offer_download("calendar_file", "Download Study Calendar", file_name, mime)
+
+def show_timer_section(data):
+    show_pomodoro_timer(data.pomodoro_history())
+    show_focus_mode()
+    show_website_blocker()
+
+def show_learning_section(data):
+    show_study_techniques()
+    due = data.due_flashcards()
+    if due:
+        st.info(f"🃏 {sum(due.values())} flashcards are due for active recall today. Review them under 🗂️ Notes.")
+    show_concentration_exercises()
+    show_motivational_tools()
+
+def review_card(card, remembered):
+    intervals = card_intervals(st.session_state.plan, card['subject'], st.session_state.exam_date)
+    review_flashcard(st.session_state.user.id, card['id'], remembered, intervals)
+
+def show_notes_section(data):
+    user_id = st.session_state.user.id
+    subjects = [item['subject'] for item in st.session_state.plan or []]
+    
+    # Full-text search
+    st.subheader("🔎 Search Notes")
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        query = st.text_input("Search your notes and flashcards", key="note_query",
+                              placeholder="e.g., photosynthesis light reaction")
+    with col2:
+        search_subject = st.selectbox("Subject", ["All subjects"] + subjects, key="note_search_subject")
+    if query.strip():
+        results = search_notes(user_id, query, None if search_subject == "All subjects" else search_subject)
+        for result in results:
+            badge = "🃏" if result['kind'] == FLASHCARD else "📝"
+            st.markdown(f"{badge} **{result['title']}** · {result['subject']}  \n{result['snippet']}")
+        if not results:
+            st.info("No notes match your search")
+    
+    # Flashcards follow each subject's spaced-repetition schedule
+    st.subheader("🃏 Flashcards Due")
+    due = data.due_flashcards()
+    # The counts can be a moment older than the cards, e.g. right after the last one was reviewed
+    cards = get_due_flashcards(user_id, limit=1) if due else []
+    if cards:
+        st.caption(" · ".join(f"{subject}: {count}" for subject, count in sorted(due.items())))
+        card = cards[0]
+        st.markdown(f"**{card['subject']}:** {card['title']}")
+        with st.expander("Show answer"):
+            st.write(card['body'])
+        col1, col2 = st.columns(2)
+        col1.button("✅ Remembered", key=f"card_remembered_{card['id']}", on_click=review_card, args=(card, True),
+                    use_container_width=True)
+        col2.button("🔁 Forgot", key=f"card_forgot_{card['id']}", on_click=review_card, args=(card, False),
+                    use_container_width=True)
+    else:
+        st.success("No flashcards due today")
+    
+    # New notes and flashcards
+    st.subheader("✍️ Add a Note or Flashcard")
+    kind = st.radio("Type", ["Note", "Flashcard"], horizontal=True, key="new_note_kind")
+    with st.form("new_note", clear_on_submit=True):
+        note_subject = st.selectbox("Subject", subjects or ["General"], key="new_note_subject")
+        title = st.text_input("Question" if kind == "Flashcard" else "Title", key="new_note_title")
+        body = st.text_area("Answer" if kind == "Flashcard" else "Note", key="new_note_body")
+        if st.form_submit_button("Save"):
+            try:
+                add_note(user_id, note_subject, title, body, FLASHCARD if kind == "Flashcard" else NOTE)
+                st.success("Saved!")
+            except ValueError as e:
+                st.error(f"Could not save: {e}")
+    
+    with st.expander("📥 Import Notes from Markdown or CSV"):
+        st.caption("Markdown: each heading starts a note; a \"Q:\" line followed by an \"A:\" line makes a flashcard. "
+                   "CSV: question and answer columns for flashcards, or title and body columns for notes, "
+                   "with an optional subject column.")
+        import_subject = st.selectbox("Import into subject", subjects or ["General"], key="note_import_subject")
+        notes_file = st.file_uploader("Notes file", type=["md", "markdown", "txt", "csv"], key="notes_file")
+        if notes_file and st.button("Import Notes"):
+            st.session_state.notes_import_job = get_job_runner().submit(
+                job_key("notes_import", user_id, notes_file.name, import_subject, notes_file.getvalue()),
+                run_notes_import_job,
+                user_id,
+                notes_file.name,
+                notes_file.getvalue(),
+                import_subject,
+                name="Notes import"
+            ).id
+        
+        import_job = get_session_job("notes_import_job")
+        if import_job and show_job_status(import_job) == DONE:
+            st.success(f"Imported {import_job.result['inserted']} notes and flashcards")
+            for error in import_job.result["errors"]:
+                st.caption(error)
+    
+    # Recent notes
+    st.subheader("🗂️ Recent Notes")
+    recent_subject = st.selectbox("Show notes for", ["All subjects"] + subjects, key="note_recent_subject")
+    recent = get_notes(user_id, None if recent_subject == "All subjects" else recent_subject, limit=20)
+    for note in recent:
+        badge = "🃏" if note['kind'] == FLASHCARD else "📝"
+        with st.expander(f"{badge} {note['title']} · {note['subject']}"):
+            st.write(note['body'])
+            if note['due_date']:
+                st.caption(f"Next review: {note['due_date'].strftime('%b %d')}")
+            if st.button("Delete", key=f"delete_note_{note['id']}"):
+                delete_note(user_id, note['id'])
+                st.experimental_rerun()
+    if not recent:
+        st.info("No notes yet. Add one above or import a file.")
+
+def show_analytics_section(data):
+    st.subheader("📈 Productivity Analytics")
+    show_focus_analytics(data.focus_history())
+    
+    st.subheader("📚 Study Progress")
+    progress_data = data.progress_history(30)
+
+    if progress_data:
+        # Weekly progress chart
+        history = {}
+        for record in progress_data:
+            week = record['date'].isoformat()
+            if week not in history:
+                history[week] = {}
+            history[week][record['subject']] = record['hours_studied']
+
+        # Create history chart
+        dates = list(history.keys())
+        subjects = list({s for day in history.values() for s in day.keys()})
+
+        fig = go.Figure()
+        for subject in subjects:
+            hours = [history[date].get(subject, 0) for date in dates]
+            fig.add_trace(go.Bar(
+                x=dates,
+                y=hours,
+                name=subject
+            ))
+
+        fig.update_layout(
+            barmode='stack',
+            title='Study Progress (Last 30 Days)',
+            xaxis_title='Week',
+            yaxis_title='Hours Studied'
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+        # Consistency metric
+        study_days = len(set(r['date'] for r in progress_data))
+        st.metric("Study Consistency", f"{study_days} days", 
+                 f"{study_days/30*100:.1f}% of days")
+    else:
+        st.info("No study history yet. Track your progress to see insights here.")
+    
+    # Year-long heatmaps
+    st.subheader("🗓️ Study Calendar")
+    calendar = data.calendar()
+    col1, col2 = st.columns(2)
+    col1.metric("Hours This Year", f"{calendar['total']:.1f} h")
+    col2.metric("Active Days", calendar['active_days'])
+    st.plotly_chart(create_calendar_heatmap(calendar), use_container_width=True)
+    
+    hourly = data.hourly()
+    if hourly['sessions'].any():
+        st.plotly_chart(create_hourly_heatmap(hourly), use_container_width=True)
+    
+    # Trend forecasting
+    forecast = data.forecast(st.session_state.exam_date)
+    if forecast:
+        st.subheader("🔮 Study Forecast")
+        for subject, trend in forecast.items():
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric(subject, f"{trend['total']:.1f} h", "total so far")
+            col2.metric("7-Day Average", f"{trend['rolling_mean'][-1]:.1f} h/day")
+            col3.metric("Streak", f"{trend['streak']} days")
+            if st.session_state.exam_date:
+                col4.metric("Projected by Goal Date", f"{trend['projected_total']:.0f} h",
+                            f"{trend['rate']:.1f} h/day trend")
+        selected_subject = st.selectbox("Show trend for", list(forecast.keys()))
+        st.plotly_chart(create_forecast_chart(selected_subject, forecast[selected_subject]), use_container_width=True)
+    
+    # Focus recommendations
+    st.subheader("🔍 Focus Insights")
+    focus_history = data.focus_history()
+    if len(focus_history):
+        if focus_history.mean_distractions() > 2:
+            st.warning("**High Distraction Rate:** You're averaging more than 2 distractions per session")
+            st.markdown("""
+            **Recommendations:**
+            - Use website blocking during focus sessions
+            - Try a 5-minute concentration exercise before studying
+            - Study in a quieter environment
+            """)
+    
+    # Digital wellbeing
+    st.subheader("🌱 Digital Wellbeing")
+    st.markdown("""
+    - **Screen Time Balance:** Aim for 2 hours of quality study per 4 hours of screen time
+    - **Mindful Breaks:** Take 5-minute breaks every 45 minutes
+    - **Sleep Hygiene:** Avoid screens 1 hour before bedtime
+    """)
+
+def show_cohorts_section(data):
+    st.subheader("👥 My Cohorts")
+    col1, col2 = st.columns(2)
+    with col1:
+        join_code = st.text_input("Join a cohort with the code from your instructor")
+        if st.button("Join Cohort") and join_code:
+            cohort = join_cohort(st.session_state.user.id, join_code)
+            if cohort:
+                st.success(f"Joined {cohort.name}")
+            else:
+                st.error("No cohort with that code")
+    with col2:
+        cohort_name = st.text_input("Start a cohort for your class")
+        if st.button("Create Cohort") and cohort_name:
+            cohort = create_cohort(cohort_name, st.session_state.user.id)
+            st.success(f"Created {cohort.name}. Students join with code {cohort.join_code}")
+    
+    joined, teaching = get_user_cohorts(st.session_state.user.id)
+    for cohort in joined:
+        col1, col2 = st.columns([3, 1])
+        col1.write(f"**{cohort.name}** · {cohort.member_count} students")
+        if col2.button("Leave", key=f"leave_cohort_{cohort.id}"):
+            leave_cohort(st.session_state.user.id, cohort.id)
+            st.experimental_rerun()
+    
+    st.subheader("🏆 Leaderboards")
+    col1, col2 = st.columns(2)
+    scopes = ["Everyone"] + [cohort.name for cohort in joined]
+    scope = scopes.index(col1.selectbox("Ranking within", scopes))
+    metric_labels = list(METRICS.values())
+    metric = list(METRICS)[metric_labels.index(col2.selectbox("Ranked by", metric_labels))]
+    board = get_leaderboard(metric, joined[scope - 1].id if scope else None, st.session_state.user.id)
+    units = {HOURS: "h", FOCUS: "min"}.get(metric, "days")
+    if board['top']:
+        rows = ["| Rank | Student | Score |", "|---|---|---|"]
+        for entry in board['top']:
+            name = f"**{entry['username']}**" if entry['user_id'] == st.session_state.user.id else entry['username']
+            rows.append(f"| {entry['rank']} | {name} | {entry['score']:g} {units} |")
+        st.markdown("\n".join(rows))
+    if board['my_rank']:
+        st.metric("Your Rank", f"#{board['my_rank']} of {board['ranked']}", f"{board['my_score']:g} {units}",
+                  delta_color="off")
+    else:
+        st.info("Log some study time to appear on this leaderboard")
+    
+    if teaching:
+        st.subheader("👩‍🏫 Instructor Dashboard")
+        labels = [f"{cohort.name} ({cohort.join_code})" for cohort in teaching]
+        cohort = teaching[labels.index(st.selectbox("Cohort", labels))]
+        
+        # Aggregates are kept current on every write; a full recompute corrects drift once a day
+        if needs_recompute(cohort):
+            get_job_runner().submit(("cohort_recompute", cohort.id), run_cohort_recompute_job,
+                                    cohort.id, name="Cohort recompute")
+        
+        dashboard = get_cohort_dashboard(cohort.id)
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Students", dashboard['member_count'])
+        col2.metric(f"Hours ({DASHBOARD_DAYS} days)", f"{dashboard['total_hours']:.0f} h",
+                    f"{dashboard['hours_per_student']:.1f} h per student", delta_color="off")
+        col3.metric("Adherence to Plans",
+                    f"{dashboard['adherence'] * 100:.0f}%" if dashboard['adherence'] is not None else "–")
+        col4.metric("Focus Time", f"{dashboard['total_focus_minutes'] / 60:.0f} h")
+        
+        if dashboard['subjects']:
+            st.plotly_chart(create_cohort_subject_chart(dashboard), use_container_width=True)
+            rows = ["| Subject | Students planning | Hours studied | Hours planned | Adherence |",
+                    "|---|---|---|---|---|"]
+            for subject, stats in dashboard['subjects'].items():
+                adherence = f"{stats['adherence'] * 100:.0f}%" if stats['adherence'] is not None else "–"
+                rows.append(f"| {subject} | {stats['students']} | {stats['hours']:.1f} | "
+                            f"{stats['planned_hours']:.1f} | {adherence} |")
+            st.markdown("\n".join(rows))
+            st.plotly_chart(create_cohort_daily_chart(dashboard), use_container_width=True)
+        else:
+            st.info("No study activity in this cohort yet")
+
+def show_settings_section(data):
+    st.subheader("⚙️ Study Environment Setup")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Environment setup
+        st.write("**Optimize Your Physical Space**")
+        lighting = st.select_slider("Lighting Quality", ["Poor", "Fair", "Good", "Excellent"])
+        noise = st.select_slider("Noise Level", ["Distracting", "Moderate", "Quiet"])
+        ergonomics = st.select_slider("Ergonomics", ["Uncomfortable", "Okay", "Comfortable"])
+        
+        score = 0
+        if lighting in ["Good", "Excellent"]: score += 1
+        if noise in ["Quiet"]: score += 1
+        if ergonomics in ["Comfortable"]: score += 1
+        
+        st.metric("Environment Score", f"{score}/3", 
+                  "Ideal" if score == 3 else "Needs Improvement")
+        
+        if score < 2:
+            st.warning("Your study environment may be reducing your focus potential")
+    
+    with col2:
+        # Device settings
+        st.write("**Digital Environment**")
+        st.checkbox("Enable Do Not Disturb during study", True)
+        st.checkbox("Use grayscale mode during focus sessions", False)
+        st.checkbox("Block social media notifications", True)
+        
+        st.info("**Recommendation:** Use app blockers during focus sessions")
+    
+    # Personalization
+    st.subheader("🎨 Personal Preferences")
+    prefs = data.preferences()
+    focus_options = [25, 45, 60, 90]
+    break_options = [5, 10, 15]
+    weekdays = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+    focus_minutes = st.selectbox("Default Focus Duration", focus_options,
+                                 index=focus_options.index(prefs['focus_minutes']) if prefs['focus_minutes'] in focus_options else 1)
+    break_minutes = st.selectbox("Break Duration", break_options,
+                                 index=break_options.index(prefs['break_minutes']) if prefs['break_minutes'] in break_options else 0)
+    daily_reminders = st.checkbox("Enable Daily Focus Reminders", prefs['daily_reminders'])
+    weekly_reports = st.checkbox("Send Weekly Progress Reports", prefs['weekly_reports'])
+    col1, col2 = st.columns(2)
+    reminder_time = col1.time_input("Reminder Time", parse_reminder_time(prefs['reminder_time']))
+    report_day = col2.selectbox("Weekly Report Day", weekdays, index=prefs['report_weekday'],
+                                disabled=not weekly_reports)
+    
+    if st.button("Save Preferences"):
+        st.session_state.preferences = save_preferences(st.session_state.user.id, {
+            "focus_minutes": focus_minutes,
+            "break_minutes": break_minutes,
+            "daily_reminders": daily_reminders,
+            "weekly_reports": weekly_reports,
+            "reminder_time": reminder_time.strftime("%H:%M"),
+            "report_weekday": weekdays.index(report_day),
+        })
+        st.success("Preferences saved!")
+    
+    # Account management
+    st.subheader("🔐 Account Settings")
+    if st.button("Export My Data"):
+        st.session_state.export_job = get_job_runner().submit(
+            ("data_export", st.session_state.user.id),
+            run_export_job,
+            st.session_state.user.id,
+            name="Data export"
+        ).id
+    
+    export_job = get_session_job("export_job")
+    if export_job and show_job_status(export_job) == DONE:
+        # The zip is deleted once downloaded or replaced by a newer export
+        keep_download("export_file", export_job.result)
+        del st.session_state["export_job"]
+    offer_download(
+        "export_file",
+        "Download My Data",
+        f"study_planner_{st.session_state.user.username}.zip",
+        "application/zip"
+    )
+    if st.button("Delete My Account"):
+        st.warning("This will permanently delete all your data")
+        if st.checkbox("I understand this action is irreversible"):
+            if st.button("Confirm Account Deletion"):
+                st.error("Account deletion not implemented in demo")
+
+SECTIONS = {
+    "📚 Study Plan": show_plan_section,
+    "⏱️ Focus Timer": show_timer_section,
+    "🧠 Learning Tools": show_learning_section,
+    "🗂️ Notes": show_notes_section,
+    "📊 Analytics": show_analytics_section,
+    "👥 Cohorts": show_cohorts_section,
+    "⚙️ Settings": show_settings_section,
+}
 
 # Main App
 st.title("🎓 AI-Powered Study Planner")
@@ -107,13 +892,18 @@ with st.sidebar:
             username = st.text_input("Username")
             password = st.text_input("Password", type="password")
             if st.button("Login"):
-                user = authenticate(username, password)
-                if user:
-                    st.session_state.user = user
-                    st.session_state.plan = load_user_state(user.id)
-                    st.experimental_rerun()
+                try:
+                    user = authenticate(username, password)
+                except PasswordHasherBusy as e:
+                    st.warning(str(e))
                 else:
-                    st.error("Invalid credentials")
+                    if user:
+                        st.session_state.user = user
+                        st.session_state.plan = load_user_state(user.id)
+                        st.session_state.preferences = get_preferences(user.id)
+                        st.experimental_rerun()
+                    else:
+                        st.error("Invalid credentials")
         
         with register_tab:
             new_username = st.text_input("New Username")
@@ -121,375 +911,33 @@ with st.sidebar:
             confirm_password = st.text_input("Confirm Password", type="password")
             if st.button("Create Account"):
                 if new_password == confirm_password:
-                    if register_user(new_username, new_password):
-                        st.success("Account created! Please login")
-                    else:
-                        st.error("Username already exists")
+                    try:
+                        if register_user(new_username, new_password):
+                            st.success("Account created! Please login")
+                        else:
+                            st.error("Username already exists")
+                    except PasswordHasherBusy as e:
+                        st.warning(str(e))
                 else:
                     st.error("Passwords do not match")
 
 # Main content
 if st.session_state.user:
     st.subheader(f"Welcome back, {st.session_state.user.username}!")
+    # Fetched at most once per rerun however many sections read it; kept in session
+    # state so the rerun's query and file read counts can be inspected
+    data = st.session_state.rerun_data = RerunData(st.session_state.user.id)
     
-    tab1, tab2, tab3, tab4, tab5 = st.tabs(["📚 Study Plan", "⏱️ Focus Timer", "🧠 Learning Tools", "📊 Analytics", "⚙️ Settings"])
-    
-    with tab1:
-        # Plan management
-        with st.expander("📝 Create New Study Plan", expanded=not st.session_state.plan):
-            subjects_input = st.text_input("Enter subjects (comma separated)", 
-                                          placeholder="e.g., Mathematics, Machine Learning, Statistics")
-            
-            col1, col2 = st.columns(2)
-            with col1:
-                motivation = st.slider("How motivated are you today?", 1, 10, 7)
-                study_hours = st.number_input("Daily study hours", min_value=1, max_value=24, value=4)
-            with col2:
-                energy = st.selectbox("Energy level", ["low", "medium", "high"], index=1)
-                exam_date = st.date_input("Goal date", date.today() + timedelta(days=30))
-                st.session_state.exam_date = exam_date
-            
-            subjects = [s.strip() for s in subjects_input.split(",") if s.strip()]
-            subject_details = []
-            
-            if subjects:
-                st.subheader("Subject Details")
-                for i, subject in enumerate(subjects):
-                    with st.container():
-                        st.markdown(f'<div class="subject-card">', unsafe_allow_html=True)
-                        st.markdown(f"**{subject}**")
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            difficulty = st.selectbox(
-                                "Difficulty", 
-                                ["easy", "medium", "hard"], 
-                                key=f"diff_{i}"
-                            )
-                        with col2:
-                            priority = st.selectbox(
-                                "Priority", 
-                                ["low", "medium", "high"], 
-                                key=f"prio_{i}"
-                            )
-                        st.markdown('</div>', unsafe_allow_html=True)
-                        subject_details.append({
-                            "subject": subject,
-                            "difficulty": difficulty,
-                            "priority": priority
-                        })
-            
-            if st.button("Generate Study Plan", use_container_width=True) and subjects:
-                with st.spinner("Creating your personalized study plan..."):
-                    time.sleep(1)  # Simulate AI processing
-                    msg, plan = generate_ai_study_plan(
-                        subject_details,
-                        motivation,
-                        energy,
-                        study_hours,
-                        exam_date
-                    )
-                    
-                    if plan:
-                        st.session_state.plan = plan
-                        save_user_state(st.session_state.user.id, plan)
-                        st.success("Plan generated successfully!")
-                        st.balloons()
-                    else:
-                        st.error(msg)
-            elif not subjects:
-                st.warning("Please enter at least one subject")
-        
-        # Display existing plan
-        if st.session_state.plan:
-            st.subheader("📊 Your Study Plan")
-            
-            # Plan overview
-            if st.session_state.exam_date:
-                days_remaining = (st.session_state.exam_date - date.today()).days
-            else:
-                days_remaining = 0
-                
-            col1, col2, col3 = st.columns(3)
-            col1.metric("Total Subjects", len(st.session_state.plan))
-            col2.metric("Daily Study Hours", round(sum(item['hours'] for item in st.session_state.plan), 1))
-            col3.metric("Days Until Goal", days_remaining)
-            
-            # Progress chart
-            st.plotly_chart(create_progress_chart(st.session_state.plan), use_container_width=True)
-            
-            # Resource recommendations
-            st.subheader("📚 Recommended Resources")
-            resources = recommend_resources([item['subject'] for item in st.session_state.plan])
-            
-            for subject, url in resources.items():
-                st.markdown(f"🔗 **{subject}**: [{url}]({url})")
-            
-            # Progress tracking
-            st.subheader("📈 Track Your Progress")
-            today = date.today().isoformat()
-            
-            if today not in st.session_state.progress:
-                st.session_state.progress[today] = {}
-            
-            for item in st.session_state.plan:
-                subject = item['subject']
-                planned = item['hours']
-                
-                col1, col2 = st.columns([1, 3])
-                with col1:
-                    studied = st.slider(
-                        f"Hours studied for {subject}",
-                        min_value=0.0,
-                        max_value=float(planned) * 2,
-                        value=st.session_state.progress[today].get(subject, 0.0),
-                        step=0.5,
-                        key=f"progress_{subject}_{today}"  # Unique key
-                    )
-                    st.session_state.progress[today][subject] = studied
-                
-                with col2:
-                    progress_percent = min(100, int((studied / planned) * 100)) if planned > 0 else 0
-                    st.markdown(f"""
-                    <div style="margin-top: 15px;">
-                        <div style="width: 100%; background: #e0e0e0; border-radius: 5px;">
-                            <div class="progress-bar" style="width: {progress_percent}%; 
-                                    height: 20px; border-radius: 5px; text-align: center; 
-                                    color: white; font-weight: bold;">
-                                {progress_percent}%
-                            </div>
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
-            
-            if st.button("Save Progress", use_container_width=True):
-                session = get_session()
-                try:
-                    # Save to database
-                    for subject, hours in st.session_state.progress[today].items():
-                        progress = Progress(
-                            user_id=st.session_state.user.id,
-                            subject=subject,
-                            date=date.today(),
-                            hours_studied=hours
-                        )
-                        session.add(progress)
-                    session.commit()
-                    st.success("Progress saved successfully!")
-                except Exception as e:
-                    session.rollback()
-                    st.error(f"Error saving progress: {e}")
-                finally:
-                    session.close()
-            
-            # Progress history
-            st.subheader("⏱️ Study History")
-            session = get_session()
-            try:
-                progress_data = session.query(Progress).filter_by(
-                    user_id=st.session_state.user.id
-                ).order_by(Progress.date.desc()).limit(7).all()
-                
-                if progress_data:
-                    history = {}
-                    for record in progress_data:
-                        date_str = record.date.isoformat()
-                        if date_str not in history:
-                            history[date_str] = {}
-                        history[date_str][record.subject] = record.hours_studied
-                    
-                    # Create history chart
-                    dates = list(history.keys())
-                    subjects = list({s for day in history.values() for s in day.keys()})
-                    
-                    fig = go.Figure()
-                    for subject in subjects:
-                        hours = [history[date].get(subject, 0) for date in dates]
-                        fig.add_trace(go.Bar(
-                            x=dates,
-                            y=hours,
-                            name=subject
-                        ))
-                    
-                    fig.update_layout(
-                        barmode='stack',
-                        title='Recent Study Progress',
-                        xaxis_title='Date',
-                        yaxis_title='Hours Studied'
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                else:
-                    st.info("No study history yet. Track your progress to see insights here.")
-            finally:
-                session.close()
-                
-            # Report generation
-            st.subheader("📤 Export Your Plan")
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                if st.button("Generate PDF Report"):
-                    resources = recommend_resources([item['subject'] for item in st.session_state.plan])
-                    from focus_tools import get_focus_sessions
-                    focus_data = get_focus_sessions()
-                    pdf_path = generate_study_report(
-                        st.session_state.user,
-                        st.session_state.plan,
-                        st.session_state.exam_date,
-                        resources,
-                        focus_data
-                    )
-                    
-                    with open(pdf_path, "rb") as f:
-                        st.download_button(
-                            "Download PDF Report",
-                            f,
-                            file_name=f"study_plan_{st.session_state.user.username}.pdf",
-                            mime="application/pdf"
-                        )
-            
-            with col2:
-                csv_content = generate_study_schedule_csv(st.session_state.plan)
-                st.download_button(
-                    "Download CSV Schedule",
-                    csv_content,
-                    file_name="weekly_study_schedule.csv",
-                    mime="text/csv"
-                )
-    
-    with tab2:
-        show_pomodoro_timer()
-        show_focus_mode()
-        show_website_blocker()
-    
-    with tab3:
-        show_study_techniques()
-        show_concentration_exercises()
-        show_motivational_tools()
-    
-    with tab4:
-        st.subheader("📈 Productivity Analytics")
-        show_focus_analytics()
-        
-        st.subheader("📚 Study Progress")
-        session = get_session()
-        try:
-            progress_data = session.query(Progress).filter_by(
-                user_id=st.session_state.user.id
-            ).order_by(Progress.date.desc()).limit(30).all()
-            
-            if progress_data:
-                # Weekly progress chart
-                history = {}
-                for record in progress_data:
-                    week = record.date.isoformat()
-                    if week not in history:
-                        history[week] = {}
-                    history[week][record.subject] = record.hours_studied
-                
-                # Create history chart
-                dates = list(history.keys())
-                subjects = list({s for day in history.values() for s in day.keys()})
-                
-                fig = go.Figure()
-                for subject in subjects:
-                    hours = [history[date].get(subject, 0) for date in dates]
-                    fig.add_trace(go.Bar(
-                        x=dates,
-                        y=hours,
-                        name=subject
-                    ))
-                
-                fig.update_layout(
-                    barmode='stack',
-                    title='Study Progress (Last 30 Days)',
-                    xaxis_title='Week',
-                    yaxis_title='Hours Studied'
-                )
-                st.plotly_chart(fig, use_container_width=True)
-                
-                # Consistency metric
-                study_days = len(set(r.date for r in progress_data))
-                st.metric("Study Consistency", f"{study_days} days", 
-                         f"{study_days/30*100:.1f}% of days")
-            else:
-                st.info("No study history yet. Track your progress to see insights here.")
-        finally:
-            session.close()
-        
-        # Focus recommendations
-        st.subheader("🔍 Focus Insights")
-        from focus_tools import get_focus_sessions
-        sessions = get_focus_sessions()
-        if sessions:
-            distractions = sum(s['distractions'] for s in sessions)
-            if distractions / len(sessions) > 2:
-                st.warning("**High Distraction Rate:** You're averaging more than 2 distractions per session")
-                st.markdown("""
-                **Recommendations:**
-                - Use website blocking during focus sessions
-                - Try a 5-minute concentration exercise before studying
-                - Study in a quieter environment
-                """)
-        
-        # Digital wellbeing
-        st.subheader("🌱 Digital Wellbeing")
-        st.markdown("""
-        - **Screen Time Balance:** Aim for 2 hours of quality study per 4 hours of screen time
-        - **Mindful Breaks:** Take 5-minute breaks every 45 minutes
-        - **Sleep Hygiene:** Avoid screens 1 hour before bedtime
-        """)
-    
-    with tab5:
-        st.subheader("⚙️ Study Environment Setup")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # Environment setup
-            st.write("**Optimize Your Physical Space**")
-            lighting = st.select_slider("Lighting Quality", ["Poor", "Fair", "Good", "Excellent"])
-            noise = st.select_slider("Noise Level", ["Distracting", "Moderate", "Quiet"])
-            ergonomics = st.select_slider("Ergonomics", ["Uncomfortable", "Okay", "Comfortable"])
-            
-            score = 0
-            if lighting in ["Good", "Excellent"]: score += 1
-            if noise in ["Quiet"]: score += 1
-            if ergonomics in ["Comfortable"]: score += 1
-            
-            st.metric("Environment Score", f"{score}/3", 
-                      "Ideal" if score == 3 else "Needs Improvement")
-            
-            if score < 2:
-                st.warning("Your study environment may be reducing your focus potential")
-        
-        with col2:
-            # Device settings
-            st.write("**Digital Environment**")
-            st.checkbox("Enable Do Not Disturb during study", True)
-            st.checkbox("Use grayscale mode during focus sessions", False)
-            st.checkbox("Block social media notifications", True)
-            
-            st.info("**Recommendation:** Use app blockers during focus sessions")
-        
-        # Personalization
-        st.subheader("🎨 Personal Preferences")
-        st.selectbox("Default Focus Duration", [25, 45, 60, 90], index=1)
-        st.selectbox("Break Duration", [5, 10, 15], index=0)
-        st.checkbox("Enable Daily Focus Reminders", True)
-        st.checkbox("Send Weekly Progress Reports", True)
-        
-        if st.button("Save Preferences"):
-            st.success("Preferences saved!")
-        
-        # Account management
-        st.subheader("🔐 Account Settings")
-        if st.button("Export My Data"):
-            st.info("Feature coming soon!")
-        if st.button("Delete My Account"):
-            st.warning("This will permanently delete all your data")
-            if st.checkbox("I understand this action is irreversible"):
-                if st.button("Confirm Account Deletion"):
-                    st.error("Account deletion not implemented in demo")
+    if NAVIGATION == "tabs":
+        # Every section runs on every rerun, hidden or not
+        for tab, show_section in zip(st.tabs(list(SECTIONS)), SECTIONS.values()):
+            with tab:
+                show_section(data)
+    else:
+        # Only the selected section runs
+        section = st.radio("Section", list(SECTIONS), horizontal=True, key="section", label_visibility="collapsed")
+        keep_widget_state(section)
+        SECTIONS[section](data)
 else:
     st.info("👋 Please login or register to start planning your studies")
     col1, col2 = st.columns([1, 2])
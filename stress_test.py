@@ -0,0 +1,304 @@
+"""Concurrency stress test for every persistence path: lost updates, corruption, lock errors, throughput and tail latency.
+
+Runs several worker processes with several threads each against a scratch
+database and JSON stores in a temporary directory. The workers call
+save_focus_session, save_session, add_blocked_site, save_user_state and
+save_daily_progress, the same calls the app makes. Every write carries a
+unique tag, so once the workers are done the stores can be checked against
+what was asked of them:
+
+- lost updates: focus and Pomodoro sessions, blocked sites, activity events
+  and progress rows that were saved without error but are missing
+- corruption: files that no longer parse, duplicate records, a plan mixing
+  rows from two saves, timer hours projected other than exactly once, and
+  SQLite's own integrity check
+- lock errors: saves that raised "database is locked" or similar
+
+    python stress_test.py --processes 4 --threads 8 --ops 100
+
+Exits with status 1 when any check fails, so it can gate storage changes.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+SUBJECTS = ["Mathematics", "Physics", "Chemistry", "Biology", "History"]
+FOCUS_SESSION = "focus session"
+POMODORO_SESSION = "pomodoro session"
+BLOCKED_SITE = "blocked site"
+STUDY_PLAN = "study plan"
+DAILY_PROGRESS = "daily progress"
+OPERATIONS = [FOCUS_SESSION, POMODORO_SESSION, BLOCKED_SITE, STUDY_PLAN, DAILY_PROGRESS]
+# Few enough that every thread and process keeps saving plans for the same users
+USERS = 4
+# Tags map to session start times and progress days from these
+BASE_TIME = datetime(2020, 1, 1)
+BASE_DAY = date(2000, 1, 1)
+
+
+def classify(error):
+    message = str(error).lower()
+    if "database is locked" in message or "database table is locked" in message or "database is busy" in message:
+        return "lock"
+    if isinstance(error, (json.JSONDecodeError, UnicodeDecodeError)):
+        return "corrupt"
+    return "other"
+
+
+def use_workdir(workdir):
+    """Point the app's stores at the scratch directory; must run before the app modules are imported"""
+    os.chdir(workdir)
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'stress.db')}"
+    os.environ["NOTIFICATION_OUTBOX"] = os.path.join(workdir, "outbox.jsonl")
+    if APP_DIR not in sys.path:
+        sys.path.insert(0, APP_DIR)
+
+
+def seed(users):
+    """Empty stores and `users` accounts; returns their ids"""
+    from database import get_session
+    from init_db import initialize_database
+    from models import User
+    from core.sessions import init_focus_files, POMODORO_FILE
+
+    initialize_database()
+    init_focus_files()
+    with open(POMODORO_FILE, "w") as f:
+        json.dump([], f)
+    session = get_session()
+    try:
+        accounts = [User(username=f"stress-{n}", password="") for n in range(users)]
+        session.add_all(accounts)
+        session.commit()
+        return [user.id for user in accounts]
+    finally:
+        session.close()
+
+
+def save(operation, tag, user_id):
+    from core.blocked_sites import add_blocked_site
+    from core.plans import save_user_state
+    from core.progress import save_daily_progress
+    from core.sessions import save_focus_session, save_session
+
+    start = BASE_TIME + timedelta(seconds=tag)
+    if operation == FOCUS_SESSION:
+        save_focus_session(start, start + timedelta(minutes=25), tag % 5, user_id, SUBJECTS[tag % 5])
+    elif operation == POMODORO_SESSION:
+        save_session(start, start + timedelta(minutes=25), "Work", user_id, SUBJECTS[tag % 5])
+    elif operation == BLOCKED_SITE:
+        add_blocked_site(f"s{tag}.example.com")
+    elif operation == STUDY_PLAN:
+        # Every item of one save gets the same hours, so a plan mixing two saves shows up
+        save_user_state(user_id, [
+            {"subject": subject, "hours": tag / 1000, "priority": "medium",
+             "difficulty": "medium", "study_days": ["Mon", "Wed", "Fri"]}
+            for subject in SUBJECTS
+        ])
+    else:
+        save_daily_progress(user_id, {subject: 1.0 for subject in SUBJECTS}, BASE_DAY + timedelta(days=tag))
+
+
+def run_process(workdir, process, threads, ops, user_ids, start_at):
+    """One worker process: latencies and error counts per operation, an example of each error, and the saves that succeeded"""
+    use_workdir(workdir)
+
+    latencies = defaultdict(list)
+    errors = defaultdict(Counter)
+    examples = {}
+    saved = defaultdict(list)
+    lock = threading.Lock()
+
+    def worker(thread):
+        rng = random.Random(process * threads + thread)
+        while time.time() < start_at:
+            time.sleep(0.001)
+        for i in range(ops):
+            operation = OPERATIONS[(thread + i) % len(OPERATIONS)]
+            tag = (process * threads + thread) * ops + i
+            user_id = rng.choice(user_ids)
+            started = time.perf_counter()
+            try:
+                save(operation, tag, user_id)
+            except Exception as e:
+                kind = classify(e)
+                with lock:
+                    errors[operation][kind] += 1
+                    examples.setdefault((operation, kind), traceback.format_exception_only(type(e), e)[-1].strip())
+                continue
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies[operation].append(elapsed)
+                saved[operation].append((tag, user_id))
+
+    workers = [threading.Thread(target=worker, args=(thread,)) for thread in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return dict(latencies), {operation: dict(counts) for operation, counts in errors.items()}, examples, dict(saved)
+
+
+def _read_json(path, problems):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except ValueError as e:
+        problems.append(f"corrupt: {path} no longer parses ({e})")
+        return []
+
+
+def _duplicates(values):
+    return sum(count - 1 for count in Counter(values).values() if count > 1)
+
+
+def check(saved):
+    """What the stores hold vs the saves that reported success; returns a list of problems"""
+    from sqlalchemy import func, text
+    from activity_log import project_events, STUDY_KINDS, TIMER_SOURCE
+    from database import get_session
+    from models import ActivityEvent, Progress, StudyPlan
+    from core.blocked_sites import BLOCKED_SITES_FILE
+    from core.sessions import FOCUS_SESSIONS_FILE, POMODORO_FILE
+
+    problems = []
+
+    def reconcile(label, expected, stored):
+        missing = len(set(expected) - set(stored))
+        if missing:
+            problems.append(f"lost updates: {missing} of {len(set(expected))} {label}")
+        duplicated = _duplicates(stored)
+        if duplicated:
+            problems.append(f"corrupt: {duplicated} duplicate {label}")
+
+    def started(tag):
+        return (BASE_TIME + timedelta(seconds=tag)).isoformat()
+
+    for operation, path in ((FOCUS_SESSION, FOCUS_SESSIONS_FILE), (POMODORO_SESSION, POMODORO_FILE)):
+        stored = [record["start"] for record in _read_json(path, problems)]
+        reconcile(f"{operation}s in {path}", [started(tag) for tag, _ in saved[operation]], stored)
+    reconcile(f"sites in {BLOCKED_SITES_FILE}", [f"s{tag}.example.com" for tag, _ in saved[BLOCKED_SITE]],
+              _read_json(BLOCKED_SITES_FILE, problems))
+
+    # An event outlives a save that failed while projecting it; catch the projection up first
+    project_events()
+    session = get_session()
+    try:
+        events = session.query(ActivityEvent.started_at, ActivityEvent.kind).all()
+        reconcile("activity events", [
+            (BASE_TIME + timedelta(seconds=tag), kind)
+            for operation, kind in ((FOCUS_SESSION, "focus"), (POMODORO_SESSION, "pomodoro_work"))
+            for tag, _ in saved[operation]
+        ], events)
+
+        projected = dict(session.query(Progress.user_id, func.sum(Progress.hours_studied))
+                         .filter(Progress.source == TIMER_SOURCE).group_by(Progress.user_id).all())
+        logged = {user_id: (minutes / 60, count) for user_id, minutes, count in session.query(
+            ActivityEvent.user_id, func.sum(ActivityEvent.minutes), func.count(ActivityEvent.id)
+        ).filter(ActivityEvent.kind.in_(STUDY_KINDS)).group_by(ActivityEvent.user_id).all()}
+        for user_id in set(projected) | set(logged):
+            hours, count = logged.get(user_id, (0.0, 0))
+            # Projected rows are rounded to 4 decimals each time an event is folded in
+            if abs(projected.get(user_id, 0.0) - hours) > 1e-4 * count:
+                problems.append(f"corrupt: user {user_id} has {projected.get(user_id, 0.0):.4f} timer hours "
+                                f"projected from {hours:.4f} logged")
+
+        manual = session.query(Progress.user_id, Progress.date, Progress.subject).filter(Progress.source.is_(None)).all()
+        reconcile("daily progress rows", [
+            (user_id, BASE_DAY + timedelta(days=tag), subject)
+            for tag, user_id in saved[DAILY_PROGRESS] for subject in SUBJECTS
+        ], manual)
+
+        # A plan is replaced whole, so each user's rows must all come from one save
+        saved_plans = {(user_id, tag / 1000) for tag, user_id in saved[STUDY_PLAN]}
+        plans = defaultdict(list)
+        for user_id, subject, hours in session.query(StudyPlan.user_id, StudyPlan.subject, StudyPlan.hours):
+            plans[user_id].append((subject, hours))
+        for user_id, rows in plans.items():
+            saves = {hours for _, hours in rows}
+            if len(saves) != 1 or sorted(subject for subject, _ in rows) != sorted(SUBJECTS):
+                problems.append(f"corrupt: user {user_id}'s plan has {len(rows)} rows from {len(saves)} saves")
+        missing = {user_id for user_id, _ in saved_plans} - set(plans)
+        if missing:
+            problems.append(f"lost updates: {len(missing)} users with a saved plan have none")
+
+        result = session.execute(text("PRAGMA integrity_check")).scalar()
+        if result != "ok":
+            problems.append(f"corrupt: database integrity check says {result}")
+    finally:
+        session.close()
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8, help="Threads per process")
+    parser.add_argument("--ops", type=int, default=100, help="Saves per thread")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    use_workdir(workdir)
+    user_ids = seed(USERS)
+
+    # Spawned workers start from a clean interpreter, like separate app servers
+    context = multiprocessing.get_context("spawn")
+    start_at = time.time() + 2 + args.processes * 0.5
+    with context.Pool(args.processes) as pool:
+        results = pool.starmap(run_process, [
+            (workdir, process, args.threads, args.ops, user_ids, start_at) for process in range(args.processes)
+        ])
+    # Every worker waits for start_at, so the clock runs from there
+    elapsed = time.time() - start_at
+
+    latencies = defaultdict(list)
+    errors = defaultdict(Counter)
+    examples = {}
+    saved = defaultdict(list)
+    for process_latencies, process_errors, process_examples, process_saved in results:
+        for operation, values in process_latencies.items():
+            latencies[operation].extend(values)
+        for operation, counts in process_errors.items():
+            errors[operation].update(counts)
+        examples.update(process_examples)
+        for operation, values in process_saved.items():
+            saved[operation].extend(values)
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"{args.processes} processes x {args.threads} threads x {args.ops} saves, "
+          f"{total} succeeded in {elapsed:.1f}s ({total / elapsed:.0f} saves/s)")
+    print(f"{'operation':18s} {'saves/s':>8s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'max ms':>8s} "
+          f"{'locked':>7s} {'other':>7s}")
+    for operation in OPERATIONS:
+        values = np.array(latencies[operation] or [0.0]) * 1000
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        print(f"{operation:18s} {len(latencies[operation]) / elapsed:8.0f} {p50:8.1f} {p95:8.1f} {p99:8.1f} "
+              f"{values.max():8.1f} {errors[operation]['lock']:7d} "
+              f"{errors[operation]['other'] + errors[operation]['corrupt']:7d}")
+
+    problems = [
+        f"{kind} errors: {count} {operation} saves failed, e.g. {examples[(operation, kind)]}"
+        for operation in OPERATIONS for kind, count in sorted(errors[operation].items())
+    ]
+    problems += check(saved)
+    for problem in problems:
+        print(f"FAIL {problem}")
+    if problems:
+        sys.exit(1)
+    print("OK: no lost updates, corruption or lock errors")
+
+
+if __name__ == "__main__":
+    main()
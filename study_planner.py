@@ -1,8 +1,19 @@
 from datetime import date, timedelta
+import json
 import random
 import plotly.graph_objects as go
+from sqlalchemy import func, select
 from database import get_session
 from models import StudyPlan
+from allocation import allocate_hours
+from plan_cache import PlanCache, NO_PLAN, MAX_GENERATED_PLANS
+from cohorts import member_cohort_ids, apply_plan_delta, plan_hours
+
+DEFAULT_SEED = 0
+
+plan_cache = PlanCache()
+# Generated plans keyed by their normalized inputs, shared by every session in the process
+generated_plans = PlanCache(MAX_GENERATED_PLANS)
 
 def generate_spaced_repetition_schedule(subject, difficulty, exam_date):
     """Generate a spaced repetition schedule based on difficulty and exam date"""
@@ -25,7 +36,35 @@ def generate_spaced_repetition_schedule(subject, difficulty, exam_date):
     
     return intervals
 
-def generate_ai_study_plan(subject_details, motivation, energy, study_hours, exam_date):
+def _normalize_subject(name):
+    return " ".join(name.split())
+
+def _plan_key(subject_details, motivation, energy, study_hours, exam_date, seed):
+    """Hashable form of the inputs; subjects are sorted so the order they were entered in doesn't matter"""
+    subjects = tuple(sorted(
+        (
+            _normalize_subject(subject["subject"]),
+            subject["difficulty"],
+            subject["priority"],
+            subject.get("deadline") or exam_date,
+            float(subject.get("required_hours") or 0),
+        )
+        for subject in subject_details
+    ))
+    # Plans start today, so the same inputs give a different plan tomorrow
+    return (subjects, float(motivation), energy, float(study_hours), exam_date, seed, date.today())
+
+def generate_ai_study_plan(subject_details, motivation, energy, study_hours, exam_date, seed=DEFAULT_SEED):
+    """Plan for the given inputs, memoized: identical requests on the same day return the same plan"""
+    key = _plan_key(subject_details, motivation, energy, study_hours, exam_date, seed)
+    cached = generated_plans.get(key)
+    if cached is not None:
+        return cached
+    result = _generate_plan(subject_details, motivation, energy, study_hours, exam_date, seed)
+    generated_plans.put(key, result)
+    return result
+
+def _generate_plan(subject_details, motivation, energy, study_hours, exam_date, seed):
     if not subject_details:
         return "Error: No subjects provided", []
     
@@ -38,6 +77,11 @@ def generate_ai_study_plan(subject_details, motivation, energy, study_hours, exa
         "difficulty": {"easy": 0.8, "medium": 1.2, "hard": 1.5}
     }
     
+    # Work on normalized copies in name order; the caller's dicts are left alone
+    subject_details = sorted(
+        ({**subject, "subject": _normalize_subject(subject["subject"])} for subject in subject_details),
+        key=lambda subject: subject["subject"]
+    )
     total_weight = 0
     for subject in subject_details:
         priority_weight = weight_map["priority"][subject["priority"]]
@@ -57,7 +101,9 @@ def generate_ai_study_plan(subject_details, motivation, energy, study_hours, exa
         hours = round(max(0.5, min(study_hours, hours)), 1)
         
         days_per_week = max(2, min(5, int(hours * 3)))
-        study_days = random.sample(["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"], days_per_week)
+        # Seeded per subject, so a subject's days don't depend on the other subjects
+        rng = random.Random(f"{seed}:{subject['subject']}")
+        study_days = rng.sample(["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"], days_per_week)
         
         plan.append({
             "subject": subject["subject"],
@@ -72,16 +118,98 @@ def generate_ai_study_plan(subject_details, motivation, energy, study_hours, exa
             )
         })
     
+    deadlines = {subject.get("deadline") or exam_date for subject in subject_details}
+    if len(deadlines) > 1:
+        if min(deadlines) <= date.today():
+            return "Error: Subject deadlines must be in the future", []
+        apply_deadline_allocation(plan, subject_details, study_hours, exam_date)
+    
+    for item in plan:
+        item.setdefault("deadline", exam_date)
+        item["start_date"] = date.today()
+        if "daily_allocation" in item:
+            item["target_hours"] = round(sum(item["daily_allocation"].values()), 1)
+        else:
+            item["target_hours"] = round(item["hours"] * days_remaining, 1)
+    
     priority_order = {"high": 0, "medium": 1, "low": 2}
     plan.sort(key=lambda x: (priority_order[x["priority"]], x["difficulty"]))
     
+    unmet = sum(item.get("unmet_hours", 0) for item in plan)
+    if unmet:
+        return f"Plan generated, but {unmet:.1f} hours do not fit before their deadlines", plan
     return "Plan generated successfully!", plan
 
+def apply_deadline_allocation(plan, subject_details, study_hours, exam_date):
+    """Replace flat daily hours with a day-by-day schedule up to each subject's own deadline"""
+    today = date.today()
+    details = {subject["subject"]: subject for subject in subject_details}
+    requests = []
+    for item in plan:
+        subject = details[item["subject"]]
+        deadline = subject.get("deadline") or exam_date
+        required = subject.get("required_hours") or item["hours"] * (deadline - today).days
+        item["deadline"] = deadline
+        item["repetition_schedule"] = generate_spaced_repetition_schedule(
+            item["subject"], item["difficulty"], deadline
+        )
+        requests.append({
+            "subject": item["subject"],
+            "deadline": deadline,
+            "required_hours": required,
+            "max_daily_hours": max(0.5, item["hours"] * 2)
+        })
+    
+    allocation, unmet = allocate_hours(requests, study_hours, start=today)
+    for item in plan:
+        daily = {day: hours[item["subject"]] for day, hours in allocation.items() if item["subject"] in hours}
+        days_available = (item["deadline"] - today).days
+        item["daily_allocation"] = daily
+        item["hours"] = round(sum(daily.values()) / days_available, 1) if days_available > 0 else 0.0
+        if item["subject"] in unmet:
+            item["unmet_hours"] = unmet[item["subject"]]
+
+def _encode_allocation(allocation):
+    if not allocation:
+        return None
+    return json.dumps({day.isoformat(): hours for day, hours in sorted(allocation.items())})
+
+def _decode_allocation(text):
+    return {date.fromisoformat(day): hours for day, hours in json.loads(text).items()}
+
+def _decode_plan_item(item):
+    plan_item = {
+        "subject": item.subject,
+        "hours": item.hours,
+        "priority": item.priority,
+        "difficulty": item.difficulty,
+        "study_days": item.study_days.split(",")
+    }
+    if item.deadline:
+        plan_item["deadline"] = item.deadline
+    if item.target_hours is not None:
+        plan_item["target_hours"] = item.target_hours
+    if item.daily_allocation:
+        plan_item["daily_allocation"] = _decode_allocation(item.daily_allocation)
+    if item.created_at:
+        plan_item["start_date"] = item.created_at.date()
+    return plan_item
+
+def _plan_version(session, user_id):
+    """Changes whenever the user's plan rows are replaced or updated, by this process or another"""
+    return tuple(session.execute(
+        select(func.count(StudyPlan.id), func.max(StudyPlan.updated_at)).where(StudyPlan.user_id == user_id)
+    ).one())
+
 def save_user_state(user_id, plan):
     session = get_session()
     try:
+        if member_cohort_ids(session, user_id):
+            apply_plan_delta(session, user_id, plan_hours(session, user_id),
+                             {item["subject"]: item["hours"] for item in plan})
         session.query(StudyPlan).filter_by(user_id=user_id).delete()
         
+        plan_items = []
         for item in plan:
             plan_item = StudyPlan(
                 user_id=user_id,
@@ -89,35 +217,79 @@ def save_user_state(user_id, plan):
                 hours=item["hours"],
                 priority=item["priority"],
                 difficulty=item["difficulty"],
-                study_days=",".join(item["study_days"])
+                study_days=",".join(item["study_days"]),
+                deadline=item.get("deadline"),
+                target_hours=item.get("target_hours"),
+                daily_allocation=_encode_allocation(item.get("daily_allocation"))
             )
             session.add(plan_item)
+            plan_items.append(plan_item)
+        session.flush()
+        # Cache exactly what load_user_state would decode from these rows
+        decoded = [_decode_plan_item(item) for item in plan_items]
+        version = _plan_version(session, user_id)
         session.commit()
     except Exception as e:
         session.rollback()
+        plan_cache.invalidate(user_id)
         raise e
     finally:
         session.close()
+    plan_cache.put(user_id, decoded, version)
 
 def load_user_state(user_id):
     session = get_session()
     try:
+        # Read first: rows committed after it are cached under an older version and reloaded next time
+        version = _plan_version(session, user_id)
+        cached = plan_cache.get(user_id, version)
+        if cached is not None:
+            return None if cached is NO_PLAN else cached
         plan_items = session.query(StudyPlan).filter_by(user_id=user_id).all()
-        if not plan_items:
-            return None
-        
-        plan = []
-        for item in plan_items:
-            plan.append({
-                "subject": item.subject,
-                "hours": item.hours,
-                "priority": item.priority,
-                "difficulty": item.difficulty,
-                "study_days": item.study_days.split(",")
+        plan = [_decode_plan_item(item) for item in plan_items]
+    finally:
+        session.close()
+    plan_cache.put(user_id, plan, version)
+    return plan or None
+
+def update_plan_hours(user_id, hours_by_subject, allocations=None):
+    """Update daily hours, and optionally day-by-day allocations, for a few subjects in place, leaving the rest of the plan untouched"""
+    allocations = allocations or {}
+    session = get_session()
+    try:
+        if member_cohort_ids(session, user_id):
+            old_hours = plan_hours(session, user_id)
+            apply_plan_delta(session, user_id, old_hours, {
+                **old_hours, **{s: h for s, h in hours_by_subject.items() if s in old_hours}
             })
-        return plan
+        for subject, hours in hours_by_subject.items():
+            session.query(StudyPlan).filter_by(user_id=user_id, subject=subject).update({"hours": hours})
+        for subject, allocation in allocations.items():
+            session.query(StudyPlan).filter_by(user_id=user_id, subject=subject).update(
+                {"daily_allocation": _encode_allocation(allocation)}
+            )
+        version = _plan_version(session, user_id)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        plan_cache.invalidate(user_id)
+        raise e
     finally:
         session.close()
+    
+    def apply(plan):
+        for item in plan:
+            if item["subject"] in hours_by_subject:
+                item["hours"] = hours_by_subject[item["subject"]]
+            if item["subject"] in allocations:
+                item["daily_allocation"] = allocations[item["subject"]]
+    plan_cache.update(user_id, apply, version)
+
+def get_plan_cache_stats():
+    return plan_cache.stats()
+
+def get_generation_cache_stats():
+    return generated_plans.stats()
 
 def create_progress_chart(plan):
     if not plan:
@@ -153,7 +325,7 @@ def create_progress_chart(plan):
     
     return fig
 
-def recommend_resources(subjects):
+def recommend_resources(subjects, seed=DEFAULT_SEED):
     resources = {
         "Mathematics": [
             "https://www.khanacademy.org/math",
@@ -198,7 +370,7 @@ def recommend_resources(subjects):
                 break
         
         if best_match:
-            recommended[subject] = random.choice(resources[best_match])
+            recommended[subject] = random.Random(f"{seed}:{subject}").choice(resources[best_match])
         else:
             recommended[subject] = f"https://www.google.com/search?q={subject.replace(' ', '+')}+learning+resources"
     
@@ -0,0 +1,49 @@
+from collections import OrderedDict
+
+import pytest
+from sqlalchemy import create_engine
+
+import database
+from models import Base, User
+from notes import create_search_index
+
+
+@pytest.fixture
+def scratch_db(tmp_path, monkeypatch):
+    """A fresh database and session files in a temporary directory, in place of the app's own"""
+    import core.sessions
+    import forecasting
+    import heatmaps
+    import leaderboards
+    import study_planner
+    from plan_cache import PlanCache
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    create_search_index(engine)
+    previous = database.SessionLocal.kw["bind"]
+    database.SessionLocal.configure(bind=engine)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(core.sessions, "_histories", {})
+    # Process-wide caches keyed by user id would otherwise carry over between databases
+    monkeypatch.setattr(forecasting, "_trends", OrderedDict())
+    monkeypatch.setattr(heatmaps, "_matrices", OrderedDict())
+    monkeypatch.setattr(study_planner, "plan_cache", PlanCache())
+    monkeypatch.setattr(leaderboards, "leaderboards", leaderboards.Leaderboards())
+    yield engine
+    database.SessionLocal.configure(bind=previous)
+    engine.dispose()
+
+
+@pytest.fixture
+def make_user(scratch_db):
+    def make(username):
+        session = database.get_session()
+        try:
+            user = User(username=username, password="x")
+            session.add(user)
+            session.commit()
+            return user.id
+        finally:
+            session.close()
+    return make
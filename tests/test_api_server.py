@@ -0,0 +1,45 @@
+import json
+import threading
+import urllib.request
+from datetime import date, timedelta
+
+import pytest
+
+from api_server import ApiServer
+from core.plans import load_user_state
+
+
+@pytest.fixture
+def api(scratch_db):
+    server = ApiServer(("127.0.0.1", 0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _call(url, body=None):
+    data = None if body is None else json.dumps(body).encode()
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.load(response)
+
+
+def test_plan_with_subject_deadlines_round_trips(api, make_user):
+    user_id = make_user("api")
+    today = date.today()
+    generated = _call(f"{api}/api/users/{user_id}/plan", {
+        "exam_date": (today + timedelta(days=30)).isoformat(),
+        "subjects": [
+            {"subject": "Physics", "deadline": (today + timedelta(days=10)).isoformat()},
+            {"subject": "History", "deadline": (today + timedelta(days=20)).isoformat()},
+        ],
+    })
+    allocations = {item["subject"]: item["daily_allocation"] for item in generated["plan"]}
+    assert max(allocations["Physics"]) < (today + timedelta(days=10)).isoformat()
+    assert max(allocations["History"]) < (today + timedelta(days=20)).isoformat()
+
+    saved = _call(f"{api}/api/users/{user_id}/plan")
+    assert {item["subject"]: item["daily_allocation"] for item in saved["plan"]} == allocations
+    assert {item["subject"] for item in load_user_state(user_id)} == {"Physics", "History"}
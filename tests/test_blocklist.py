@@ -0,0 +1,30 @@
+import pytest
+
+from blocklist import parse_blocklist_line
+
+
+@pytest.mark.parametrize("line", [
+    "0.0.0.0 0.0.0.0",
+    "127.0.0.1 localhost",
+    "127.0.0.1 localhost.localdomain",
+    "255.255.255.255 broadcasthost",
+    "::1 ip6-localhost ip6-loopback",
+    "ff02::1 ip6-allnodes",
+    "fe80::1%lo0 localhost",
+    "1.2.3.4",
+])
+def test_hosts_aliases_and_addresses_are_not_blocked(line):
+    assert parse_blocklist_line(line) == []
+
+
+def test_hosts_lines_keep_their_domains():
+    assert parse_blocklist_line("0.0.0.0 ads.example.com tracker.example.net # ads") == [
+        "ads.example.com", "tracker.example.net"
+    ]
+    assert parse_blocklist_line("127.0.0.1 localhost ads.example.com") == ["ads.example.com"]
+
+
+def test_plain_and_adblock_lines():
+    assert parse_blocklist_line("https://www.example.org/feed") == ["example.org"]
+    assert parse_blocklist_line("||ads.example.com^$third-party") == ["ads.example.com"]
+    assert parse_blocklist_line("@@||example.com^") == []
@@ -0,0 +1,41 @@
+import io
+import json
+import zipfile
+from datetime import datetime, timedelta
+
+from core.sessions import save_focus_session, save_session
+from core.blocked_sites import add_blocked_site
+from data_export import export_user_data
+
+
+def _archive(user_id):
+    buffer = io.BytesIO()
+    export_user_data(user_id, buffer)
+    return zipfile.ZipFile(io.BytesIO(buffer.getvalue()))
+
+
+def _records(archive, name):
+    return [json.loads(line) for line in archive.read(name).decode().splitlines()]
+
+
+def test_archives_only_hold_their_users_sessions(make_user):
+    alice, bob = make_user("alice"), make_user("bob")
+    start = datetime(2024, 3, 4, 9)
+    save_focus_session(start, start + timedelta(minutes=25), 1, user_id=alice, subject="Physics")
+    save_focus_session(start, start + timedelta(minutes=50), 2, user_id=bob, subject="History")
+    save_focus_session(start, start + timedelta(minutes=10))
+    save_session(start, start + timedelta(minutes=25), "Work", user_id=alice, subject="Physics")
+    save_session(start, start + timedelta(minutes=5), "Break", user_id=bob)
+    save_session(start, start + timedelta(minutes=5), "Break")
+    add_blocked_site("distracting.example.com")
+
+    for user_id, focus_minutes, pomodoro_type in ((alice, 25, "Work"), (bob, 50, "Break")):
+        archive = _archive(user_id)
+        focus = _records(archive, "focus_sessions.jsonl")
+        pomodoro = _records(archive, "pomodoro_sessions.jsonl")
+        assert [(s["user_id"], s["duration"]) for s in focus] == [(user_id, focus_minutes)]
+        assert [(s["user_id"], s["type"]) for s in pomodoro] == [(user_id, pomodoro_type)]
+        assert {e["kind"] for e in _records(archive, "activity_events.jsonl")} <= {"focus", "pomodoro_work",
+                                                                                  "pomodoro_break"}
+        assert len(_records(archive, "activity_events.jsonl")) == 2
+        assert "blocked_sites.txt" not in archive.namelist()
@@ -0,0 +1,39 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+from feasibility import WEEKDAYS, planned_hours, simulate_feasibility
+
+TODAY = date(2024, 3, 4)
+EXAM = TODAY + timedelta(days=60)
+
+
+def _item(subject, hours=1.0, **extra):
+    return dict({"subject": subject, "hours": hours, "study_days": WEEKDAYS}, **extra)
+
+
+def test_each_subject_runs_to_its_own_deadline():
+    plan = [_item("Physics", deadline=TODAY + timedelta(days=10)), _item("History")]
+    results = simulate_feasibility(plan, EXAM, {}, trials=100, seed=0, today=TODAY)
+    assert results["Physics"]["dates"][-1] == TODAY + timedelta(days=9)
+    assert results["History"]["dates"][-1] == EXAM - timedelta(days=1)
+
+
+def test_allocation_sets_the_hours_to_cover():
+    # The average is 1 h a day, but the allocation front-loads 4 h a day
+    allocation = {TODAY + timedelta(days=i): 4.0 for i in range(5)}
+    item = _item("Physics", deadline=TODAY + timedelta(days=20), daily_allocation=allocation)
+    dates = [TODAY + timedelta(days=i) for i in range(20)]
+    assert planned_hours(item, dates).tolist() == [4.0] * 5 + [0.0] * 15
+
+    # Studying 80% of every allocated day always falls short of the allocation
+    adherence = {"Physics": np.full(20, 0.8, dtype=np.float32)}
+    tight = simulate_feasibility([item], EXAM, adherence, trials=100, seed=0, today=TODAY)["Physics"]
+    assert tight["final"] == 0.0
+    assert abs(tight["expected_coverage"] - 0.8) < 1e-6
+
+    on_track = {"Physics": np.full(20, 1.0, dtype=np.float32)}
+    result = simulate_feasibility([item], EXAM, on_track, trials=100, seed=0, today=TODAY)["Physics"]
+    assert result["final"] == 1.0
+    # Done once the last allocated day is studied
+    assert result["probability"][3] == 0.0 and result["probability"][4] == 1.0
@@ -0,0 +1,66 @@
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import insert
+
+from activity_log import FOCUS, record_event
+from core.progress import save_daily_progress
+from database import get_session, io_counts
+from forecasting import get_trends
+from models import Progress
+
+TODAY = date.today()
+YESTERDAY = TODAY - timedelta(days=1)
+
+
+def _total(user_id, day=YESTERDAY):
+    start, totals = get_trends(user_id, TODAY).daily_totals(TODAY, {})
+    return totals[(day - start).days]
+
+
+def _insert(user_id, day, hours):
+    session = get_session()
+    try:
+        session.execute(insert(Progress), [{"user_id": user_id, "subject": "Physics", "date": day,
+                                            "hours_studied": hours}])
+        session.commit()
+    finally:
+        session.close()
+
+
+def test_refresh_only_reads_past_the_high_water_mark(make_user):
+    user_id = make_user("trend")
+    for days_ago in range(1, 200):
+        _insert(user_id, TODAY - timedelta(days=days_ago), 1.0)
+    assert _total(user_id) == 1.0
+
+    before = io_counts()["queries"]
+    get_trends(user_id, TODAY)
+    # One look past the high-water marks, however long the history is
+    assert io_counts()["queries"] - before == 1
+
+
+def test_backfilled_day_rebuilds(make_user):
+    user_id = make_user("trend")
+    _insert(user_id, YESTERDAY, 1.0)
+    assert _total(user_id) == 1.0
+    # Written the way another process (the CSV importer) would, without any invalidation
+    _insert(user_id, YESTERDAY, 0.5)
+    assert _total(user_id) == 1.5
+
+
+def test_timer_hours_projected_in_place_rebuild(make_user):
+    user_id = make_user("trend")
+    evening = datetime.combine(YESTERDAY, time(20))
+    record_event(user_id, FOCUS, evening, evening + timedelta(minutes=30), "Physics")
+    assert _total(user_id) == 0.5
+    # Adds to yesterday's timer row in place, so no new Progress id
+    record_event(user_id, FOCUS, evening + timedelta(hours=1), evening + timedelta(hours=2), "Physics")
+    assert _total(user_id) == 1.5
+
+
+def test_replacing_a_past_day_invalidates(make_user):
+    user_id = make_user("trend")
+    save_daily_progress(user_id, {"Physics": 2.0}, YESTERDAY)
+    assert _total(user_id) == 2.0
+    save_daily_progress(user_id, {"Physics": 0.5}, YESTERDAY)
+    assert _total(user_id) == 0.5
@@ -0,0 +1,128 @@
+import threading
+import time
+
+import pytest
+
+from jobs import JobRunner, JobCancelled, QUEUED, RUNNING, DONE, FAILED, CANCELLED
+
+TIMEOUT = 5
+
+
+def wait_until(condition):
+    deadline = time.monotonic() + TIMEOUT
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def runner():
+    runner = JobRunner(max_workers=2, max_pending=3)
+    yield runner
+    runner.shutdown(wait=False)
+
+
+class Gate:
+    """Job function that blocks until released and records how many ran at once"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def __call__(self, job, value=None):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            while not self.release.wait(0.01):
+                job.check_cancelled()
+            return value
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def test_never_runs_more_than_max_workers(runner):
+    gate = Gate()
+    jobs = [runner.submit(f"job-{i}", gate, i) for i in range(5)]
+    wait_until(lambda: gate.active == 2)
+    assert runner.running_count() == 2
+    assert [job.status for job in jobs].count(QUEUED) == 3
+    gate.release.set()
+    wait_until(lambda: all(job.finished for job in jobs))
+    assert gate.peak == 2
+    assert [job.result for job in jobs] == list(range(5))
+    assert all(job.status == DONE for job in jobs)
+
+
+def test_rejects_submissions_beyond_max_pending(runner):
+    gate = Gate()
+    for i in range(2):
+        runner.submit(f"running-{i}", gate)
+    wait_until(lambda: gate.active == 2)
+    for i in range(3):
+        runner.submit(f"queued-{i}", gate)
+    with pytest.raises(RuntimeError):
+        runner.submit("one-too-many", gate)
+    gate.release.set()
+
+
+def test_same_key_shares_the_active_job(runner):
+    gate = Gate()
+    first = runner.submit(("report", 1), gate, "a")
+    assert runner.submit(("report", 1), gate, "a") is first
+    assert runner.find(("report", 1)) is first
+    other = runner.submit(("report", 2), gate, "a")
+    assert other is not first
+    gate.release.set()
+    wait_until(lambda: first.finished and other.finished)
+    # Once finished, the key is free for a fresh run
+    again = runner.submit(("report", 1), gate, "a")
+    assert again is not first
+    wait_until(lambda: again.finished)
+    assert runner.find(("report", 1)) is None
+
+
+def test_cancel_queued_job_never_runs(runner):
+    gate = Gate()
+    for i in range(2):
+        runner.submit(f"running-{i}", gate)
+    wait_until(lambda: gate.active == 2)
+    queued = runner.submit("queued", gate)
+    assert runner.cancel(queued.id)
+    assert queued.status == CANCELLED
+    gate.release.set()
+    wait_until(lambda: gate.active == 0)
+    assert queued.started_at is None
+    assert not runner.cancel(queued.id)
+
+
+def test_cancel_running_job_stops_at_next_check(runner):
+    gate = Gate()
+    job = runner.submit("running", gate)
+    wait_until(lambda: job.status == RUNNING)
+    assert runner.cancel(job.id)
+    wait_until(lambda: job.finished)
+    assert job.status == CANCELLED
+    assert job.result is None
+
+
+def test_failed_job_records_error(runner):
+    def boom(job):
+        raise ValueError("bad input")
+
+    job = runner.submit("boom", boom)
+    wait_until(lambda: job.finished)
+    assert job.status == FAILED
+    assert job.error == "bad input"
+
+
+def test_job_cancelled_is_not_a_failure(runner):
+    def stop(job):
+        raise JobCancelled()
+
+    job = runner.submit("stop", stop)
+    wait_until(lambda: job.finished)
+    assert job.status == CANCELLED
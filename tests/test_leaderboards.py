@@ -0,0 +1,41 @@
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import insert
+
+import activity_log
+from database import get_session
+from leaderboards import FOCUS, HOURS, get_leaderboard
+from models import Progress
+
+TODAY = date.today()
+
+
+def _insert_progress(user_id, hours):
+    """Written the way another process would, without refreshing this process's boards"""
+    session = get_session()
+    try:
+        session.execute(insert(Progress), [{"user_id": user_id, "subject": "Physics", "date": TODAY,
+                                            "hours_studied": hours}])
+        session.commit()
+    finally:
+        session.close()
+
+
+def _top(metric, user_id):
+    return [(row["user_id"], row["score"]) for row in get_leaderboard(metric, user_id=user_id)["top"]]
+
+
+def test_boards_see_other_processes_writes(make_user):
+    alice, bob = make_user("alice"), make_user("bob")
+    _insert_progress(alice, 2.0)
+    assert _top(HOURS, alice) == [(alice, 2.0)]
+    assert _top(FOCUS, alice) == []
+
+    _insert_progress(bob, 3.0)
+    assert _top(HOURS, alice) == [(bob, 3.0), (alice, 2.0)]
+
+    # Projected by the activity log, which only moves its checkpoint and DailyFocus
+    start = datetime.combine(TODAY, time(0, 5))
+    activity_log.record_event(bob, activity_log.FOCUS, start, start + timedelta(minutes=30), "Physics")
+    assert _top(FOCUS, alice) == [(bob, 30.0)]
+    assert _top(HOURS, alice) == [(bob, 3.5), (alice, 2.0)]
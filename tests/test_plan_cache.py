@@ -0,0 +1,39 @@
+from datetime import date, timedelta
+
+from sqlalchemy import delete, update
+
+from core.plans import generate_ai_study_plan, load_user_state, save_user_state
+from database import get_session
+from models import StudyPlan
+
+
+def _write(statement):
+    """A write made the way another process would, without touching this process's cache"""
+    session = get_session()
+    try:
+        session.execute(statement)
+        session.commit()
+    finally:
+        session.close()
+
+
+def _hours(user_id):
+    return {item["subject"]: item["hours"] for item in load_user_state(user_id) or []}
+
+
+def test_cached_plan_sees_other_processes_writes(make_user):
+    user_id = make_user("planner")
+    subjects = [{"subject": s, "difficulty": "medium", "priority": "medium"} for s in ("Physics", "History")]
+    _, plan = generate_ai_study_plan(subjects, 7, "medium", 4, date.today() + timedelta(days=30))
+    save_user_state(user_id, plan)
+    hours = _hours(user_id)
+    assert _hours(user_id) == hours
+
+    _write(update(StudyPlan).where(StudyPlan.user_id == user_id, StudyPlan.subject == "Physics").values(hours=9.0))
+    assert _hours(user_id) == dict(hours, Physics=9.0)
+
+    _write(delete(StudyPlan).where(StudyPlan.user_id == user_id, StudyPlan.subject == "History"))
+    assert _hours(user_id) == {"Physics": 9.0}
+
+    _write(delete(StudyPlan).where(StudyPlan.user_id == user_id))
+    assert load_user_state(user_id) is None
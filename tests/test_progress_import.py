@@ -0,0 +1,41 @@
+import io
+import os
+import subprocess
+import sys
+from datetime import date
+
+from database import get_session
+from models import Progress
+from progress_import import csv_text, import_progress_csv
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# As Excel saves "CSV UTF-8": a byte order mark, then CRLF line endings
+EXCEL_CSV = "﻿date,subject,hours\r\n2024-01-02,Physics,1.5\r\n2024-01-03,History,2\r\n".encode("utf-8")
+
+
+def _progress(user_id):
+    session = get_session()
+    try:
+        return sorted(session.query(Progress.date, Progress.subject, Progress.hours_studied)
+                      .filter(Progress.user_id == user_id).all())
+    finally:
+        session.close()
+
+
+def test_upload_with_byte_order_mark(make_user):
+    user_id = make_user("excel")
+    stats = import_progress_csv(user_id, csv_text(io.BytesIO(EXCEL_CSV)))
+    assert (stats["inserted"], stats["rejected"]) == (2, 0)
+    assert _progress(user_id) == [(date(2024, 1, 2), "Physics", 1.5), (date(2024, 1, 3), "History", 2.0)]
+
+
+def test_command_line_with_byte_order_mark(make_user, tmp_path):
+    user_id = make_user("excel")
+    path = tmp_path / "history.csv"
+    path.write_bytes(EXCEL_CSV)
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'test.db'}")
+    result = subprocess.run([sys.executable, os.path.join(APP_DIR, "progress_import.py"), "excel", str(path)],
+                            env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert "2 inserted" in result.stdout
+    assert len(_progress(user_id)) == 2
@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+
+from reminders import DAILY_REMINDER, ReminderScheduler
+
+PREFERENCES = {"daily_reminders": True, "weekly_reports": False, "reminder_time": "08:00", "report_weekday": 0}
+
+
+class ListSink:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, notifications):
+        self.sent.extend(notifications)
+
+
+def test_schedulers_in_several_processes_send_each_reminder_once(make_user):
+    users = [make_user("alice"), make_user("bob")]
+    start = datetime(2024, 3, 4, 7).timestamp()
+    sinks = [ListSink(), ListSink()]
+    # One scheduler per process, each holding every user's deadlines
+    schedulers = [ReminderScheduler(sink, clock=lambda: start) for sink in sinks]
+    for scheduler in schedulers:
+        scheduler.load([(user_id, PREFERENCES) for user_id in users], start)
+
+    for day in range(2):
+        due = start + timedelta(days=day, hours=1).total_seconds()
+        for scheduler in schedulers:
+            scheduler.run_pending(due)
+        sent = [(n["user_id"], n["due"]) for sink in sinks for n in sink.sent
+                if n["due"] == datetime.fromtimestamp(due)]
+        assert sorted(sent) == [(user_id, datetime.fromtimestamp(due)) for user_id in users]
+    assert {n["kind"] for sink in sinks for n in sink.sent} == {DAILY_REMINDER}
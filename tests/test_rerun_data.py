@@ -0,0 +1,33 @@
+import pytest
+
+import init_db
+import reminders
+from rerun_benchmark import count_fetches, measure, seed
+
+# Most SQL statements any rerun may make with every section rendered
+MAX_QUERIES = 10
+
+
+@pytest.fixture
+def seeded_user(scratch_db, tmp_path, monkeypatch):
+    """The benchmark's user, with the app's table setup on the scratch database and no reminder thread"""
+    monkeypatch.setattr(init_db, "engine", scratch_db)
+    monkeypatch.setattr(reminders, "start_scheduler", lambda: None)
+    user = seed(str(tmp_path), sessions=300)
+    count_fetches(monkeypatch.setattr)
+    return user
+
+
+@pytest.mark.parametrize("navigation", ["tabs", "sections"])
+def test_reruns_fetch_each_dataset_once(seeded_user, monkeypatch, navigation):
+    monkeypatch.setenv("STUDY_PLANNER_NAVIGATION", navigation)
+    # Stats are from the second round, once each section has been visited and its session files read
+    for interaction, result in measure(navigation, seeded_user, repeat=2).items():
+        if result is None:
+            continue
+        _, stats = result
+        # Every section takes its data from the rerun's RerunData, so no loader runs twice
+        assert all(count == 1 for count in stats["fetches"].values()), (interaction, stats)
+        # The session files haven't changed since the first run, so their cached histories serve every rerun
+        assert stats["file_reads"] == 0, (interaction, stats)
+        assert stats["queries"] <= MAX_QUERIES, (interaction, stats)